@@ -3,6 +3,13 @@ ASGI config for SportPortal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Поток изменений идущих матчей (/live/stream/, Server-Sent Events) держит соединение
+открытым только под ASGI-сервером, например:
+
+    uvicorn SportPortal.asgi:application
+
+Под WSGI (runserver, gunicorn с sync-воркерами) он отдаёт накопившиеся события и закрывается.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы в замер попало всё остальное; без INSTRUMENTATION_ENABLED отключается сам
+    'sportApp.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,13 +78,74 @@ WSGI_APPLICATION = 'SportPortal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# Профиль выбирается переменной окружения SPORTPORTAL_DB:
+# default - настройки Django по умолчанию,
+# production - постоянные соединения, BEGIN IMMEDIATE и PRAGMA из SQLITE_PRAGMAS
+# (WAL, чтобы импорт не блокировал чтение страниц). PRAGMA применяются
+# при открытии соединения в sportApp/sqlite_profile.py.
+
+DATABASE_PROFILES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'production': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Транзакция сразу берёт блокировку на запись, а не падает с
+            # "database is locked" при попытке её повысить
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+}
+
+DATABASE_PROFILE = os.environ.get('SPORTPORTAL_DB', 'default')
+
+DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',    # в WAL fsync только при checkpoint
+    'cache_size': -64000,       # 64 МБ кэша страниц
+    'mmap_size': 268435456,     # 256 МБ
+    'busy_timeout': 5000,       # мс ожидания блокировки вместо немедленной ошибки
+    'temp_store': 'MEMORY',
+} if DATABASE_PROFILE == 'production' else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Кэш страниц матчей/команд/игроков сбрасывается сигналами import_matches и live_matches,
+# которые работают отдельными процессами, поэтому по умолчанию бэкенд общий - файловый
+# (каталог SPORTPORTAL_CACHE_DIR). locmem (SPORTPORTAL_CACHE=locmem) годится, только если
+# импорт запускается в том же процессе, что и сайт: чужие сбросы до него не доходят.
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sportportal',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SPORTPORTAL_CACHE_DIR', BASE_DIR / '.page_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('SPORTPORTAL_CACHE', 'file')],
+}
+
+# Сколько секунд хранится страница идущего или предстоящего матча, команды и игрока.
+# Завершённые матчи кэшируются без срока, пока их не перепишет импорт.
+PAGE_CACHE_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -123,3 +187,30 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Sofascore API, из которого import_matches берёт матчи и статистику
+
+SOFASCORE_API_URL = 'https://api.sofascore.com/api/v1'
+
+# Локальный кэш ответов API (None - не кэшировать)
+SOFASCORE_CACHE_DIR = BASE_DIR / '.sofascore_cache'
+SOFASCORE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Колоночное хранилище статистики для аналитики (sportApp/statistics_store.py, нужен numpy).
+# Строится командой build_statistics_store, после этого импорт дописывает в него новые матчи.
+STATISTICS_STORE_DIR = BASE_DIR / '.stats_store'
+
+# Поток изменений идущих матчей /live/stream/ (команда live_matches, Server-Sent Events).
+# Соединение держится LIVE_STREAM_SECONDS, потом браузер сам переподключается;
+# новые изменения проверяются раз в LIVE_STREAM_POLL секунд.
+LIVE_STREAM_SECONDS = 300
+LIVE_STREAM_POLL = 1.0
+
+# Инструментирование страниц (sportApp/instrumentation.py): число и время SQL-запросов,
+# время рендера шаблонов и размер ответа по каждому view, сводка - на /metrics/.
+# Включается переменной окружения SPORTPORTAL_METRICS=1.
+INSTRUMENTATION_ENABLED = os.environ.get('SPORTPORTAL_METRICS') == '1'
+INSTRUMENTATION_SAMPLES = 1000   # сколько последних запросов каждого view держать для перцентилей
+INSTRUMENTATION_N_PLUS_ONE = 5   # столько одинаковых по форме SQL за запрос - признак N+1
+INTERNAL_IPS = ['127.0.0.1']
@@ -17,8 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from sportApp.views import home_page
-from sportApp.views_scripts.models_views import match_list, match_detail, team_detail, player_detail
+from sportApp.views import home_page, metrics
+from sportApp.views_scripts.api_views import (
+    api_match_list, api_match_detail, api_team_list, api_team_detail, api_player_list, api_player_detail
+)
+from sportApp.views_scripts.live_views import live_stream
+from sportApp.views_scripts.models_views import (
+    match_list, match_detail, team_detail, player_detail, head_to_head, search_autocomplete
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,4 +33,14 @@ urlpatterns = [
     path('matches/<int:match_id>/', match_detail, name='match_detail'),
     path('teams/<int:team_id>/', team_detail, name='team_detail'),
     path('players/<int:player_id>/', player_detail, name='player_detail'),
+    path('h2h/<int:player_a>/<int:player_b>/', head_to_head, name='head_to_head'),
+    path('search/', search_autocomplete, name='search'),
+    path('api/matches/', api_match_list, name='api_match_list'),
+    path('api/matches/<int:match_id>/', api_match_detail, name='api_match_detail'),
+    path('api/teams/', api_team_list, name='api_team_list'),
+    path('api/teams/<int:team_id>/', api_team_detail, name='api_team_detail'),
+    path('api/players/', api_player_list, name='api_player_list'),
+    path('api/players/<int:player_id>/', api_player_detail, name='api_player_detail'),
+    path('live/stream/', live_stream, name='live_stream'),
+    path('metrics/', metrics, name='metrics'),
 ]
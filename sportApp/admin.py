@@ -1,17 +1,190 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from sportApp.models import (
     Category, UniqueTournament, Tournament, Season,
     Player, Team, Match, MatchSet, MatchStatistics
 )
-# Register your models here.
-admin.site.register(Player)
-admin.site.register(Season)
-admin.site.register(Tournament)
-admin.site.register(Match)
-admin.site.register(Category)
-admin.site.register(UniqueTournament)
-admin.site.register(Team)
-admin.site.register(MatchSet)
-admin.site.register(MatchStatistics)
 
+# Сколько матчей, сетов и строк статистики на странице списка
+LIST_PER_PAGE = 100
+
+
+def estimated_row_count(queryset):
+    """
+    Примерное число строк таблицы без COUNT(*), который читает её целиком:
+    на SQLite - наибольший id (строки почти не удаляются, поэтому он близок к числу строк),
+    на PostgreSQL - оценка планировщика из pg_class. На других БД - None.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+    if connection.vendor == 'sqlite':
+        return model._default_manager.using(queryset.db).aggregate(last=Max('pk'))['last'] or 0
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для таблиц в миллионы строк: без фильтров число строк берётся оценкой
+    (estimated_row_count), с фильтрами - обычный COUNT(*), который уже идёт по индексу фильтра.
+    Страницы за оценкой просто окажутся пустыми.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None:
+                return estimate
+        return super().count
+
+
+class StartDateFilter(admin.SimpleListFilter):
+    """
+    Фильтр по дате начала с готовыми периодами: диапазон по индексу (start_timestamp, id)
+    вместо date_hierarchy, которому нужен DISTINCT по датам всей таблицы.
+    """
+    title = 'дата начала'
+    parameter_name = 'started'
+    periods = {
+        'today': ('Сегодня', timedelta(days=1)),
+        'week': ('Последние 7 дней', timedelta(days=7)),
+        'month': ('Последние 30 дней', timedelta(days=30)),
+        'year': ('Последний год', timedelta(days=365)),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _) in self.periods.items()]
+
+    def queryset(self, request, queryset):
+        period = self.periods.get(self.value())
+        if period is None:
+            return queryset
+        tomorrow = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        # Запланированные на будущие дни матчи в "последние N дней" не входят
+        return queryset.filter(start_timestamp__gte=tomorrow - period[1], start_timestamp__lt=tomorrow)
+
+
+class StatusFilter(admin.SimpleListFilter):
+    """
+    Фильтр по коду статуса. Варианты ищутся прыжками по индексу match_status_start_idx
+    (следующий код больше предыдущего - один поиск по индексу на код),
+    а не DISTINCT, который прочитал бы индекс целиком.
+    """
+    title = 'статус'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        choices = []
+        statuses = Match.objects.exclude(status_code=None).order_by('status_code')
+        row = statuses.values_list('status_code', 'status_description').first()
+        while row is not None:
+            code, description = row
+            choices.append((str(code), f"{description or '—'} ({code})"))
+            row = statuses.filter(status_code__gt=code).values_list('status_code', 'status_description').first()
+        return choices
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            return queryset.filter(status_code=int(self.value()))
+        except ValueError:
+            return queryset.none()
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+
+
+@admin.register(UniqueTournament)
+class UniqueTournamentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'category', 'groundType')
+    list_select_related = ('category',)
+    search_fields = ('name', 'slug')
+    autocomplete_fields = ('category',)
+
+
+@admin.register(Tournament)
+class TournamentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'category', 'unique_tournament', 'priority', 'api_id')
+    # UniqueTournament.__str__ показывает и свою категорию
+    list_select_related = ('category', 'unique_tournament__category')
+    search_fields = ('name', 'slug')
+    autocomplete_fields = ('category', 'unique_tournament')
+
+
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ('name', 'year', 'api_id')
+    search_fields = ('name', 'year')
+
+
+@admin.register(Player)
+class PlayerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'short_name', 'country_alpha2', 'api_id', 'updated_at')
+    search_fields = ('name', 'short_name', 'slug')
+    show_full_result_count = False
+
+
+@admin.register(Team)
+class TeamAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'api_id', 'updated_at')
+    search_fields = ('name', 'slug')
+    autocomplete_fields = ('players',)
+    show_full_result_count = False
+
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_display = (
+        'event_id', 'home_team', 'away_team', 'tournament', 'status_code', 'status_description',
+        'winner_code', 'start_timestamp',
+    )
+    list_select_related = ('home_team', 'away_team', 'tournament')
+    # Фильтры идут по индексам match_start_id_idx, match_tournament_start_idx и match_status_start_idx
+    list_filter = (StartDateFilter, StatusFilter, 'tournament')
+    ordering = ('-start_timestamp', '-id')
+    search_fields = ('event_id__exact',)
+    autocomplete_fields = ('tournament', 'season', 'home_team', 'away_team')
+    exclude = ('statistics_layout',)
+    list_per_page = LIST_PER_PAGE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(MatchSet)
+class MatchSetAdmin(admin.ModelAdmin):
+    list_display = ('match', 'set_number', 'home_score', 'away_score')
+    list_select_related = ('match__home_team', 'match__away_team')
+    search_fields = ('match__event_id__exact',)
+    raw_id_fields = ('match',)
+    list_per_page = LIST_PER_PAGE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(MatchStatistics)
+class MatchStatisticsAdmin(admin.ModelAdmin):
+    list_display = ('match', 'period', 'group_name', 'stat_name', 'home_value', 'away_value')
+    list_select_related = ('match__home_team', 'match__away_team')
+    search_fields = ('match__event_id__exact',)
+    raw_id_fields = ('match',)
+    list_per_page = LIST_PER_PAGE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SportappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sportApp'
+
+    def ready(self):
+        # Подключаем обработчики сигналов импорта (сброс кэша страниц, поисковый индекс,
+        # дозапись в хранилище статистики) и настройку соединений SQLite
+        from sportApp import page_cache, search, sqlite_profile, statistics_store  # noqa: F401
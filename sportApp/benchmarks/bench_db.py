@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+
+class QueryCounter:
+    # execute_wrapper вместо connection.queries: лог запросов ограничен 9000 записями.
+    # matched - сколько запросов подошло под регулярное выражение pattern
+    def __init__(self, pattern=None):
+        self.count = 0
+        self.pattern = pattern
+        self.matched = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        if self.pattern is not None and self.pattern.search(sql):
+            self.matched += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def temporary_database(verbosity=0, file_path=None):
+    """
+    Поднимает чистую тестовую БД (как при manage.py test), чтобы бенчмарк
+    не трогал рабочую базу, и удаляет её после выхода из блока.
+    Тестовая SQLite по умолчанию живёт в памяти; file_path задаёт файл -
+    нужен, когда важны журнал и блокировки (WAL, несколько соединений).
+    """
+    test_settings = connections['default'].settings_dict['TEST']
+    old_name = test_settings.get('NAME')
+    if file_path:
+        test_settings['NAME'] = str(file_path)
+    old_config = setup_databases(verbosity, interactive=False, aliases={'default'})
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        test_settings['NAME'] = old_name
@@ -0,0 +1,35 @@
+import copy
+import json
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+def load_fixture(name):
+    with open(FIXTURES_DIR / name, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def shift_team_ids(team_data, offset):
+    team_data['id'] += offset
+    team_data['slug'] = f"{team_data['slug']}-{offset}"
+    for sub_team in team_data.get('subTeams', []):
+        shift_team_ids(sub_team, offset)
+
+
+def replicate_events(count, players_pool=500):
+    """
+    Размножает записанные события до count штук: у каждого копии свой event id,
+    а команды/игроки повторяются из пула players_pool, как в реальном дне,
+    где одни и те же игроки встречаются в нескольких матчах.
+    Возвращает пары (событие, статистика).
+    """
+    events = load_fixture('scheduled_events.json')['events']
+    statistics = load_fixture('statistics.json')
+
+    for n in range(count):
+        event = copy.deepcopy(events[n % len(events)])
+        event['id'] += n * 100
+        shift_team_ids(event['homeTeam'], (n % players_pool) * 10)
+        shift_team_ids(event['awayTeam'], ((n + 1) % players_pool) * 10 + 5)
+        yield event, statistics[n % len(statistics)]
@@ -0,0 +1,236 @@
+import copy
+import json
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from functools import partial
+from pathlib import Path
+
+from sportApp.benchmarks.recorded import load_fixture
+from sportApp.import_scripts.json_stream import READ_SIZE, iter_array_items
+
+SURFACES = ('Hardcourt outdoor', 'Red clay', 'Hardcourt indoor', 'Grass')
+COUNTRIES = (('Uzbekistan', 'UZ'), ('Russia', 'RU'), ('Japan', 'JP'), ('Egypt', 'EG'), ('France', 'FR'), ('USA', 'US'))
+
+
+class SyntheticFixtures:
+    """
+    Генератор ответов scheduled-events и /statistics по образцу записанных событий
+    (fixtures/, см. example_data.txt). Один и тот же seed и параметры дают те же данные.
+    - events_per_day событий в день, из них tracked_share - турниры ITF, остальные отсекаются фильтром;
+    - doubles_share - доля парных матчей, finished_share - доля завершённых;
+    - игроки берутся из пула players, поэтому встречаются в разных матчах и днях;
+    - stat_items - сколько показателей в каждой группе статистики (None - как в записи).
+    """
+
+    def __init__(self, events_per_day=200, tracked_share=0.3, doubles_share=0.2, finished_share=0.85,
+                 players=2000, tournaments=20, stat_items=None, seed=1):
+        self.events_per_day = events_per_day
+        self.tracked_share = tracked_share
+        self.doubles_share = doubles_share
+        self.finished_share = finished_share
+        self.players = players
+        self.tournaments = tournaments
+        self.stat_items = stat_items
+        self.seed = seed
+        self.templates = load_fixture('scheduled_events.json')['events']
+        self.statistics_templates = load_fixture('statistics.json')
+
+    def options(self):
+        return {
+            'events_per_day': self.events_per_day, 'tracked_share': self.tracked_share,
+            'doubles_share': self.doubles_share, 'finished_share': self.finished_share,
+            'players': self.players, 'tournaments': self.tournaments,
+            'stat_items': self.stat_items, 'seed': self.seed,
+        }
+
+    def player(self, n):
+        country, alpha2 = COUNTRIES[n % len(COUNTRIES)]
+        return {
+            'name': f"Player{n} A.", 'slug': f"player-{n}", 'shortName': f"A. Player{n}",
+            'type': 1, 'id': 1_000_000 + n, 'subTeams': [],
+            'country': {'alpha2': alpha2, 'name': country},
+        }
+
+    def team(self, player_numbers):
+        if len(player_numbers) == 1:
+            return self.player(player_numbers[0])
+        low, high = sorted(player_numbers)
+        players = [self.player(low), self.player(high)]
+        return {
+            'name': ' / '.join(p['name'] for p in players),
+            'slug': '-'.join(p['slug'] for p in players),
+            'shortName': ' / '.join(p['shortName'] for p in players),
+            'type': 2, 'id': 10_000_000 + low * self.players + high,
+            'country': {}, 'subTeams': players,
+        }
+
+    def tournament(self, rng, tracked, doubles):
+        n = rng.randrange(self.tournaments)
+        template = self.templates[1 if doubles else 0] if tracked else self.templates[2]
+        data = copy.deepcopy(template['tournament'])
+        kind = 'doubles' if doubles else 'singles'
+        prefix = 'itf-m25' if tracked else 'atp'
+        data['name'] = f"{prefix.upper()} City {n} {kind.title()}"
+        data['slug'] = f"{prefix}-city-{n}-{kind}"
+        data['id'] = 100_000 + 2 * n + doubles + (0 if tracked else 50_000)
+        unique = data.setdefault('uniqueTournament', {})
+        unique.update({
+            'name': f"{prefix.upper()} City {n}", 'slug': f"{prefix}-city-{n}",
+            'id': 30_000 + n + (0 if tracked else 50_000),
+            'groundType': SURFACES[n % len(SURFACES)],
+        })
+        season = dict(template['season'], id=48_000 + n + (0 if tracked else 50_000))
+        return data, season
+
+    @staticmethod
+    def sets(rng, finished, home_won):
+        """
+        Счёт по сетам (хозяева, гости): победитель берёт два сета, у незавершённого матча сыграна часть.
+        """
+        winners = [home_won, home_won]
+        if rng.random() < 0.35:
+            winners.insert(rng.randrange(2), not home_won)
+        if not finished:
+            winners = winners[:rng.randint(1, len(winners) - 1)]
+        sets = []
+        for home_takes in winners:
+            loser_games = rng.randint(0, 6)
+            winner_games = 7 if loser_games >= 5 else 6
+            sets.append((winner_games, loser_games) if home_takes else (loser_games, winner_games))
+        return sets
+
+    def statistics(self, rng):
+        data = copy.deepcopy(rng.choice(self.statistics_templates))
+        for block in data['statistics']:
+            for group in block['groups']:
+                items = group['statisticsItems']
+                if self.stat_items is not None:
+                    # Повторяем показатели группы по кругу, у копий свои название и api_key
+                    items = [dict(items[k % len(items)]) for k in range(self.stat_items)]
+                    for k, item in enumerate(items[len(group['statisticsItems']):], start=len(group['statisticsItems'])):
+                        item['name'] = f"{item['name']} {k}"
+                        item['key'] = f"{item['key']}_{k}"
+                    group['statisticsItems'] = items
+                for item in items:
+                    for side in ('home', 'away'):
+                        if item.get(f'{side}Total') is not None:
+                            total = rng.randint(1, 60)
+                            value = rng.randint(0, total)
+                            item.update({f'{side}Total': total, f'{side}Value': value,
+                                         side: f"{value}/{total} ({value * 100 // total}%)"})
+                        else:
+                            value = rng.randint(0, 30)
+                            item.update({f'{side}Value': value, side: str(value)})
+        return data
+
+    def day(self, day):
+        """
+        Возвращает ({"events": [...]}, {event_id: статистика}) за день.
+        Статистика есть только у одиночных матчей ITF - парные, как и в API, отвечают 404.
+        """
+        rng = random.Random(f"{self.seed}-{day:%Y%m%d}")
+        day_start = int(datetime.combine(day.date(), time(9), tzinfo=timezone.utc).timestamp())
+        base_id = (day.date() - date(2000, 1, 1)).days * 100_000
+        events = []
+        statistics = {}
+        for n in range(self.events_per_day):
+            tracked = rng.random() < self.tracked_share
+            doubles = rng.random() < self.doubles_share
+            finished = rng.random() < self.finished_share
+            home_won = rng.random() < 0.5
+            size = 2 if doubles else 1
+            numbers = rng.sample(range(self.players), 2 * size)
+            tournament, season = self.tournament(rng, tracked, doubles)
+            sets = self.sets(rng, finished, home_won)
+
+            event = copy.deepcopy(self.templates[1 if doubles else 0])
+            event.update({
+                'id': base_id + n,
+                'customId': f"syn{base_id + n}",
+                'tournament': tournament,
+                'season': season,
+                'homeTeam': self.team(numbers[:size]),
+                'awayTeam': self.team(numbers[size:]),
+                'startTimestamp': day_start + rng.randrange(0, 12 * 3600, 600),
+                'status': (
+                    {'code': 100, 'description': 'Ended', 'type': 'finished'} if finished
+                    else {'code': 7, 'description': ('1st set', '2nd set')[len(sets) - 1], 'type': 'inprogress'}
+                ),
+                'winnerCode': (1 if home_won else 2) if finished else 0,
+            })
+            event['slug'] = f"{event['homeTeam']['slug']}-{event['awayTeam']['slug']}"
+            home_sets = sum(1 for hs, as_ in sets if hs > as_)
+            away_sets = len(sets) - home_sets
+            for side, current, own in (('homeScore', home_sets, 0), ('awayScore', away_sets, 1)):
+                event[side] = {'current': current, 'display': current, 'normaltime': current}
+                for number, games in enumerate(sets, start=1):
+                    event[side][f"period{number}"] = games[own]
+            event['time'] = {f"period{number}": rng.randint(1800, 4200) for number in range(1, len(sets) + 1)}
+            events.append(event)
+            if tracked and not doubles:
+                statistics[event['id']] = self.statistics(rng)
+        return {'events': events}, statistics
+
+    def write(self, directory, days):
+        """
+        Пишет дни в каталог в форме ответов API:
+        scheduled-events/<YYYY-MM-DD>.json, statistics/<event id>.json и manifest.json с параметрами.
+        Возвращает (число событий, число файлов статистики).
+        """
+        directory = Path(directory)
+        (directory / 'scheduled-events').mkdir(parents=True, exist_ok=True)
+        (directory / 'statistics').mkdir(exist_ok=True)
+        total_events = total_statistics = 0
+        for day in days:
+            data, statistics = self.day(day)
+            with open(directory / 'scheduled-events' / f"{day:%Y-%m-%d}.json", 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            for event_id, stats_data in statistics.items():
+                with open(directory / 'statistics' / f"{event_id}.json", 'w', encoding='utf-8') as f:
+                    json.dump(stats_data, f, ensure_ascii=False)
+            total_events += len(data['events'])
+            total_statistics += len(statistics)
+        manifest = {**self.options(), 'days': [f"{day:%Y-%m-%d}" for day in days]}
+        with open(directory / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return total_events, total_statistics
+
+
+def read_manifest(directory):
+    with open(Path(directory) / 'manifest.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_file_items(path, key='events'):
+    with open(path, 'rb') as f:
+        yield from iter_array_items(iter(partial(f.read, READ_SIZE), b''), key)
+
+
+class FixtureClient:
+    """
+    Клиент с интерфейсом SofascoreClient, читающий ответы из каталога SyntheticFixtures.write:
+    конвейер импорта работает как с API, но без сети.
+    """
+
+    def __init__(self, directory, max_workers=4):
+        self.directory = Path(directory)
+        self.max_workers = max_workers
+
+    def iter_scheduled_events(self, day):
+        path = self.directory / 'scheduled-events' / f"{day:%Y-%m-%d}.json"
+        if not path.exists():
+            return None
+        return iter_file_items(path)
+
+    def event_statistics(self, event_id, finished=False):
+        path = self.directory / 'statistics' / f"{event_id}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_bytes())
+
+    def close(self):
+        pass
+
+
+def fixture_days(start, count):
+    return [start + timedelta(days=n) for n in range(count)]
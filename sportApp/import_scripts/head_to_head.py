@@ -0,0 +1,61 @@
+from sportApp.models import HeadToHead
+
+
+def pair_entries(match_id, start_timestamp, winner_code, home_player_ids, away_player_ids, sets):
+    """
+    Записи личных встреч для одного матча: каждый игрок хозяев против каждого игрока гостей.
+    Возвращает {(меньший id, больший id): запись}, счёт - с точки зрения меньшего id.
+    """
+    doubles = len(home_player_ids) > 1 or len(away_player_ids) > 1
+    entries = {}
+    for home_id in home_player_ids:
+        for away_id in away_player_ids:
+            low_is_home = home_id < away_id
+            winner = None
+            if winner_code in (1, 2):
+                winner = 'low' if (winner_code == 1) == low_is_home else 'high'
+            entries[(min(home_id, away_id), max(home_id, away_id))] = {
+                'match_id': match_id,
+                'start_timestamp': start_timestamp,
+                'winner': winner,
+                'sets': [[hs, as_] if low_is_home else [as_, hs] for _, hs, as_ in sets],
+                'doubles': doubles,
+            }
+    return entries
+
+
+def update_head_to_head(entries):
+    """
+    Добавляет записи в индекс: entries - {(low, high): [запись, ...]}.
+    Запись того же матча заменяет прежнюю, поэтому переимпорт ничего не задваивает.
+    Один запрос за текущими строками и один upsert.
+    """
+    if not entries:
+        return 0
+    current = {
+        (h2h.player_low_id, h2h.player_high_id): h2h.matches
+        for h2h in HeadToHead.objects.filter(
+            player_low_id__in={low for low, _ in entries},
+            player_high_id__in={high for _, high in entries},
+        )
+    }
+    rows = []
+    for (low, high), new_entries in entries.items():
+        by_match = {entry['match_id']: entry for entry in current.get((low, high), [])}
+        by_match.update((entry['match_id'], entry) for entry in new_entries)
+        matches = sorted(by_match.values(), key=lambda e: (e['start_timestamp'], e['match_id']), reverse=True)
+        rows.append(HeadToHead(
+            player_low_id=low,
+            player_high_id=high,
+            low_wins=sum(1 for e in matches if e['winner'] == 'low'),
+            high_wins=sum(1 for e in matches if e['winner'] == 'high'),
+            matches=matches,
+        ))
+    HeadToHead.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['player_low', 'player_high'],
+        update_fields=['low_wins', 'high_wins', 'matches'],
+    )
+    return len(rows)
+
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+
+from sportApp.models import Category, UniqueTournament, Tournament, Season, Player, Team
+
+# Справочные модели: поле-ключ из API и поля, по которым видно, что строку нужно обновить
+# (совпадают с update_fields в BulkMatchWriter).
+REFERENCE_MODELS = {
+    Category: ('slug', ('name',)),
+    UniqueTournament: ('slug', ('name', 'groundType', 'category_id')),
+    Tournament: ('api_id', ('name', 'slug', 'category_id', 'unique_tournament_id', 'priority')),
+    Season: ('api_id', ('name', 'year')),
+    Player: ('api_id', ('name', 'slug', 'short_name', 'country_name', 'country_alpha2')),
+    Team: ('api_id', ('name', 'slug')),
+}
+
+
+class LRUCache:
+    """
+    OrderedDict с необязательным ограничением размера: при переполнении
+    вытесняется запись, к которой дольше всего не обращались.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.evicted = 0
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if self.max_size and len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self.items)
+
+
+class IdentityMap:
+    """
+    Кэш справочных сущностей на один запуск импорта: {ключ из API: (id, сигнатура полей)}
+    для каждой модели из REFERENCE_MODELS плюс уже связанные составы команд (team_id -> игроки).
+    Прогревается одним запросом на модель; max_size ограничивает каждый кэш (LRU).
+    Пока из кэша модели ничего не вытеснено, он полон (complete): промах значит,
+    что строки в БД нет, и её можно сразу создавать без поиска.
+    Кэш не видит изменений в БД в обход импорта, поэтому живёт не дольше одного запуска.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.entities = {model: LRUCache(max_size) for model in REFERENCE_MODELS}
+        self.rosters = LRUCache(max_size)
+        self.warmed = False
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, model, obj):
+        return tuple(getattr(obj, field) for field in REFERENCE_MODELS[model][1])
+
+    def warm(self):
+        if self.warmed:
+            return
+        self.warmed = True
+        for model, (key_field, fields) in REFERENCE_MODELS.items():
+            rows = model.objects.exclude(**{key_field: None}).order_by('-id')
+            if self.max_size:
+                rows = rows[:self.max_size]
+            # От старых к новым, чтобы свежие записи вытеснялись последними
+            for pk, key, *signature in reversed(rows.values_list('id', key_field, *fields)):
+                self.entities[model].put(key, (pk, tuple(signature)))
+
+        rosters = {}
+        for team_id, player_id in Team.players.through.objects.values_list('team_id', 'player_id'):
+            rosters.setdefault(team_id, set()).add(player_id)
+        for team_id, player_ids in rosters.items():
+            if self.max_size is None or team_id in self.entities[Team].items:
+                self.rosters.put(team_id, frozenset(player_ids))
+
+    def complete(self, model):
+        # Прогретый кэш содержит все строки модели с ключом, если ни одна не вытеснена
+        return self.warmed and not self.entities[model].evicted
+
+    def get(self, model, key, signature=None):
+        """
+        id сущности по ключу или None. Если передана сигнатура и она не совпала
+        с закэшированной, считаем запись устаревшей: её нужно перезаписать.
+        """
+        entry = self.entities[model].get(key)
+        if entry is None or (signature is not None and entry[1] != signature):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, model, key, pk, signature=None):
+        self.entities[model].put(key, (pk, signature))
+
+    def has_roster(self, team_id, player_ids):
+        roster = self.rosters.get(team_id)
+        return roster is not None and roster.issuperset(player_ids)
+
+    def add_roster(self, team_id, player_ids):
+        self.rosters.put(team_id, (self.rosters.get(team_id) or frozenset()) | frozenset(player_ids))
+
+    def clear(self):
+        self.__init__(self.max_size)
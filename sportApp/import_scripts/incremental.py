@@ -0,0 +1,70 @@
+from datetime import timedelta, timezone
+
+from django.db.models import Exists, OuterRef
+
+from sportApp.import_scripts.sofascore_client import FINISHED_STATUS_CODE
+from sportApp.models import Match, MatchSet, MatchStatistics
+
+# Матч завершён и его статистика уже в БД - больше его трогать не нужно
+FINAL = 'final'
+
+
+def match_signature(status_code, winner_code, sets):
+    return status_code, winner_code, tuple(sets)
+
+
+def parsed_signature(parsed):
+    match = parsed['match']
+    return match_signature(match['status_code'], match['winner_code'], parsed['sets'])
+
+
+def load_stored_signatures(day):
+    """
+    Состояние уже сохранённых матчей дня: {event_id: FINAL или (статус, победитель, сеты)}.
+    Завершённые матчи со статистикой определяются одним запросом, для остальных
+    вторым запросом подтягивается счёт по сетам.
+    Окно берётся с запасом в сутки в обе стороны: API группирует день по местному времени.
+    """
+    start = day.replace(tzinfo=timezone.utc) - timedelta(days=1)
+    end = start + timedelta(days=3)
+    rows = (
+        Match.objects
+        .filter(start_timestamp__gte=start, start_timestamp__lt=end)
+        .annotate(has_statistics=Exists(MatchStatistics.objects.filter(match=OuterRef('pk'))))
+        .values_list('id', 'event_id', 'status_code', 'winner_code', 'has_statistics')
+    )
+
+    stored = {}
+    pending = {}
+    for match_id, event_id, status_code, winner_code, has_statistics in rows:
+        if status_code == FINISHED_STATUS_CODE and has_statistics:
+            stored[event_id] = FINAL
+        else:
+            pending[match_id] = (event_id, status_code, winner_code)
+
+    sets = {match_id: [] for match_id in pending}
+    if pending:
+        for match_id, set_number, hs, as_ in (
+            MatchSet.objects
+            .filter(match_id__in=list(pending))
+            .order_by('match_id', 'set_number')
+            .values_list('match_id', 'set_number', 'home_score', 'away_score')
+        ):
+            sets[match_id].append((set_number, hs, as_))
+
+    for match_id, (event_id, status_code, winner_code) in pending.items():
+        stored[event_id] = match_signature(status_code, winner_code, sets[match_id])
+    return stored
+
+
+def select_changed(parsed_events, stored):
+    """
+    Оставляет только новые матчи и те, у которых изменился статус или счёт.
+    """
+    changed = []
+    for parsed in parsed_events:
+        signature = stored.get(parsed['match']['event_id'])
+        if signature == FINAL or signature == parsed_signature(parsed):
+            continue
+        changed.append(parsed)
+    return changed
@@ -0,0 +1,105 @@
+import codecs
+import json
+import re
+
+# Размер куска, которым читается ответ или файл
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+
+
+class JsonStream:
+    """
+    Скользящее окно текста над потоком кусков (bytes в UTF-8 или str).
+    Значения разбираются по одному через JSONDecoder.raw_decode (на C), а уже
+    разобранная часть буфера отбрасывается при следующем чтении - в памяти
+    держится только текущий кусок, а не весь документ.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        for chunk in self.chunks:
+            if not isinstance(chunk, str):
+                chunk = self.utf8.decode(chunk)
+            if chunk:
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """
+        Следующий значимый символ (пробелы пропускаются) или '' в конце потока.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Ожидался {char!r}, а найден {found or 'конец потока'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # Число в самом конце буфера могло оборваться на границе куска
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+
+def iter_chunks(body, size=READ_SIZE):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def iter_array_items(chunks, key='events'):
+    """
+    Потоково отдаёт элементы массива key из JSON-объекта верхнего уровня,
+    например события из {"events": [...]} ответа scheduled-events.
+    Каждый элемент разбирается отдельно и может быть отброшен сразу после проверки,
+    поэтому пиковая память не зависит от размера дня.
+    Документ дочитывается до конца, чтобы ответ HTTP освободил соединение.
+    """
+    stream = JsonStream(chunks)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if name == key:
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ']':
+                        stream.pos += 1
+                        break
+                    stream.expect(',')
+        else:
+            stream.value()
+        if stream.peek() == '}':
+            return
+        stream.expect(',')
@@ -0,0 +1,207 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from sportApp.import_scripts.match_import import (
+    IN_QUERY_CHUNK, attach_statistics, parse_event, resolve_ids, send_imported
+)
+from sportApp.import_scripts.pipeline import fetch_statistics, parse_day_events
+from sportApp.import_scripts.sofascore_client import FINISHED_STATUS_CODE
+from sportApp.models import LiveEvent, Match, MatchSet
+
+# Интервал опроса по умолчанию, в секундах: сразу после изменений - минимальный,
+# без изменений удваивается до максимального
+MIN_INTERVAL = 5.0
+MAX_INTERVAL = 60.0
+# Сколько хранить строки LiveEvent: клиенту, отключившемуся дольше, хватит перезагрузить страницу
+LIVE_EVENT_RETENTION = timedelta(hours=1)
+
+
+def load_live_state(event_ids):
+    """
+    Сохранённое состояние матчей: {event_id: (id матча, статус, описание статуса, победитель, сеты)}.
+    Два запроса на пачку: матчи и их сеты.
+    """
+    event_ids = list(event_ids)
+    matches = {}
+    for start in range(0, len(event_ids), IN_QUERY_CHUNK):
+        for match_id, *row in Match.objects.filter(event_id__in=event_ids[start:start + IN_QUERY_CHUNK]).values_list(
+            'id', 'event_id', 'status_code', 'status_description', 'winner_code'
+        ):
+            matches[match_id] = row
+    sets = {match_id: [] for match_id in matches}
+    ids = list(matches)
+    for start in range(0, len(ids), IN_QUERY_CHUNK):
+        for match_id, set_number, hs, as_ in (
+            MatchSet.objects
+            .filter(match_id__in=ids[start:start + IN_QUERY_CHUNK])
+            .order_by('match_id', 'set_number')
+            .values_list('match_id', 'set_number', 'home_score', 'away_score')
+        ):
+            sets[match_id].append((set_number, hs, as_))
+    return {
+        event_id: (match_id, status_code, status_description, winner_code, tuple(sets[match_id]))
+        for match_id, (event_id, status_code, status_description, winner_code) in matches.items()
+    }
+
+
+def live_payload(match_id, parsed):
+    # То, что получает клиент в событии SSE: всё нужное, чтобы перерисовать статус и сеты
+    match = parsed['match']
+    return {
+        'match_id': match_id,
+        'event_id': match['event_id'],
+        'status_code': match['status_code'],
+        'status_description': match['status_description'],
+        'winner_code': match['winner_code'],
+        'sets': [list(row) for row in parsed['sets']],
+    }
+
+
+class LivePoller:
+    """
+    Опрос идущих матчей (команда live_matches). Каждый poll():
+    - берёт ленту live-событий и отбирает нужные турниры; матчи, пропавшие из ленты
+      с прошлого опроса (обычно только что завершённые), дозапрашивает по одному;
+    - сравнивает статус и счёт по сетам с тем, что уже в БД, и пишет только изменившееся:
+      новые матчи и матчи с новым победителем или завершённые - целиком через writer
+      (BulkMatchWriter, вместе со статистикой, сводками и личными встречами),
+      остальные - только поля статуса Match и изменившиеся строки MatchSet;
+    - на каждое изменение добавляет LiveEvent, откуда его забирает поток SSE.
+    Пока матч идёт, победителя нет и в сводки он не входит, поэтому смене счёта
+    достаточно лёгкого пути; личные встречи получают финальный счёт при завершении.
+    """
+
+    def __init__(self, client, writer, tournament_filter='itf', min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.client = client
+        self.writer = writer
+        self.tournament_filter = tournament_filter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.tracked = set()  # event_id матчей, бывших в ленте на прошлом опросе
+
+    def fetch(self):
+        """
+        Разобранные события ленты и пропавших из неё матчей: {event_id: событие} или None.
+        """
+        events = self.client.live_events()
+        if events is None:
+            return None
+        parsed_events = {
+            parsed['match']['event_id']: parsed
+            for parsed in parse_day_events(events, self.tournament_filter)
+        }
+        for event_id in self.tracked - set(parsed_events):
+            event = self.client.event(event_id)
+            parsed = parse_event(event) if event else None
+            if parsed is not None:
+                parsed_events[event_id] = parsed
+        return parsed_events
+
+    def poll(self):
+        """
+        Один опрос. Возвращает {'live': матчей в ленте, 'written': записано целиком,
+        'updated': обновлено по счёту}; следующий интервал - в self.interval.
+        """
+        parsed_events = self.fetch()
+        if parsed_events is None:
+            self.interval = self.max_interval
+            return {'live': 0, 'written': 0, 'updated': 0}
+
+        stored = load_live_state(parsed_events)
+        full = []
+        light = []
+        for event_id, parsed in parsed_events.items():
+            match = parsed['match']
+            state = stored.get(event_id)
+            if state is None:
+                full.append(parsed)
+                continue
+            match_id, status_code, status_description, winner_code, sets = state
+            finished = match['status_code'] == FINISHED_STATUS_CODE
+            if match['winner_code'] != winner_code or (finished and status_code != FINISHED_STATUS_CODE):
+                full.append(parsed)
+            elif (match['status_code'], match['status_description'], tuple(parsed['sets'])) != (
+                status_code, status_description, sets
+            ):
+                light.append((match_id, parsed, sets))
+
+        self.write_full(full)
+        self.write_light(light)
+        changed = len(full) + len(light)
+        self.tracked = {
+            event_id for event_id, parsed in parsed_events.items()
+            if parsed['match']['status_code'] != FINISHED_STATUS_CODE
+        }
+        if not self.tracked:
+            self.interval = self.max_interval
+        elif changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        LiveEvent.objects.filter(created_at__lt=timezone.now() - LIVE_EVENT_RETENTION).delete()
+        return {'live': len(self.tracked), 'written': len(full), 'updated': len(light)}
+
+    def write_full(self, events):
+        if not events:
+            return
+        # Завершённые матчи записываются отдельной пачкой: только они доходят до хранилища статистики,
+        # идущие отправляются с live=True (см. objects_imported)
+        finished = [parsed for parsed in events if parsed['match']['status_code'] == FINISHED_STATUS_CODE]
+        for parsed in finished:
+            attach_statistics(parsed, fetch_statistics(self.client, parsed, self.writer.timer))
+            self.writer.add(parsed)
+        self.writer.flush()
+        for parsed in events:
+            if parsed['match']['status_code'] != FINISHED_STATUS_CODE:
+                self.writer.add(parsed)
+        self.writer.flush(live=True)
+        match_ids = resolve_ids(Match, 'event_id', [parsed['match']['event_id'] for parsed in events])
+        live_events = []
+        for parsed in events:
+            match_id = match_ids[parsed['match']['event_id']]
+            live_events.append(LiveEvent(match_id=match_id, data=live_payload(match_id, parsed)))
+        LiveEvent.objects.bulk_create(live_events)
+
+    def write_light(self, changes):
+        """
+        changes - [(id матча, разобранное событие, сохранённые сеты)]: статус и сеты без остального импорта.
+        """
+        if not changes:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            Match.objects.bulk_update([
+                Match(
+                    id=match_id,
+                    status_code=parsed['match']['status_code'],
+                    status_description=parsed['match']['status_description'],
+                    updated_at=now,
+                )
+                for match_id, parsed, _ in changes
+            ], ['status_code', 'status_description', 'updated_at'])
+
+            new_sets = []
+            for match_id, parsed, old_sets in changes:
+                old = set(old_sets)
+                new_sets.extend(
+                    MatchSet(match_id=match_id, set_number=set_number, home_score=hs, away_score=as_)
+                    for set_number, hs, as_ in parsed['sets'] if (set_number, hs, as_) not in old
+                )
+                removed = {row[0] for row in old_sets} - {row[0] for row in parsed['sets']}
+                if removed:
+                    MatchSet.objects.filter(match_id=match_id, set_number__in=removed).delete()
+            MatchSet.objects.bulk_create(
+                new_sets,
+                update_conflicts=True,
+                unique_fields=['match', 'set_number'],
+                update_fields=['home_score', 'away_score'],
+            )
+            LiveEvent.objects.bulk_create([
+                LiveEvent(match_id=match_id, data=live_payload(match_id, parsed))
+                for match_id, parsed, _ in changes
+            ])
+        # Закэшированные страницы и ответы этих матчей устарели; хранилище статистики счёт не ждёт
+        send_imported([match_id for match_id, _, _ in changes], (), (), live=True)
@@ -0,0 +1,746 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import IntegrityError, transaction
+
+from sportApp.import_scripts.head_to_head import pair_entries, update_head_to_head
+from sportApp.import_scripts.identity_map import REFERENCE_MODELS, IdentityMap
+from sportApp.import_scripts.profiling import StageTimer
+from sportApp.import_scripts.rollups import (
+    CONTRIBUTION_FIELDS, apply_rollup_deltas, load_links, set_contribution
+)
+from sportApp.models import (
+    Category, UniqueTournament, Tournament, Season,
+    Player, Team, Match, MatchSet, MatchStatistics, PlayerMatch
+)
+from sportApp.signals import objects_imported
+from sportApp.statistics_layout import build_statistics_layout
+
+# SQLite не любит слишком длинные списки параметров в IN (...)
+IN_QUERY_CHUNK = 900
+
+# Поля PlayerMatch, которые перезаписываются при повторном импорте матча
+LINK_UPDATE_FIELDS = ['team', 'is_home', 'won', 'start_timestamp'] + CONTRIBUTION_FIELDS
+
+
+def is_tracked_event(event, tournament_filter='itf'):
+    """
+    Проверяет, что событие относится к нужным турнирам (по умолчанию ITF).
+    """
+    tournament_slug = event.get('tournament', {}).get('slug', '') or ''
+    return tournament_filter.lower() in tournament_slug.lower()
+
+
+def parse_team(team_data):
+    """
+    Преобразует homeTeam/awayTeam из API в простой словарь.
+    - Если это doubles (type == 2) и есть subTeams, игроки берутся из subTeams.
+    - Для одиночных матчей игрок совпадает с самой командой.
+    """
+    team_type = team_data.get('type', 1)  # 1 - singles, 2 - doubles
+    if team_type == 2 and team_data.get('subTeams'):
+        players_data = team_data.get('subTeams', [])
+    else:
+        players_data = [team_data]
+
+    players = []
+    for player_data in players_data:
+        country_info = player_data.get('country', {})
+        players.append({
+            'api_id': player_data.get('id'),
+            'name': player_data.get('name', ''),
+            'slug': player_data.get('slug', ''),
+            'short_name': player_data.get('shortName', ''),
+            'country_name': country_info.get('name', ''),
+            'country_alpha2': country_info.get('alpha2', ''),
+        })
+
+    return {
+        'api_id': team_data.get('id'),
+        'name': team_data.get('name', ''),
+        'slug': team_data.get('slug', ''),
+        'players': players,
+    }
+
+
+def parse_sets(event):
+    """
+    Возвращает список (номер сета, счёт хозяев, счёт гостей) из period1..period5.
+    """
+    home_score = event.get('homeScore', {})
+    away_score = event.get('awayScore', {})
+
+    sets = []
+    for set_number in range(1, 6):
+        key = f"period{set_number}"
+        hs = home_score.get(key)
+        as_ = away_score.get(key)
+        if hs is None or as_ is None:
+            continue
+        # Если нет очков, считаем, что сет не игрался
+        if hs == 0 and as_ == 0:
+            continue
+        sets.append((set_number, hs, as_))
+    return sets
+
+
+def parse_statistics(stats_data):
+    """
+    Разворачивает JSON вида {"statistics": [...]} в плоский список строк MatchStatistics.
+    """
+    rows = []
+    for stat_block in stats_data.get('statistics', []):
+        period = stat_block.get('period', 'ALL')
+        for group in stat_block.get('groups', []):
+            group_name = group.get('groupName', '')
+            for item in group.get('statisticsItems', []):
+                home_total = None
+                away_total = None
+                if item.get('homeTotal', None) is not None:
+                    home_total = item.get('homeTotal')
+                    away_total = item.get('awayTotal')
+                rows.append({
+                    'period': period,
+                    'group_name': group_name,
+                    'stat_name': item.get('name', ''),
+                    'home_value': item.get('homeValue'),
+                    'away_value': item.get('awayValue'),
+                    'home_Total': home_total,
+                    'away_Total': away_total,
+                    'api_key': item.get('key', ''),
+                })
+    return rows
+
+
+def parse_event(event):
+    """
+    Превращает событие из scheduled-events в словарь с данными для всех моделей.
+    Возвращает None, если событие нельзя сохранить (нет даты или сезона).
+    Результат состоит только из простых типов, поэтому его можно передавать между процессами.
+    """
+    start_timestamp = event.get('startTimestamp')
+    if not start_timestamp:
+        return None
+
+    season_data = event.get('season', {})
+    if not season_data.get('id', None):
+        return None
+
+    tournament_data = event.get('tournament', {})
+    unique_tournament_data = tournament_data.get('uniqueTournament', {})
+    category_data = tournament_data.get('category', {})
+    round_info = event.get('roundInfo', {})
+    status_info = event.get('status', {})
+
+    return {
+        'category': {
+            'slug': category_data.get('slug', ''),
+            'name': category_data.get('name', 'Unknown category'),
+        },
+        'unique_tournament': {
+            'slug': unique_tournament_data.get('slug', ''),
+            'name': unique_tournament_data.get('name', 'Unknown unique tournament'),
+            'groundType': unique_tournament_data.get('groundType', 'Unknown ground type'),
+        },
+        'tournament': {
+            'api_id': tournament_data.get('id', None),
+            'slug': tournament_data.get('slug', ''),
+            'name': tournament_data.get('name', 'Unknown tournament'),
+            'priority': tournament_data.get('priority'),
+        },
+        'season': {
+            'api_id': season_data.get('id'),
+            'name': season_data.get('name', ''),
+            'year': season_data.get('year', ''),
+        },
+        'home_team': parse_team(event.get('homeTeam', {})),
+        'away_team': parse_team(event.get('awayTeam', {})),
+        'match': {
+            'event_id': event.get('id'),
+            'firstToServe': event.get('firstToServe', 0),
+            'roundName': round_info.get('name', ""),
+            'roundType': round_info.get('round', 0),
+            'winner_code': event.get('winnerCode'),
+            'status_code': status_info.get('code'),
+            'status_description': status_info.get('description'),
+            'start_timestamp': start_timestamp,
+        },
+        'sets': parse_sets(event),
+        'statistics': None,
+    }
+
+
+def attach_statistics(parsed, stats_data):
+    """
+    Добавляет к разобранному событию строки статистики (если API их вернул).
+    """
+    if stats_data:
+        parsed['statistics'] = parse_statistics(stats_data)
+    return parsed
+
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def match_result(winner_code, is_home):
+    # winner_code: 1 - победили хозяева, 2 - гости, иначе результата нет
+    if winner_code not in (1, 2):
+        return None
+    return winner_code == (1 if is_home else 2)
+
+
+def rating_result(winner_code, start_timestamp):
+    # То, что из матча берут рейтинги (ratings.iter_settled_matches): победитель и место в хронологии.
+    # Матч без победителя в рейтинги не входит
+    if winner_code not in (1, 2):
+        return None
+    return winner_code, start_timestamp
+
+
+def load_results(event_ids):
+    """
+    Сохранённые результаты матчей для сравнения с импортом:
+    {event_id: (rating_result, result_changed_at)}, одним запросом __in на пачку.
+    """
+    event_ids = list(event_ids)
+    results = {}
+    for start in range(0, len(event_ids), IN_QUERY_CHUNK):
+        for event_id, winner_code, start_timestamp, result_changed_at in Match.objects.filter(
+            event_id__in=event_ids[start:start + IN_QUERY_CHUNK]
+        ).values_list('event_id', 'winner_code', 'start_timestamp', 'result_changed_at'):
+            results[event_id] = rating_result(winner_code, start_timestamp), result_changed_at
+    return results
+
+
+def send_imported(match_ids, team_ids, player_ids, tournament_ids=(), changed=None, live=False):
+    """
+    Сообщает подписчикам (кэшу страниц, поисковому индексу), какие объекты только что записаны.
+    changed - {модель: id}, у каких справочных строк записаны собственные поля (создание, новое имя).
+    live - записаны только идущие матчи (см. objects_imported).
+    """
+    for model, ids in (
+        (Match, match_ids), (Team, team_ids), (Player, player_ids), (Tournament, tournament_ids)
+    ):
+        if ids:
+            kwargs = {} if changed is None else {'changed': sorted(changed.get(model, ()))}
+            if live:
+                kwargs['live'] = True
+            objects_imported.send(sender=model, ids=sorted(ids), **kwargs)
+
+
+# ---- Построчное сохранение (исходный путь через get_or_create) ----
+
+def get_or_create_id(identity, model, key, lookup, defaults, created_ids=None):
+    """
+    id строки из карты identity, а если её там нет - через get_or_create.
+    Если карта полна (IdentityMap.complete), промах значит новую строку: она создаётся
+    сразу, без SELECT; get_or_create остаётся на случай, если строку успел создать кто-то другой.
+    Строки без ключа из API (key=None) не кэшируются. id созданной строки добавляется в created_ids.
+    """
+    cacheable = identity is not None and key is not None
+    pk = identity.get(model, key) if cacheable else None
+    if pk is None:
+        obj = None
+        if cacheable and identity.complete(model):
+            try:
+                with transaction.atomic():
+                    obj, created = model.objects.create(**lookup, **defaults), True
+            except IntegrityError:
+                pass
+        if obj is None:
+            obj, created = model.objects.get_or_create(**lookup, defaults=defaults)
+        pk = obj.id
+        if created and created_ids is not None:
+            created_ids.add(pk)
+        if cacheable:
+            identity.put(model, key, pk)
+    return pk
+
+
+def save_team_rows(team, player_ids, identity=None, created=None):
+    """
+    Сохраняет команду и её игроков, возвращает (id команды, id игроков этого события).
+    Состав, уже связанный в identity, повторно не добавляется.
+    id созданных строк добавляются в created ({модель: множество id}).
+    """
+    created = created if created is not None else defaultdict(set)
+    team_id = get_or_create_id(
+        identity, Team, team['api_id'],
+        {'api_id': team['api_id']},
+        {'name': team['name'], 'slug': team['slug']},
+        created[Team],
+    )
+    team_player_ids = []
+    for player in team['players']:
+        team_player_ids.append(get_or_create_id(
+            identity, Player, player['api_id'],
+            {'api_id': player['api_id']},
+            {
+                'name': player['name'],
+                'slug': player['slug'],
+                'short_name': player['short_name'],
+                'country_name': player['country_name'],
+                'country_alpha2': player['country_alpha2'],
+            },
+            created[Player],
+        ))
+    if identity is None or not identity.has_roster(team_id, team_player_ids):
+        Team(id=team_id).players.add(*team_player_ids)
+        if identity is not None:
+            identity.add_roster(team_id, team_player_ids)
+    player_ids.update(team_player_ids)
+    return team_id, team_player_ids
+
+
+def save_event_rows(parsed, identity=None, timer=None):
+    """
+    Сохраняет одно событие по одной строке за раз (get_or_create на каждую модель).
+    Оставлено для сравнения в бенчмарке и как запасной режим (--per-row).
+    С картой identity (IdentityMap) справочные сущности повторно не запрашиваются,
+    в timer (StageTimer) копится время этапов записи.
+    """
+    lap = (timer or StageTimer()).laps()
+    if identity is not None:
+        identity.warm()
+    created = defaultdict(set)
+
+    category = parsed['category']
+    category_id = get_or_create_id(
+        identity, Category, category['slug'],
+        {'slug': category['slug']},
+        {'name': category['name']},
+    )
+
+    ut = parsed['unique_tournament']
+    unique_tournament_id = get_or_create_id(
+        identity, UniqueTournament, ut['slug'],
+        {'slug': ut['slug']},
+        {
+            'name': ut['name'],
+            'category_id': category_id,
+            'groundType': ut['groundType'],
+        },
+    )
+
+    tournament = parsed['tournament']
+    tournament_id = get_or_create_id(
+        identity, Tournament, tournament['api_id'],
+        {'slug': tournament['slug'], 'api_id': tournament['api_id']},
+        {
+            'name': tournament['name'],
+            'category_id': category_id,
+            'unique_tournament_id': unique_tournament_id,
+            'priority': tournament['priority'],
+        },
+        created[Tournament],
+    )
+
+    season = parsed['season']
+    season_id = get_or_create_id(
+        identity, Season, season['api_id'],
+        {'api_id': season['api_id']},
+        {'name': season['name'], 'year': season['year']},
+    )
+
+    player_ids = set()
+    home_team_id, home_player_ids = save_team_rows(parsed['home_team'], player_ids, identity, created)
+    away_team_id, away_player_ids = save_team_rows(parsed['away_team'], player_ids, identity, created)
+    lap('resolve')
+
+    match = parsed['match']
+    match_date = to_datetime(match['start_timestamp'])
+    match_obj, created_match = Match.objects.get_or_create(
+        event_id=match['event_id'],
+        defaults={
+            'firstToServe': match['firstToServe'],
+            'tournament_id': tournament_id,
+            'season_id': season_id,
+            'roundName': match['roundName'],
+            'roundType': match['roundType'],
+            'home_team_id': home_team_id,
+            'away_team_id': away_team_id,
+            'winner_code': match['winner_code'],
+            'status_code': match['status_code'],
+            'status_description': match['status_description'],
+            'start_timestamp': match_date,
+            'result_changed_at': (
+                datetime.now(timezone.utc) if rating_result(match['winner_code'], match_date) else None
+            ),
+        }
+    )
+    # Если уже существовал, обновим данные (на случай изменения счёта, статуса и т.п.)
+    if not created_match:
+        if rating_result(match['winner_code'], match_date) != rating_result(
+            match_obj.winner_code, match_obj.start_timestamp
+        ):
+            match_obj.result_changed_at = datetime.now(timezone.utc)
+        match_obj.winner_code = match['winner_code']
+        match_obj.status_code = match['status_code']
+        match_obj.status_description = match['status_description']
+        match_obj.start_timestamp = match_date
+        match_obj.save()
+    lap('match_upsert')
+
+    # Связи игрок → матч и разница их вкладов в PlayerRollup
+    old_links = load_links([match_obj.id])
+    new_links = []
+    for team_id, team_player_ids, is_home in (
+        (home_team_id, home_player_ids, True), (away_team_id, away_player_ids, False)
+    ):
+        for player_id in team_player_ids:
+            link = PlayerMatch(
+                player_id=player_id,
+                match=match_obj,
+                team_id=team_id,
+                is_home=is_home,
+                won=match_result(match['winner_code'], is_home),
+                start_timestamp=match_date,
+            )
+            set_contribution(
+                link, season_id, ut['groundType'], parsed['sets'], parsed['statistics'],
+                old_links.get((player_id, match_obj.id)),
+            )
+            PlayerMatch.objects.update_or_create(
+                player_id=player_id,
+                match=match_obj,
+                defaults={
+                    attname: getattr(link, attname)
+                    for attname in (PlayerMatch._meta.get_field(field).attname for field in LINK_UPDATE_FIELDS)
+                },
+            )
+            new_links.append(link)
+    apply_rollup_deltas(old_links.values(), new_links)
+
+    update_head_to_head({
+        pair: [entry] for pair, entry in pair_entries(
+            match_obj.id, match['start_timestamp'], match['winner_code'],
+            home_player_ids, away_player_ids, parsed['sets'],
+        ).items()
+    })
+    lap('player_links')
+
+    for set_number, hs, as_ in parsed['sets']:
+        MatchSet.objects.update_or_create(
+            match=match_obj,
+            set_number=set_number,
+            defaults={'home_score': hs, 'away_score': as_}
+        )
+
+    if parsed['statistics'] is None:
+        lap('sets_stats')
+        send_imported({match_obj.id}, {home_team_id, away_team_id}, player_ids, {tournament_id}, created)
+        return match_obj
+
+    for row in parsed['statistics']:
+        MatchStatistics.objects.update_or_create(
+            match=match_obj,
+            period=row['period'],
+            group_name=row['group_name'],
+            stat_name=row['stat_name'],
+            defaults={
+                'home_value': row['home_value'],
+                'away_value': row['away_value'],
+                'home_Total': row['home_Total'],
+                'away_Total': row['away_Total'],
+                'api_key': row['api_key'],
+            }
+        )
+    match_obj.statistics_layout = build_statistics_layout(parsed['statistics'])
+    match_obj.save(update_fields=['statistics_layout', 'updated_at'])
+    lap('sets_stats')
+    send_imported({match_obj.id}, {home_team_id, away_team_id}, player_ids, {tournament_id}, created)
+    return match_obj
+
+
+# ---- Пакетное сохранение (bulk upsert) ----
+
+def resolve_ids(model, field, keys):
+    """
+    Возвращает {значение ключа: id} одним запросом __in на каждую пачку ключей.
+    """
+    keys = list(keys)
+    ids = {}
+    for start in range(0, len(keys), IN_QUERY_CHUNK):
+        chunk = keys[start:start + IN_QUERY_CHUNK]
+        ids.update(model.objects.filter(**{f"{field}__in": chunk}).values_list(field, 'id'))
+    return ids
+
+
+class BulkMatchWriter:
+    """
+    Накапливает разобранные события и записывает их пачками:
+    на каждую модель - один bulk_create(update_conflicts=True) и один запрос __in за id,
+    всё внутри одной транзакции. После фиксации транзакции отправляется objects_imported.
+    Справочные сущности, уже известные карте identity с теми же полями, не пишутся
+    и не запрашиваются повторно. Время этапов записи копится в timer (StageTimer).
+    """
+
+    def __init__(self, batch_size=200, identity=None, timer=None):
+        self.batch_size = batch_size
+        self.identity = identity if identity is not None else IdentityMap()
+        self.timer = timer if timer is not None else StageTimer()
+        self.pending = []
+        self.changed = defaultdict(set)  # {модель: id справочных строк, записанных в текущей пачке}
+        self.rows_written = 0
+        self.events_written = 0
+
+    def add(self, parsed):
+        self.pending.append(parsed)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self, live=False):
+        """
+        Записывает накопленные события. live=True - все они идущие матчи (см. objects_imported).
+        """
+        if not self.pending:
+            return
+        events = self.pending
+        self.pending = []
+        self.changed = defaultdict(set)
+        try:
+            with transaction.atomic():
+                written = self.write(events)
+                written_at = time.perf_counter()
+            self.timer.add('commit', time.perf_counter() - written_at, len(events))
+        except Exception:
+            # id из откатившейся транзакции в карте оставлять нельзя
+            self.identity.clear()
+            raise
+        self.events_written += len(events)
+        send_imported(*written, changed=self.changed, live=live)
+
+    def upsert(self, model, objs, unique_fields, update_fields):
+        if not objs:
+            return
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        self.rows_written += len(objs)
+
+    def sync(self, model, objs, update_fields):
+        """
+        Upsert справочной модели: objs - {ключ из API: несохранённый объект}.
+        Пишутся и запрашиваются только строки, которых нет в карте или у которых
+        изменились поля. Возвращает {ключ: id}.
+        """
+        key_field = REFERENCE_MODELS[model][0]
+        ids = {}
+        missing = {}
+        for key, obj in objs.items():
+            signature = self.identity.signature(model, obj)
+            pk = self.identity.get(model, key, signature)
+            if pk is None:
+                missing[key] = signature
+            else:
+                ids[key] = pk
+        self.upsert(model, [objs[key] for key in missing], [key_field], update_fields)
+        for key, pk in resolve_ids(model, key_field, missing).items():
+            self.identity.put(model, key, pk, missing[key])
+            ids[key] = pk
+            self.changed[model].add(pk)
+        return ids
+
+    def write(self, events):
+        lap = self.timer.laps(len(events))
+        self.identity.warm()
+
+        # 3) Категории
+        categories = {
+            e['category']['slug']: Category(slug=e['category']['slug'], name=e['category']['name'])
+            for e in events
+        }
+        category_ids = self.sync(Category, categories, ['name'])
+
+        # 4) UniqueTournament
+        unique_tournaments = {}
+        for e in events:
+            ut = e['unique_tournament']
+            unique_tournaments[ut['slug']] = UniqueTournament(
+                slug=ut['slug'],
+                name=ut['name'],
+                groundType=ut['groundType'],
+                category_id=category_ids[e['category']['slug']],
+            )
+        unique_tournament_ids = self.sync(
+            UniqueTournament, unique_tournaments, ['name', 'groundType', 'category'],
+        )
+
+        # 5) Турниры. Без api_id конфликт по уникальному ключу не сработает,
+        #    поэтому такие (редкие) турниры идут через get_or_create.
+        tournaments = {}
+        tournament_ids = {}
+        for e in events:
+            t = e['tournament']
+            fields = {
+                'name': t['name'],
+                'category_id': category_ids[e['category']['slug']],
+                'unique_tournament_id': unique_tournament_ids[e['unique_tournament']['slug']],
+                'priority': t['priority'],
+            }
+            if t['api_id'] is None:
+                obj, created = Tournament.objects.get_or_create(slug=t['slug'], api_id=None, defaults=fields)
+                tournament_ids[(t['slug'], None)] = obj.id
+                if created:
+                    self.changed[Tournament].add(obj.id)
+                continue
+            tournaments[t['api_id']] = Tournament(slug=t['slug'], api_id=t['api_id'], **fields)
+        synced = self.sync(
+            Tournament, tournaments, ['name', 'slug', 'category', 'unique_tournament', 'priority'],
+        )
+        for api_id, pk in synced.items():
+            tournament_ids[(tournaments[api_id].slug, api_id)] = pk
+
+        # 6) Сезоны
+        seasons = {
+            e['season']['api_id']: Season(
+                api_id=e['season']['api_id'], name=e['season']['name'], year=e['season']['year']
+            )
+            for e in events
+        }
+        season_ids = self.sync(Season, seasons, ['name', 'year'])
+
+        # 7) Игроки и команды
+        teams = {}
+        players = {}
+        for e in events:
+            for team in (e['home_team'], e['away_team']):
+                teams[team['api_id']] = team
+                for p in team['players']:
+                    players[p['api_id']] = Player(**p)
+        player_ids = self.sync(
+            Player, players, ['name', 'slug', 'short_name', 'country_name', 'country_alpha2', 'updated_at'],
+        )
+        team_ids = self.sync(
+            Team,
+            {api_id: Team(api_id=api_id, name=t['name'], slug=t['slug']) for api_id, t in teams.items()},
+            ['name', 'slug', 'updated_at'],
+        )
+
+        links = set()
+        for api_id, team in teams.items():
+            team_id = team_ids[api_id]
+            roster = [player_ids[p['api_id']] for p in team['players']]
+            if not self.identity.has_roster(team_id, roster):
+                links.update((team_id, player_id) for player_id in roster)
+                self.identity.add_roster(team_id, roster)
+        if links:
+            Team.players.through.objects.bulk_create(
+                [Team.players.through(team_id=t, player_id=p) for t, p in links],
+                ignore_conflicts=True,
+            )
+        lap('resolve')
+
+        # 8) Матчи. Сгруппированную статистику перезаписываем только тем матчам,
+        #    для которых статистика пришла в этот раз.
+        matches = {}
+        matches_with_statistics = {}
+        for e in events:
+            m = e['match']
+            t = e['tournament']
+            target = matches if e['statistics'] is None else matches_with_statistics
+            target[m['event_id']] = Match(
+                event_id=m['event_id'],
+                firstToServe=m['firstToServe'],
+                tournament_id=tournament_ids[(t['slug'], t['api_id'])],
+                season_id=season_ids[e['season']['api_id']],
+                roundName=m['roundName'],
+                roundType=m['roundType'],
+                home_team_id=team_ids[e['home_team']['api_id']],
+                away_team_id=team_ids[e['away_team']['api_id']],
+                winner_code=m['winner_code'],
+                status_code=m['status_code'],
+                status_description=m['status_description'],
+                start_timestamp=to_datetime(m['start_timestamp']),
+                statistics_layout=None if e['statistics'] is None else build_statistics_layout(e['statistics']),
+            )
+        # result_changed_at сдвигается, только если изменилось то, что берут рейтинги:
+        # повторный импорт прошлых дней с тем же результатом не заставляет их пересчитываться заново
+        stored_results = load_results([e['match']['event_id'] for e in events])
+        now = datetime.now(timezone.utc)
+        for target in (matches, matches_with_statistics):
+            for event_id, match_obj in target.items():
+                result = rating_result(match_obj.winner_code, match_obj.start_timestamp)
+                stored_result, changed_at = stored_results.get(event_id, (None, None))
+                match_obj.result_changed_at = changed_at if result == stored_result else now
+        match_update_fields = [
+            'winner_code', 'status_code', 'status_description', 'start_timestamp', 'updated_at', 'result_changed_at',
+        ]
+        self.upsert(Match, list(matches.values()), ['event_id'], match_update_fields)
+        self.upsert(
+            Match, list(matches_with_statistics.values()),
+            ['event_id'], match_update_fields + ['statistics_layout'],
+        )
+        match_ids = resolve_ids(Match, 'event_id', [e['match']['event_id'] for e in events])
+        lap('match_upsert')
+
+        # Связи игрок → матч для истории игрока и разница их вкладов в PlayerRollup
+        old_links = load_links(match_ids.values())
+        player_links = {}
+        for e in events:
+            m = e['match']
+            match_id = match_ids[m['event_id']]
+            for team, is_home in ((e['home_team'], True), (e['away_team'], False)):
+                for p in team['players']:
+                    player_id = player_ids[p['api_id']]
+                    link = PlayerMatch(
+                        player_id=player_id,
+                        match_id=match_id,
+                        team_id=team_ids[team['api_id']],
+                        is_home=is_home,
+                        won=match_result(m['winner_code'], is_home),
+                        start_timestamp=to_datetime(m['start_timestamp']),
+                    )
+                    player_links[(player_id, match_id)] = set_contribution(
+                        link, season_ids[e['season']['api_id']], e['unique_tournament']['groundType'],
+                        e['sets'], e['statistics'], old_links.get((player_id, match_id)),
+                    )
+        apply_rollup_deltas(old_links.values(), player_links.values())
+        self.upsert(PlayerMatch, list(player_links.values()), ['player', 'match'], LINK_UPDATE_FIELDS)
+
+        # Индекс личных встреч
+        head_to_head = defaultdict(list)
+        for e in events:
+            m = e['match']
+            entries = pair_entries(
+                match_ids[m['event_id']], m['start_timestamp'], m['winner_code'],
+                [player_ids[p['api_id']] for p in e['home_team']['players']],
+                [player_ids[p['api_id']] for p in e['away_team']['players']],
+                e['sets'],
+            )
+            for pair, entry in entries.items():
+                head_to_head[pair].append(entry)
+        update_head_to_head(head_to_head)
+        lap('player_links')
+
+        # 9) Сеты и 10) статистика
+        sets = {}
+        statistics = {}
+        for e in events:
+            match_id = match_ids[e['match']['event_id']]
+            for set_number, hs, as_ in e['sets']:
+                sets[(match_id, set_number)] = MatchSet(
+                    match_id=match_id, set_number=set_number, home_score=hs, away_score=as_
+                )
+            for row in e['statistics'] or []:
+                key = (match_id, row['period'], row['group_name'], row['stat_name'])
+                statistics[key] = MatchStatistics(match_id=match_id, **row)
+        self.upsert(
+            MatchSet, list(sets.values()),
+            ['match', 'set_number'], ['home_score', 'away_score'],
+        )
+        self.upsert(
+            MatchStatistics, list(statistics.values()),
+            ['match', 'period', 'group_name', 'stat_name'],
+            ['home_value', 'away_value', 'home_Total', 'away_Total', 'api_key'],
+        )
+        lap('sets_stats')
+        return (
+            set(match_ids.values()), set(team_ids.values()), set(player_ids.values()),
+            set(tournament_ids.values()),
+        )
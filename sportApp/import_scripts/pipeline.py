@@ -0,0 +1,288 @@
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+
+import django
+from django.db import connections
+
+from sportApp.import_scripts.identity_map import IdentityMap
+from sportApp.import_scripts.incremental import load_stored_signatures, select_changed
+from sportApp.import_scripts.match_import import (
+    attach_statistics, is_tracked_event, parse_event, save_event_rows
+)
+from sportApp.import_scripts.profiling import ImportProfiler, StageTimer, profiled
+from sportApp.import_scripts.sofascore_client import FINISHED_STATUS_CODE, SofascoreClient
+from sportApp.statistics_store import batched_appends, flush_appends
+
+
+def fetch_statistics(client, parsed, timer=None):
+    match = parsed['match']
+    with (timer or StageTimer()).stage('stats_fetch'):
+        return client.event_statistics(match['event_id'], match['status_code'] == FINISHED_STATUS_CODE)
+
+
+def parse_day_events(events, tournament_filter='itf'):
+    """
+    Отбирает нужные турниры из событий scheduled-events и разбирает их.
+    events может быть потоком (iter_scheduled_events) - остальные события сразу отбрасываются.
+    """
+    parsed_events = []
+    for event in events:
+        if not is_tracked_event(event, tournament_filter):
+            continue
+        parsed = parse_event(event)
+        if parsed is not None:
+            parsed_events.append(parsed)
+    return parsed_events
+
+
+def fetch_day_events(client, day, tournament_filter='itf', timer=None):
+    """
+    Потоково качает и разбирает день: None, если API не ответил.
+    """
+    timer = timer or StageTimer()
+    with timer.stage('day_fetch'):
+        events = client.iter_scheduled_events(day)
+    if events is None:
+        return None
+    started = time.perf_counter()
+    parsed_events = parse_day_events(events, tournament_filter)
+    timer.add('day_parse', time.perf_counter() - started, len(parsed_events))
+    return parsed_events
+
+
+def fetch_day(client, day, tournament_filter='itf', stored=None, timer=None, profiler=None):
+    """
+    Загружает и разбирает один день целиком, статистику качает параллельно.
+    Если передано stored (см. load_stored_signatures), неизменившиеся матчи пропускаются.
+    Возвращает список разобранных событий (без обращения к БД).
+    """
+    timer = timer or StageTimer()
+    parsed_events = fetch_day_events(client, day, tournament_filter, timer)
+    if parsed_events is None:
+        return []
+    if stored is not None:
+        parsed_events = select_changed(parsed_events, stored)
+
+    def fetch(parsed):
+        with profiled(profiler):
+            return fetch_statistics(client, parsed, timer)
+
+    with ThreadPoolExecutor(max_workers=client.max_workers) as pool:
+        stats = pool.map(fetch, parsed_events)
+        for parsed, stats_data in zip(parsed_events, stats):
+            with timer.stage('stats_parse'):
+                attach_statistics(parsed, stats_data)
+    return parsed_events
+
+
+_worker_client = None
+
+
+def fetch_day_in_worker(day, client_options, tournament_filter, stored=None, profile=False):
+    """
+    Загрузка дня в процессе-воркере. Кроме событий возвращает время этапов (StageTimer.snapshot),
+    время дня по часам и, если profile, результаты cProfile - родитель складывает их со своими.
+    """
+    # Клиент (и его пул соединений) живёт всё время жизни процесса-воркера
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = SofascoreClient(**client_options)
+    timer = StageTimer()
+    profiler = ImportProfiler() if profile else None
+    started = time.perf_counter()
+    with profiled(profiler):
+        parsed_events = fetch_day(_worker_client, day, tournament_filter, stored, timer, profiler)
+    return day, parsed_events, timer.snapshot(), time.perf_counter() - started, profiler.collect() if profiler else []
+
+
+def day_summary(day, matches, with_statistics, elapsed, timer):
+    return (
+        f"Imported {day:%Y-%m-%d}: {matches} matches ({with_statistics} with statistics) "
+        f"in {elapsed:.2f}s | {timer.format()}"
+    )
+
+
+class ImportPipeline:
+    """
+    Конвейер импорта:
+    - загрузки (список матчей за день и статистика каждого матча) выполняются
+      параллельно в пуле из client.max_workers потоков; список матчей разбирается
+      потоково там же, в очередь попадают только отобранные события;
+    - запись в БД делает один поток-писатель (тот, кто вызвал run),
+      получающий готовые ответы через очередь.
+    Если writer не передан, события сохраняются по одной строке (save_event_rows)
+    с картой справочных сущностей identity на весь запуск.
+    В режиме incremental матчи без изменений статуса и счёта не качаются и не пишутся.
+    Время этапов копится в timer (по умолчанию - timer писателя), после каждого дня
+    печатается сводка: загрузки этого дня и запись с прошлой сводки.
+    С profiler (ImportProfiler) задачи загрузок профилируются cProfile.
+    """
+
+    def __init__(self, client, writer=None, tournament_filter='itf', incremental=False, identity=None,
+                 timer=None, profiler=None):
+        self.client = client
+        self.writer = writer
+        self.identity = identity if identity is not None else IdentityMap()
+        self.tournament_filter = tournament_filter
+        self.incremental = incremental
+        self.timer = timer if timer is not None else writer.timer if writer else StageTimer()
+        self.profiler = profiler
+        self.results = queue.Queue()
+        self.pending = 0
+        self.remaining = {}
+        self.day_timers = {}
+        self.day_started = {}
+        self.day_counts = {}
+        self.write_mark = self.timer.snapshot()
+
+    def submit(self, pool, kind, day, payload, fetch, *args):
+        def task():
+            try:
+                with profiled(self.profiler):
+                    data = fetch(*args)
+            except Exception as e:
+                print(f"Unexpected error while fetching {kind} for {day:%Y-%m-%d}: {e}")
+                data = None
+            self.results.put((kind, day, payload, data))
+
+        self.pending += 1
+        pool.submit(task)
+
+    def fetch_day(self, day):
+        self.day_started[day] = time.perf_counter()
+        return fetch_day_events(self.client, day, self.tournament_filter, self.day_timers[day])
+
+    def run(self, days):
+        # Хранилище статистики дописывается по дню, а не по событию построчного режима
+        with batched_appends(), ThreadPoolExecutor(max_workers=self.client.max_workers) as pool:
+            for day in days:
+                print(f"Fetching data for {day:%Y-%m-%d}...")
+                self.day_timers[day] = StageTimer()
+                self.submit(pool, 'day', day, None, self.fetch_day, day)
+
+            while self.pending:
+                kind, day, payload, data = self.results.get()
+                self.pending -= 1
+                if kind == 'day':
+                    self.handle_day(pool, day, data)
+                else:
+                    self.handle_statistics(day, payload, data)
+
+        if self.writer:
+            self.writer.flush()
+
+    def handle_day(self, pool, day, parsed_events):
+        if parsed_events is None:
+            self.timer.merge(self.day_timers.pop(day))
+            return
+        if self.incremental:
+            total = len(parsed_events)
+            parsed_events = select_changed(parsed_events, load_stored_signatures(day))
+            print(f"{day:%Y-%m-%d}: {total - len(parsed_events)} of {total} matches unchanged")
+
+        self.remaining[day] = len(parsed_events)
+        self.day_counts[day] = [len(parsed_events), 0]
+        for parsed in parsed_events:
+            self.submit(pool, 'statistics', day, parsed, fetch_statistics, self.client, parsed, self.day_timers[day])
+        self.finish_day_if_done(day)
+
+    def handle_statistics(self, day, parsed, stats_data):
+        with self.day_timers[day].stage('stats_parse'):
+            attach_statistics(parsed, stats_data)
+        if stats_data:
+            self.day_counts[day][1] += 1
+        if self.writer:
+            self.writer.add(parsed)
+        else:
+            save_event_rows(parsed, self.identity, self.timer)
+        self.remaining[day] -= 1
+        self.finish_day_if_done(day)
+
+    def finish_day_if_done(self, day):
+        if self.remaining[day]:
+            return
+        # День полностью получен - пишем его отдельной транзакцией
+        if self.writer:
+            self.writer.flush()
+        flush_appends()
+        day_timer = self.day_timers.pop(day)
+        # Между сводками в timer запуска попадает только запись
+        writes = self.timer.since(self.write_mark)
+        self.timer.merge(day_timer)
+        self.write_mark = self.timer.snapshot()
+        day_timer.merge(writes)
+        matches, with_statistics = self.day_counts[day]
+        print(day_summary(day, matches, with_statistics, time.perf_counter() - self.day_started[day], day_timer))
+
+
+class ShardedImport:
+    """
+    Импорт большого диапазона дат в нескольких процессах:
+    каждый процесс-воркер сам качает и разбирает свои дни (fetch_day),
+    а запись в БД выполняет только родительский процесс - по дню за транзакцию.
+    В режиме incremental состояние сохранённых матчей читает родитель и передаёт воркерам.
+    Время этапов и профили воркеров возвращаются вместе с днём и складываются в timer и profiler.
+    """
+
+    def __init__(self, client_options, writer=None, tournament_filter='itf', workers=2, incremental=False,
+                 identity=None, timer=None, profiler=None):
+        self.client_options = client_options
+        self.writer = writer
+        self.identity = identity if identity is not None else IdentityMap()
+        self.tournament_filter = tournament_filter
+        self.workers = workers
+        self.incremental = incremental
+        self.timer = timer if timer is not None else writer.timer if writer else StageTimer()
+        self.profiler = profiler
+
+    def iter_days(self, days):
+        """
+        Результаты fetch_day_in_worker по мере готовности. Одновременно в пуле не больше
+        2 * workers дней, поэтому разобранные дни не копятся в родителе, пока он пишет предыдущие
+        (как rebuild_rollups.iter_chunk_results).
+        """
+        remaining = iter(days)
+
+        def submit(pool, count):
+            futures = set()
+            for day in islice(remaining, count):
+                stored = load_stored_signatures(day) if self.incremental else None
+                # Соединения с БД не должны переезжать в дочерние процессы,
+                # а пул может запустить новый процесс при любой отправке задачи
+                connections.close_all()
+                futures.add(pool.submit(
+                    fetch_day_in_worker, day, self.client_options, self.tournament_filter, stored,
+                    self.profiler is not None,
+                ))
+            return futures
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup) as pool:
+            running = submit(pool, 2 * self.workers)
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                running |= submit(pool, len(done))
+
+    def run(self, days):
+        for day, parsed_events, fetch_totals, fetch_elapsed, profiles in self.iter_days(days):
+            for stats in profiles:
+                self.profiler.add(stats)
+            write_mark = self.timer.snapshot()
+            started = time.perf_counter()
+            with batched_appends():
+                for parsed in parsed_events:
+                    if self.writer:
+                        self.writer.add(parsed)
+                    else:
+                        save_event_rows(parsed, self.identity, self.timer)
+                if self.writer:
+                    self.writer.flush()
+            day_timer = StageTimer(fetch_totals)
+            day_timer.merge(self.timer.since(write_mark))
+            self.timer.merge(fetch_totals)
+            with_statistics = sum(parsed['statistics'] is not None for parsed in parsed_events)
+            elapsed = fetch_elapsed + time.perf_counter() - started
+            print(day_summary(day, len(parsed_events), with_statistics, elapsed, day_timer))
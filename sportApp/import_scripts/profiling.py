@@ -0,0 +1,161 @@
+import cProfile
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Этапы импорта в порядке выполнения (в этом порядке они и печатаются)
+STAGES = (
+    'day_fetch',     # запрос расписания дня: до начала тела ответа или чтение из кэша
+    'day_parse',     # чтение тела, потоковый разбор JSON, отбор турниров и parse_event
+    'stats_fetch',   # запросы статистики матчей вместе с декодированием JSON
+    'stats_parse',   # parse_statistics
+    'resolve',       # шаги 3-7: категории, турниры, сезоны, игроки и команды
+    'match_upsert',  # шаг 8: матчи
+    'player_links',  # связи игрок-матч, сводки PlayerRollup и личные встречи
+    'sets_stats',    # шаги 9-10: сеты и статистика
+    'commit',        # фиксация транзакции пачки
+)
+
+
+class StageTimer:
+    """
+    Суммарное время и число обработанных элементов по этапам импорта: {этап: [секунды, штук]}.
+    Потокобезопасен. Загрузки идут в нескольких потоках, поэтому сумма их этапов
+    может быть больше времени по часам.
+    """
+
+    def __init__(self, totals=None):
+        self.lock = threading.Lock()
+        self.totals = {name: list(value) for name, value in (totals or {}).items()}
+
+    def add(self, name, seconds, count=1):
+        with self.lock:
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+
+    @contextmanager
+    def stage(self, name, count=1):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, count)
+
+    def laps(self, count=1):
+        """
+        Замер подряд идущих этапов без вложенных блоков: lap('resolve') записывает
+        время, прошедшее с предыдущего вызова (или с вызова laps).
+        """
+        started = time.perf_counter()
+
+        def lap(name):
+            nonlocal started
+            now = time.perf_counter()
+            self.add(name, now - started, count)
+            started = now
+        return lap
+
+    def merge(self, other):
+        # other - StageTimer или его totals (например, вернувшиеся из процесса-воркера)
+        totals = other.snapshot() if isinstance(other, StageTimer) else other
+        for name, (seconds, count) in totals.items():
+            self.add(name, seconds, count)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: list(value) for name, value in self.totals.items()}
+
+    def since(self, snapshot):
+        """
+        Новый StageTimer с тем, что добавилось после snapshot().
+        """
+        delta = {}
+        for name, (seconds, count) in self.snapshot().items():
+            old_seconds, old_count = snapshot.get(name, (0.0, 0))
+            if count != old_count:
+                delta[name] = [seconds - old_seconds, count - old_count]
+        return StageTimer(delta)
+
+    def format(self):
+        order = {name: n for n, name in enumerate(STAGES)}
+        return ", ".join(
+            f"{name} {seconds:.2f}s ({count})"
+            for name, (seconds, count) in sorted(self.snapshot().items(), key=lambda item: order.get(item[0], len(order)))
+        )
+
+
+class StatsHolder:
+    # pstats.Stats принимает объект с create_stats() и stats - так добавляются
+    # результаты cProfile из других потоков и процессов
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ImportProfiler:
+    """
+    cProfile на весь запуск импорта. cProfile видит только свой поток, поэтому у каждого
+    потока свой Profile, который включается на время profile(); результаты процессов-воркеров
+    добавляются через add. В dump всё складывается в один pstats.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profiles = []
+        self.parts = []
+
+    @contextmanager
+    def profile(self):
+        local = self.local
+        if getattr(local, 'profile', None) is None:
+            local.profile = cProfile.Profile()
+            local.depth = 0
+            with self.lock:
+                self.profiles.append(local.profile)
+        if local.depth == 0:
+            local.profile.enable()
+        local.depth += 1
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            if local.depth == 0:
+                local.profile.disable()
+
+    def add(self, stats):
+        with self.lock:
+            self.parts.append(stats)
+
+    def collect(self):
+        """
+        Словари stats cProfile всех потоков и добавленных частей (их можно передать между процессами).
+        """
+        with self.lock:
+            parts = list(self.parts)
+            for profile in self.profiles:
+                profile.create_stats()
+                parts.append(profile.stats)
+        return parts
+
+    def dump(self, path):
+        """
+        Пишет объединённую статистику в файл pstats и возвращает pstats.Stats (None, если пусто).
+        """
+        parts = [part for part in self.collect() if part]
+        if not parts:
+            return None
+        stats = pstats.Stats(StatsHolder(parts[0]))
+        for part in parts[1:]:
+            stats.add(StatsHolder(part))
+        stats.dump_stats(path)
+        return stats
+
+
+def profiled(profiler):
+    # Профилирует блок, если профилировщик передан
+    return profiler.profile() if profiler is not None else nullcontext()
@@ -0,0 +1,132 @@
+import gzip
+import io
+import json
+import re
+
+
+def open_dump(path, mode='rt'):
+    """
+    Открывает файл дампа в текстовом режиме. Сжатие определяется по расширению:
+    .gz - gzip, .zst - zstandard (нужен пакет zstandard), иначе - обычный текст.
+    """
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Для дампов .zst установите пакет zstandard: pip install zstandard")
+        raw = open(path, mode.replace('t', '') + 'b')
+        if 'r' in mode:
+            # При дозаписи в файл появляется несколько zstd-фреймов
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class DumpWriter:
+    """
+    Пишет события построчно: один компактный JSON-объект
+    {"event": <событие из scheduled-events>, "statistics": <ответ /statistics или null>} на строку.
+    """
+
+    def __init__(self, path, append=True):
+        self.file = open_dump(path, 'at' if append else 'wt')
+        self.count = 0
+
+    def write(self, event, statistics):
+        record = {'event': event, 'statistics': statistics}
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DumpError(ValueError):
+    """
+    Запись дампа не разбирается: битый JSON или нет нужных ключей. line - номер строки файла,
+    на которой запись начинается.
+    """
+
+    def __init__(self, line, message):
+        super().__init__(f"строка {line}: {message}")
+        self.line = line
+
+
+def dump_record(record):
+    # Пара (событие, статистика) из записи DumpWriter или старого print_matches
+    if not isinstance(record, dict):
+        raise KeyError('event')
+    if 'event' in record:
+        return record['event'], record.get('statistics')
+    statistics = record.get('MATCH STATISTICS')
+    return record['MATCH DATA'], statistics if isinstance(statistics, dict) else None
+
+
+def iter_records(f, pattern=None):
+    """
+    (номер первой строки, запись) из файла. Строка, начинающаяся с "{" и заканчивающаяся "}", -
+    запись DumpWriter. Старый print_matches писал json.dumps(..., indent=4): такая запись занимает
+    много строк и закрывается "}" в начале строки - тогда накопленные строки разбираются целиком.
+    pattern проверяется только у однострочных записей.
+    """
+    decoder = json.JSONDecoder()
+    buffer = []
+    first_line = None
+    for number, line in enumerate(f, start=1):
+        stripped = line.strip()
+        if not buffer:
+            if not stripped:
+                continue
+            if stripped.startswith('{') and stripped.endswith('}'):
+                if pattern and not pattern.search(line):
+                    continue
+                try:
+                    yield number, json.loads(stripped)
+                except json.JSONDecodeError as e:
+                    raise DumpError(number, e.msg)
+                continue
+            first_line = number
+        buffer.append(line)
+        if line.rstrip() != '}':
+            continue
+        text = ''.join(buffer).strip()
+        try:
+            record, end = decoder.raw_decode(text)
+        except json.JSONDecodeError:
+            # "}" в начале строки оказался не концом записи - читаем дальше
+            continue
+        if text[end:].strip():
+            raise DumpError(first_line, "лишние данные после JSON-объекта")
+        yield first_line, record
+        buffer = []
+    if buffer:
+        raise DumpError(first_line, "запись не закончена")
+
+
+def iter_dump(path, prefilter=None):
+    """
+    Построчно читает дамп и отдаёт пары (событие, статистика), не загружая файл целиком.
+    Понимает и старые дампы print_matches: многострочные JSON-объекты с ключами
+    "MATCH DATA" / "MATCH STATISTICS" (см. iter_records).
+    prefilter - подстрока (без учёта регистра), без которой строка пропускается не разбирая JSON,
+    например фильтр турниров: точную проверку всё равно делает is_tracked_event.
+    Нечитаемая запись - DumpError с номером строки.
+    """
+    pattern = re.compile(re.escape(prefilter), re.IGNORECASE) if prefilter else None
+    with open_dump(path, 'rt') as f:
+        for number, record in iter_records(f, pattern):
+            try:
+                yield dump_record(record)
+            except KeyError as e:
+                raise DumpError(number, f"нет ключа {e}")
@@ -0,0 +1,158 @@
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+# TTL для ответов, которые больше никогда не меняются (статистика завершённых матчей)
+FOREVER = math.inf
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+    permanent: bool  # сохранён с ttl=FOREVER
+
+
+class ResponseCache:
+    """
+    Локальный кэш HTTP-ответов на диске.
+    - Тела ответов лежат в blobs/ под именем sha256 содержимого (одинаковые ответы хранятся один раз).
+    - Индекс url -> blob со сроком жизни, ETag/Last-Modified и временем последнего доступа
+      хранится в SQLite, поэтому кэш можно использовать из нескольких потоков и процессов.
+    - Когда суммарный размер превышает max_bytes, удаляются давно не читавшиеся записи (LRU).
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.blobs_dir = self.directory / 'blobs'
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        with self.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " url TEXT PRIMARY KEY,"
+                " content_hash TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " expires_at REAL,"  # NULL - не истекает никогда
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def connection(self):
+        # sqlite3-соединение нельзя делить между потоками, поэтому у каждого потока своё
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.directory / 'index.sqlite3', timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def blob_path(self, content_hash):
+        return self.blobs_dir / content_hash[:2] / content_hash
+
+    def get(self, url):
+        """
+        Возвращает CachedResponse (возможно, устаревший - тогда fresh=False) или None.
+        """
+        conn = self.connection()
+        row = conn.execute(
+            "SELECT content_hash, etag, last_modified, expires_at FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        content_hash, etag, last_modified, expires_at = row
+        try:
+            body = self.blob_path(content_hash).read_bytes()
+        except FileNotFoundError:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            return None
+
+        now = time.time()
+        with conn:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, url))
+        fresh = expires_at is None or expires_at > now
+        return CachedResponse(body, etag, last_modified, fresh, expires_at is None)
+
+    def store(self, url, body, ttl, etag=None, last_modified=None):
+        content_hash = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (url, content_hash, size, etag, last_modified, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, len(body), etag, last_modified, self.expires_at(ttl, now), now),
+            )
+        self.evict()
+
+    def refresh(self, url, ttl):
+        """
+        Продлевает запись после ответа 304 Not Modified.
+        """
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "UPDATE entries SET expires_at = ?, accessed_at = ? WHERE url = ?",
+                (self.expires_at(ttl, now), now, url),
+            )
+
+    @staticmethod
+    def expires_at(ttl, now):
+        return None if ttl == FOREVER else now + ttl
+
+    def total_size(self):
+        # Одинаковое содержимое хранится один раз, поэтому считаем по уникальным blob-ам
+        row = self.connection().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM entries)"
+        ).fetchone()
+        return row[0]
+
+    def evict(self):
+        if not self.max_bytes:
+            return
+        conn = self.connection()
+        excess = self.total_size() - self.max_bytes
+        if excess <= 0:
+            return
+        removed = []
+        with conn:
+            # Сколько url ссылается на каждый blob: место освобождает только удаление последней ссылки
+            references = dict(conn.execute("SELECT content_hash, COUNT(*) FROM entries GROUP BY content_hash"))
+            for url, content_hash, size in conn.execute(
+                "SELECT url, content_hash, size FROM entries ORDER BY accessed_at"
+            ).fetchall():
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                references[content_hash] -= 1
+                if not references[content_hash]:
+                    removed.append(content_hash)
+                    excess -= size
+        for content_hash in removed:
+            # Другой процесс мог успеть сохранить то же содержимое
+            still_used = conn.execute(
+                "SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            if not still_used:
+                self.blob_path(content_hash).unlink(missing_ok=True)
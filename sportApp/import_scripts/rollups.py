@@ -0,0 +1,166 @@
+from collections import defaultdict
+
+from sportApp.models import MatchSet, MatchStatistics, PlayerMatch, PlayerRollup
+
+# Поля вклада, которые хранятся в PlayerMatch и суммируются в PlayerRollup
+STAT_FIELDS = (
+    'sets_won', 'sets_lost', 'aces', 'double_faults',
+    'break_points_saved', 'break_points_faced', 'break_points_converted',
+)
+ROLLUP_FIELDS = ('matches', 'wins', 'losses') + STAT_FIELDS
+# Поля вклада в PlayerMatch (ключ сводки, флаг учёта и показатели)
+CONTRIBUTION_FIELDS = ['season', 'surface', 'counted', *STAT_FIELDS]
+# Порядок значений в кортежах, которые возвращает compute_player_chunk
+LINK_ROW_FIELDS = ('player_id', 'match_id', 'team_id', 'is_home', 'won', 'start_timestamp',
+                   'season_id', 'surface', 'counted', *STAT_FIELDS)
+ROLLUP_ROW_FIELDS = ('player_id', 'season_id', 'surface', *ROLLUP_FIELDS)
+
+# Показатели из MatchStatistics (period ALL, по api_key): поле вклада -> (ключ, брать total)
+STATISTICS_FIELDS = {
+    'aces': ('aces', False),
+    'double_faults': ('doubleFaults', False),
+    'break_points_saved': ('breakPointsSaved', False),
+    'break_points_faced': ('breakPointsSaved', True),   # "5/9": спасено 5 из 9
+    'break_points_converted': ('breakPointsScored', False),
+}
+
+
+def set_contribution(link, season_id, surface, sets, statistics, previous=None):
+    """
+    Заполняет вклад связи игрок-матч (несохранённый или загруженный PlayerMatch).
+    sets - [(номер, очки хозяев, очки гостей)], statistics - строки статистики
+    (словари с period, api_key, home_value...) или None, если статистика не пришла -
+    тогда показатели статистики берутся из previous (прежней версии связи).
+    В сводку попадают только матчи с сезоном и определённым победителем.
+    """
+    link.season_id = season_id
+    link.surface = surface or ''
+    link.counted = season_id is not None and link.won is not None
+
+    link.sets_won = link.sets_lost = 0
+    for _, hs, as_ in sets:
+        own, other = (hs, as_) if link.is_home else (as_, hs)
+        if own > other:
+            link.sets_won += 1
+        elif other > own:
+            link.sets_lost += 1
+
+    if statistics is None:
+        for field in STATISTICS_FIELDS:
+            setattr(link, field, getattr(previous, field) if previous else 0)
+        return link
+    by_key = {row['api_key']: row for row in statistics if row['period'] == 'ALL'}
+    side = 'home' if link.is_home else 'away'
+    for field, (api_key, total) in STATISTICS_FIELDS.items():
+        row = by_key.get(api_key)
+        value = row and row[f"{side}_Total" if total else f"{side}_value"]
+        setattr(link, field, int(value or 0))
+    return link
+
+
+def contribution_values(link):
+    return {
+        'matches': 1,
+        'wins': int(link.won is True),
+        'losses': int(link.won is False),
+        **{field: getattr(link, field) for field in STAT_FIELDS},
+    }
+
+
+def rollup_deltas(old_links, new_links):
+    """
+    Разница сводок от замены old_links на new_links:
+    {(player_id, season_id, surface): {поле: приращение}}.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for links, sign in ((old_links, -1), (new_links, 1)):
+        for link in links:
+            if not link.counted:
+                continue
+            delta = deltas[(link.player_id, link.season_id, link.surface)]
+            for field, value in contribution_values(link).items():
+                delta[field] += sign * value
+    return {key: delta for key, delta in deltas.items() if any(delta.values())}
+
+
+def apply_rollup_deltas(old_links, new_links):
+    """
+    Прибавляет к PlayerRollup разницу вкладов: один запрос за текущими строками
+    и один upsert. Вызывается внутри транзакции записи - писатель один.
+    """
+    deltas = rollup_deltas(old_links, new_links)
+    if not deltas:
+        return 0
+    current = {
+        (r.player_id, r.season_id, r.surface): r
+        for r in PlayerRollup.objects.filter(
+            player_id__in={key[0] for key in deltas},
+            season_id__in={key[1] for key in deltas},
+        )
+    }
+    rollups = []
+    for (player_id, season_id, surface), delta in deltas.items():
+        # Новый объект без pk: upsert идёт по (player, season, surface)
+        base = current.get((player_id, season_id, surface))
+        rollups.append(PlayerRollup(
+            player_id=player_id, season_id=season_id, surface=surface,
+            **{field: (getattr(base, field) if base else 0) + value for field, value in delta.items()},
+        ))
+    PlayerRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['player', 'season', 'surface'],
+        update_fields=list(ROLLUP_FIELDS),
+    )
+    return len(rollups)
+
+
+def load_links(match_ids):
+    """
+    Текущие связи игрок-матч для пачки матчей: {(player_id, match_id): PlayerMatch}.
+    """
+    return {
+        (link.player_id, link.match_id): link
+        for link in PlayerMatch.objects.filter(match_id__in=list(match_ids))
+    }
+
+
+def compute_player_chunk(first_id, last_id):
+    """
+    Пересчитывает с нуля вклады и сводки игроков с id в [first_id, last_id]:
+    возвращает (first_id, last_id, связи PlayerMatch, строки PlayerRollup) - связи и строки
+    простыми кортежами (LINK_ROW_FIELDS и ROLLUP_ROW_FIELDS), чтобы из процесса-воркера
+    передавались значения, а не объекты моделей.
+    Только читает БД, поэтому может выполняться в отдельном процессе.
+    """
+    links = list(
+        PlayerMatch.objects
+        .filter(player_id__gte=first_id, player_id__lte=last_id)
+        .select_related('match__tournament__unique_tournament')
+        .only(
+            'id', 'player_id', 'match_id', 'team_id', 'is_home', 'won', 'start_timestamp',
+            'match__season_id', 'match__tournament__unique_tournament__groundType',
+        )
+    )
+    match_ids = PlayerMatch.objects.filter(player_id__gte=first_id, player_id__lte=last_id).values('match_id')
+    sets = defaultdict(list)
+    for row in MatchSet.objects.filter(match_id__in=match_ids).order_by('set_number').values_list(
+        'match_id', 'set_number', 'home_score', 'away_score'
+    ):
+        sets[row[0]].append(row[1:])
+    api_keys = {api_key for api_key, _ in STATISTICS_FIELDS.values()}
+    statistics = defaultdict(list)
+    for row in MatchStatistics.objects.filter(match_id__in=match_ids, period='ALL', api_key__in=api_keys).values(
+        'match_id', 'period', 'api_key', 'home_value', 'away_value', 'home_Total', 'away_Total'
+    ):
+        statistics[row['match_id']].append(row)
+
+    for link in links:
+        tournament = link.match.tournament
+        surface = tournament.unique_tournament.groundType if tournament else ''
+        set_contribution(link, link.match.season_id, surface, sets[link.match_id], statistics[link.match_id])
+    rollups = [
+        (*key, *(totals[field] for field in ROLLUP_FIELDS))
+        for key, totals in rollup_deltas([], links).items()
+    ]
+    return first_id, last_id, [tuple(getattr(link, field) for field in LINK_ROW_FIELDS) for link in links], rollups
@@ -0,0 +1,220 @@
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from sportApp.import_scripts.json_stream import READ_SIZE, iter_array_items, iter_chunks
+from sportApp.import_scripts.response_cache import FOREVER, ResponseCache
+
+# Коды, при которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Код статуса завершённого матча
+FINISHED_STATUS_CODE = 100
+
+# Сроки жизни закэшированных ответов, в секундах
+LIVE_TTL = 60                 # сегодняшние/будущие дни и статистика незавершённых матчей
+PAST_DAY_TTL = 7 * 24 * 3600  # расписание прошедших дней почти не меняется
+
+
+class HostRateLimiter:
+    """
+    Ограничивает частоту запросов к каждому хосту: не чаще rate запросов в секунду.
+    Потокобезопасен - слоты раздаются под блокировкой, а спим уже без неё.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SofascoreClient:
+    """
+    HTTP-клиент для api.sofascore.com:
+    - одна requests.Session с пулом keep-alive соединений на max_workers потоков;
+    - ограничение частоты запросов на хост;
+    - повтор с экспоненциальной задержкой на 429/5xx и сетевых ошибках;
+    - необязательный кэш ответов на диске (cache_dir) с ревалидацией по ETag/Last-Modified.
+    """
+
+    def __init__(self, base_url=None, max_workers=8, rate=10.0, max_retries=4, backoff=0.5, timeout=20,
+                 cache_dir=None, cache_max_bytes=None):
+        self.base_url = (base_url or settings.SOFASCORE_API_URL).rstrip('/')
+        self.cache = ResponseCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(rate)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'SportPortal importer'
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def scheduled_events_url(self, day):
+        return f"{self.base_url}/sport/tennis/scheduled-events/{day.strftime('%Y-%m-%d')}"
+
+    def statistics_url(self, event_id):
+        return f"{self.base_url}/event/{event_id}/statistics"
+
+    def live_events_url(self):
+        return f"{self.base_url}/sport/tennis/events/live"
+
+    def event_url(self, event_id):
+        return f"{self.base_url}/event/{event_id}"
+
+    def scheduled_events_ttl(self, day):
+        return PAST_DAY_TTL if day.date() < date.today() - timedelta(days=1) else LIVE_TTL
+
+    def scheduled_events(self, day):
+        return self.get_json(self.scheduled_events_url(day), self.scheduled_events_ttl(day))
+
+    def iter_scheduled_events(self, day):
+        """
+        События дня по одному, без разбора всего ответа в память (см. iter_array_items).
+        None, если API не ответил.
+        """
+        body = self.fetch(self.scheduled_events_url(day), self.scheduled_events_ttl(day), stream=True)
+        if body is None:
+            return None
+        return iter_array_items(iter_chunks(body) if isinstance(body, bytes) else body)
+
+    def live_events(self):
+        """
+        События, которые идут прямо сейчас: список или None, если API не ответил.
+        Кэш ответа всегда ревалидируется - счёт меняется каждую минуту.
+        """
+        data = self.get_json(self.live_events_url(), ttl=0)
+        return None if data is None else data.get('events', [])
+
+    def event(self, event_id):
+        # Одно событие в том же виде, что в scheduled-events (например, только что завершённое)
+        data = self.get_json(self.event_url(event_id), ttl=0)
+        return None if data is None else data.get('event')
+
+    def event_statistics(self, event_id, finished=False):
+        # Статистика завершённого матча уже не изменится
+        ttl = FOREVER if finished else LIVE_TTL
+        return self.get_json(self.statistics_url(event_id), ttl)
+
+    def retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    def fetch(self, url, ttl=LIVE_TTL, stream=False):
+        """
+        Возвращает тело ответа (bytes) или None, если API так и не ответил 200.
+        Свежий ответ из кэша возвращается без запроса, устаревший - ревалидируется.
+        Запрос навсегда (ttl=FOREVER) ревалидирует и свежую запись с конечным сроком:
+        например, статистику, закэшированную, пока матч шёл, - она могла измениться к концу матча.
+        При stream=True и выключенном кэше тело отдаётся итератором кусков по мере загрузки.
+        """
+        cached = self.cache.get(url) if self.cache else None
+        if cached and cached.fresh and (cached.permanent or ttl != FOREVER):
+            return cached.body
+
+        headers = {}
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+        stream = stream and not self.cache
+        response = self.request(url, headers, stream=stream)
+        if response is None:
+            return None
+        if response.status_code == 304 and cached:
+            self.cache.refresh(url, ttl)
+            return cached.body
+        if response.status_code != 200:
+            print(f"Failed to fetch {url}: {response.status_code}")
+            response.close()
+            return None
+
+        if stream:
+            return response.iter_content(READ_SIZE)
+        if self.cache:
+            self.cache.store(
+                url, response.content, ttl,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+        return response.content
+
+    def get_json(self, url, ttl=LIVE_TTL):
+        """
+        Возвращает разобранный JSON или None, если API так и не ответил 200.
+        """
+        body = self.fetch(url, ttl)
+        return None if body is None else json.loads(body)
+
+    def request(self, url, headers=None, stream=False):
+        """
+        GET с повторами на 429/5xx и сетевых ошибках. Возвращает последний ответ
+        или None, если соединиться так и не удалось.
+        """
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f"Failed to fetch {url}: {e}")
+                    return None
+                time.sleep(self.retry_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                response.close()
+                time.sleep(self.retry_delay(attempt, response))
+                continue
+            return response
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+
+
+def default_client():
+    """
+    Общий клиент для разовых вызовов (например, Command.get_match_statistics),
+    чтобы они тоже переиспользовали соединения.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = SofascoreClient(**cache_options())
+    return _default_client
+
+
+def cache_options():
+    """
+    Настройки кэша ответов из settings (SOFASCORE_CACHE_DIR = None отключает кэш).
+    """
+    return {
+        'cache_dir': settings.SOFASCORE_CACHE_DIR,
+        'cache_max_bytes': settings.SOFASCORE_CACHE_MAX_BYTES,
+    }
@@ -0,0 +1,205 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Метрики запроса, который сейчас обрабатывается (нужны обёртке рендера шаблонов)
+_current = ContextVar('instrumentation_metrics', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def sql_shape(sql):
+    """
+    Форма запроса без значений: литералы и параметры заменяются на ?, списки IN (...) схлопываются.
+    Одинаковые формы в одном запросе страницы - признак N+1.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _PLACEHOLDERS.sub('(...)', sql.replace('%s', '?'))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated_shapes(self, threshold):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class ViewStats:
+    """
+    Последние samples замеров одного view и формы запросов, на которых ловился N+1.
+    """
+
+    def __init__(self, samples):
+        self.samples = deque(maxlen=samples)
+        self.requests = 0
+        self.n_plus_one_requests = 0
+        self.n_plus_one = Counter()  # форма -> наибольшее число повторов за запрос
+
+    def add(self, sample, repeated):
+        self.samples.append(sample)
+        self.requests += 1
+        if repeated:
+            self.n_plus_one_requests += 1
+            for shape, count in repeated.items():
+                self.n_plus_one[shape] = max(self.n_plus_one[shape], count)
+
+    def summary(self):
+        result = {'requests': self.requests, 'sampled': len(self.samples)}
+        for field in ('duration_ms', 'queries', 'db_ms', 'template_ms', 'response_bytes'):
+            values = [sample[field] for sample in self.samples if sample[field] is not None]
+            result[field] = {
+                'p50': percentile(values, 0.5),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+                'max': max(values, default=0.0),
+            }
+        result['n_plus_one_requests'] = self.n_plus_one_requests
+        result['n_plus_one'] = [
+            {'sql': shape, 'count': count} for shape, count in self.n_plus_one.most_common(10)
+        ]
+        return result
+
+
+class MetricsRegistry:
+    """
+    Сводка по view в памяти процесса: у каждого процесса сервера - своя.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, sample, repeated):
+        with self.lock:
+            stats = self.views.get(view_name)
+            if stats is None:
+                stats = self.views[view_name] = ViewStats(settings.INSTRUMENTATION_SAMPLES)
+            stats.add(sample, repeated)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = MetricsRegistry()
+
+_original_render = None
+
+
+def instrument_templates():
+    """
+    Оборачивает Template.render, чтобы считать время рендера внешнего шаблона запроса
+    ({% include %} и {% extends %} входят в него). Так же делает тестовый клиент Django.
+    """
+    global _original_render
+    if _original_render is not None:
+        return
+    _original_render = Template.render
+
+    def render(self, context):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return _original_render(self, context)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return _original_render(self, context)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.rendering = False
+
+    Template.render = render
+
+
+class InstrumentationMiddleware:
+    """
+    Для каждого запроса к страницам портала считает SQL-запросы и их время, время рендера
+    шаблонов, общее время и размер ответа; складывает в registry по имени view (см. /metrics/)
+    и добавляет заголовок Server-Timing. Запрос, где одна форма SQL повторилась
+    INSTRUMENTATION_N_PLUS_ONE раз и больше, отмечается как N+1 и пишется в лог.
+    Включается settings.INSTRUMENTATION_ENABLED, иначе Django отключает middleware.
+    Middleware синхронный (execute_wrapper ставится на соединение своего потока), поэтому
+    с ним async-views страниц под ASGI выполняются через async_to_sync - для замеров, не для нагрузки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is None or match.url_name == 'metrics':
+            return response
+        repeated = metrics.repeated_shapes(settings.INSTRUMENTATION_N_PLUS_ONE)
+        sample = {
+            'duration_ms': round(duration * 1000, 2),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+        view_name = match.view_name or match._func_path
+        registry.record(view_name, sample, repeated)
+        if repeated:
+            logger.warning(
+                "N+1 in %s (%s): %s", view_name, request.path,
+                "; ".join(f"{count}x {shape}" for shape, count in repeated.items()),
+            )
+        response['Server-Timing'] = (
+            f"db;dur={sample['db_ms']};desc=\"{metrics.queries} queries\", "
+            f"tpl;dur={sample['template_ms']}, total;dur={sample['duration_ms']}"
+        )
+        return response
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from sportApp.benchmarks.bench_db import temporary_database
+from sportApp.benchmarks.recorded import replicate_events
+from sportApp.import_scripts.match_import import (
+    BulkMatchWriter, attach_statistics, is_tracked_event, parse_event
+)
+from sportApp.instrumentation import percentile
+from sportApp.models import Match, Player, Team
+
+
+def format_latency(values):
+    return (
+        f"p50 {percentile(values, 0.5) * 1000:.1f} ms, p95 {percentile(values, 0.95) * 1000:.1f} ms, "
+        f"max {max(values, default=0.0) * 1000:.1f} ms"
+    )
+
+
+def parsed_events(count, offset=0):
+    events = []
+    for n, (event, stats) in enumerate(replicate_events(offset + count)):
+        if n < offset or not is_tracked_event(event):
+            continue
+        parsed = parse_event(event)
+        if parsed is not None:
+            events.append(attach_statistics(parsed, stats))
+    return events
+
+
+def page_urls():
+    # Страницы, которые запрашивают читатели: список матчей и по нескольку матчей, команд и игроков
+    urls = [reverse('match_list')]
+    urls += [reverse('match_detail', args=[pk]) for pk in Match.objects.values_list('id', flat=True)[:20]]
+    urls += [reverse('team_detail', args=[pk]) for pk in Team.objects.values_list('id', flat=True)[:10]]
+    urls += [reverse('player_detail', args=[pk]) for pk in Player.objects.values_list('id', flat=True)[:10]]
+    return urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузка чтение/запись на SQLite: импорт пачками и одновременно запросы к страницам. "
+        "Профиль БД задаётся SPORTPORTAL_DB, --compare прогоняет все профили из DATABASE_PROFILES"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-events', type=int, default=300, help="Сколько событий записать до начала замера")
+        parser.add_argument('--events', type=int, default=600, help="Сколько событий импортировать во время замера")
+        parser.add_argument('--batch-size', type=int, default=25, help="Размер пачки (одна транзакция) импорта")
+        parser.add_argument('--readers', type=int, default=4, help="Сколько потоков запрашивают страницы")
+        parser.add_argument('--compare', action='store_true', help="Запустить замер для каждого профиля БД")
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(options)
+            return
+
+        with tempfile.TemporaryDirectory() as directory, \
+                temporary_database(file_path=Path(directory) / 'bench.sqlite3'), \
+                override_settings(
+                    ALLOWED_HOSTS=['testserver'],
+                    # Кэш страниц отключён, чтобы каждый запрос шёл в БД
+                    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                ):
+            self.run_benchmark(options)
+
+    def compare(self, options):
+        for profile in settings.DATABASE_PROFILES:
+            subprocess.run(
+                [
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_concurrency',
+                    '--seed-events', str(options['seed_events']),
+                    '--events', str(options['events']),
+                    '--batch-size', str(options['batch_size']),
+                    '--readers', str(options['readers']),
+                ],
+                env={**os.environ, 'SPORTPORTAL_DB': profile},
+                check=True,
+            )
+
+    def run_benchmark(self, options):
+        writer = BulkMatchWriter(batch_size=options['batch_size'])
+        for parsed in parsed_events(options['seed_events']):
+            writer.add(parsed)
+        writer.flush()
+        incoming = parsed_events(options['events'], offset=options['seed_events'])
+
+        urls = page_urls()
+
+        done = threading.Event()
+        lock = threading.Lock()
+        read_latencies = []
+        read_errors = []
+
+        def read_pages(offset):
+            client = Client()
+            latencies = []
+            errors = 0
+            n = offset
+            try:
+                while not done.is_set():
+                    url = urls[n % len(urls)]
+                    n += 1
+                    started = time.perf_counter()
+                    try:
+                        client.get(url)
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                read_latencies.extend(latencies)
+                read_errors.append(errors)
+
+        readers = [threading.Thread(target=read_pages, args=(n,)) for n in range(options['readers'])]
+        for thread in readers:
+            thread.start()
+
+        commit_latencies = []
+        write_errors = 0
+        started = time.perf_counter()
+        for start in range(0, len(incoming), options['batch_size']):
+            batch_started = time.perf_counter()
+            try:
+                # add сам записывает пачку, когда она набирается; flush - для последней неполной
+                for parsed in incoming[start:start + options['batch_size']]:
+                    writer.add(parsed)
+                writer.flush()
+            except OperationalError:
+                write_errors += 1
+                continue
+            commit_latencies.append(time.perf_counter() - batch_started)
+        elapsed = time.perf_counter() - started
+
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        with connection.cursor() as cursor:
+            journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        self.stdout.write(f"profile {settings.DATABASE_PROFILE} (journal_mode={journal_mode})")
+        self.stdout.write(
+            f"  writer: {len(incoming)} events in {elapsed:.2f}s ({len(incoming) / elapsed:.0f} events/sec), "
+            f"batch commit {format_latency(commit_latencies)}, errors {write_errors}"
+        )
+        self.stdout.write(
+            f"  readers: {len(read_latencies)} requests ({len(read_latencies) / elapsed:.0f} req/sec), "
+            f"{format_latency(read_latencies)}, errors {sum(read_errors)}"
+        )
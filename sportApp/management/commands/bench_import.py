@@ -0,0 +1,85 @@
+import re
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sportApp.benchmarks.bench_db import QueryCounter, temporary_database
+from sportApp.benchmarks.recorded import replicate_events
+from sportApp.import_scripts.identity_map import REFERENCE_MODELS, IdentityMap
+from sportApp.import_scripts.match_import import (
+    BulkMatchWriter, attach_statistics, is_tracked_event, parse_event, save_event_rows
+)
+from sportApp.models import Team
+
+# Запросы к справочным таблицам - то, что должна убирать карта identity
+REFERENCE_QUERY = re.compile(
+    '|'.join(f'"{model._meta.db_table}"' for model in REFERENCE_MODELS)
+    + f'|"{Team.players.through._meta.db_table}"'
+)
+
+
+def count_rows():
+    return sum(model.objects.count() for model in apps.get_app_config('sportApp').get_models())
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость записи import_matches: построчно (get_or_create) и пакетно (bulk upsert)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=300, help="Сколько событий записывать (по умолчанию 300)")
+        parser.add_argument('--batch-size', type=int, default=200, help="Размер пачки для bulk-режима")
+        parser.add_argument('--reimport', action='store_true', help="Писать события дважды (второй проход - обновления)")
+        parser.add_argument(
+            '--players-pool', type=int, default=500,
+            help="Из скольких игроков набираются соперники (меньше - чаще повторяются справочники)",
+        )
+
+    def handle(self, *args, **options):
+        parsed_events = []
+        for event, stats in replicate_events(options['events'], options['players_pool']):
+            if not is_tracked_event(event):
+                continue
+            parsed = parse_event(event)
+            if parsed is not None:
+                parsed_events.append(attach_statistics(parsed, stats))
+
+        passes = 2 if options['reimport'] else 1
+        results = {}
+        for mode in ('per-row', 'per-row+map', 'bulk'):
+            queries = QueryCounter(REFERENCE_QUERY)
+            with temporary_database(), connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                # Карта справочных сущностей живёт весь запуск, как в import_matches
+                identity = IdentityMap()
+                for _ in range(passes):
+                    if mode == 'bulk':
+                        writer = BulkMatchWriter(options['batch_size'], identity)
+                        for parsed in parsed_events:
+                            writer.add(parsed)
+                        writer.flush()
+                    else:
+                        for parsed in parsed_events:
+                            save_event_rows(parsed, identity if mode == 'per-row+map' else None)
+                elapsed = time.perf_counter() - started
+                query_count = queries.count
+                rows = count_rows()
+            events = len(parsed_events) * passes
+            results[mode] = (rows, elapsed, queries.matched / events)
+            self.stdout.write(
+                f"{mode:>11}: {len(parsed_events)} events x{passes}, {rows} rows, "
+                f"{elapsed:.2f}s, {rows * passes / elapsed:.0f} rows/sec, "
+                f"{query_count / events:.1f} queries/event ({queries.matched / events:.1f} to reference tables)"
+            )
+
+        speedup = results['per-row'][1] / results['bulk'][1]
+        self.stdout.write(f"bulk speedup: x{speedup:.1f}")
+        # Остальные запросы построчного режима (статистика, сеты, связи) карта не трогает,
+        # поэтому сравниваются только запросы к справочникам
+        without_map, with_map = results['per-row'][2], results['per-row+map'][2]
+        if parsed_events and with_map >= without_map:
+            raise CommandError(
+                f"Identity map did not reduce reference lookups: {with_map:.1f} vs {without_map:.1f} queries/event"
+            )
+        self.stdout.write(f"identity map: {without_map:.1f} -> {with_map:.1f} reference queries/event")
@@ -0,0 +1,107 @@
+import json
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sportApp.benchmarks.bench_db import QueryCounter, temporary_database
+from sportApp.benchmarks.synthetic import FixtureClient, fixture_days, read_manifest
+from sportApp.import_scripts.identity_map import IdentityMap
+from sportApp.import_scripts.match_import import BulkMatchWriter
+from sportApp.import_scripts.pipeline import ImportPipeline
+from sportApp.management.commands.generate_fixtures import add_fixture_arguments, fixtures_from_options
+from sportApp.models import Match
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss в Linux - в килобайтах
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def database_size_mb(path):
+    size = sum(p.stat().st_size for p in (path, Path(f"{path}-wal")) if p.exists())
+    return round(size / 1024 / 1024, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк записи import_matches на синтетических ответах API (generate_fixtures): "
+        "events/sec, запросов на событие, пиковый RSS и размер БД. --json - одна JSON-строка для сравнения прогонов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures',
+            help="Каталог generate_fixtures; без него ответы генерируются во временный каталог по параметрам ниже",
+        )
+        add_fixture_arguments(parser)
+        parser.add_argument('--batch-size', type=int, default=200, help="Размер пачки, как в import_matches")
+        parser.add_argument('--per-row', action='store_true', help="Построчная запись вместо пакетной")
+        parser.add_argument('--concurrency', type=int, default=4, help="Потоков чтения ответов (по умолчанию 4)")
+        parser.add_argument('--json', action='store_true', help="Вывести результат одной JSON-строкой")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            fixtures_dir = options['fixtures']
+            if fixtures_dir is None:
+                fixtures_dir = Path(directory) / 'fixtures'
+                fixtures_from_options(options).write(fixtures_dir, fixture_days(options['start'], options['days']))
+            elif not (Path(fixtures_dir) / 'manifest.json').exists():
+                raise CommandError(f"{fixtures_dir}: нет manifest.json, каталог должен быть создан generate_fixtures")
+            result = self.run_benchmark(options, fixtures_dir, Path(directory) / 'bench.sqlite3')
+
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+            return
+        self.stdout.write(
+            f"{result['mode']}: {result['events']} of {result['scanned_events']} events in {result['days']} days, "
+            f"{result['seconds']:.2f}s, {result['events_per_sec']:.0f} events/sec, "
+            f"{result['queries_per_event']:.1f} queries/event, {result['rows']} rows, "
+            f"peak RSS {result['peak_rss_mb']} MB, DB {result['db_size_mb']} MB"
+        )
+
+    def run_benchmark(self, options, fixtures_dir, db_path):
+        manifest = read_manifest(fixtures_dir)
+        days = [datetime.strptime(day, '%Y-%m-%d') for day in manifest['days']]
+        client = FixtureClient(fixtures_dir, max_workers=options['concurrency'])
+        identity = IdentityMap()
+        writer = None if options['per_row'] else BulkMatchWriter(options['batch_size'], identity)
+        queries = QueryCounter()
+
+        with temporary_database(file_path=db_path):
+            # Сообщения конвейера ("Imported ...") уходят в stderr, чтобы не мешать --json
+            with connection.execute_wrapper(queries), redirect_stdout(sys.stderr):
+                started = time.perf_counter()
+                ImportPipeline(client, writer, identity=identity).run(days)
+                elapsed = time.perf_counter() - started
+            events = Match.objects.count()
+            rows = sum(model.objects.count() for model in apps.get_app_config('sportApp').get_models())
+            db_size = database_size_mb(db_path)
+
+        return {
+            'benchmark': 'ingest',
+            'mode': 'per-row' if options['per_row'] else 'bulk',
+            'database_profile': settings.DATABASE_PROFILE,
+            'fixtures': {key: value for key, value in manifest.items() if key != 'days'},
+            'days': len(days),
+            'scanned_events': manifest['events_per_day'] * len(days),
+            'events': events,
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'events_per_sec': round(events / elapsed, 1) if elapsed else None,
+            'queries': queries.count,
+            'queries_per_event': round(queries.count / events, 2) if events else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'db_size_mb': db_size,
+        }
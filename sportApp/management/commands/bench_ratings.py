@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from sportApp.ratings import DEFAULT_K, RatingEngine
+
+SURFACES = ('Hardcourt outdoor', 'Red clay', 'Grass', 'Hardcourt indoor')
+
+
+def synthetic_matches(count, players, doubles_share, seed):
+    """
+    Синтетические матчи (хозяева, гости, победили хозяева, покрытие) без обращения к БД.
+    """
+    rng = random.Random(seed)
+    matches = []
+    for _ in range(count):
+        if rng.random() < doubles_share:
+            a, b, c, d = rng.sample(range(1, players + 1), 4)
+            home, away = (a, b), (c, d)
+        else:
+            a, b = rng.sample(range(1, players + 1), 2)
+            home, away = (a,), (b,)
+        matches.append((home, away, rng.random() < 0.5, rng.choice(SURFACES)))
+    return matches
+
+
+class Command(BaseCommand):
+    help = "Замер полного пересчёта рейтингов Эло в памяти на синтетической истории матчей"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matches', type=int, default=1_000_000, help="Сколько матчей (по умолчанию 1000000)")
+        parser.add_argument('--players', type=int, default=20_000, help="Сколько игроков (по умолчанию 20000)")
+        parser.add_argument('--doubles-share', type=float, default=0.2, help="Доля парных матчей (по умолчанию 0.2)")
+        parser.add_argument('--per-surface', action='store_true', help="Дополнительно вести рейтинг по покрытиям")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        matches = synthetic_matches(options['matches'], options['players'], options['doubles_share'], options['seed'])
+        generated = time.perf_counter() - started
+
+        engine = RatingEngine(DEFAULT_K, per_surface=options['per_surface'])
+        started = time.perf_counter()
+        for home_ids, away_ids, home_won, surface in matches:
+            engine.rate(home_ids, away_ids, home_won, surface)
+        elapsed = time.perf_counter() - started
+
+        overall = engine.ratings['']
+        rated = [overall[p] for p in range(len(overall)) if engine.counts[''][p]]
+        self.stdout.write(f"generated {len(matches)} matches in {generated:.2f}s")
+        self.stdout.write(
+            f"replayed {len(matches)} matches in {elapsed:.2f}s ({len(matches) / elapsed:.0f} matches/sec), "
+            f"{len(rated)} players, rating {min(rated):.0f}..{max(rated):.0f}"
+        )
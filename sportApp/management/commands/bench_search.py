@@ -0,0 +1,80 @@
+import gc
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sportApp.benchmarks.bench_db import temporary_database
+from sportApp.instrumentation import percentile
+from sportApp.models import Player
+from sportApp.search import fts_enabled, normalize, rebuild_index, search
+
+SYLLABLES = ('ka', 'ro', 'mi', 'an', 'el', 'ov', 'in', 'sa', 'to', 'lu', 'ne', 'va', 'ch', 'er', 'za', 'po')
+
+
+def synthetic_name(rng):
+    surname = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    return f"{surname} {rng.choice(string.ascii_uppercase)}."
+
+
+def with_typo(rng, word):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+class Command(BaseCommand):
+    help = "Замер подсказок поиска на синтетических игроках во временной БД (prefix, подстрока, опечатка)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=300_000, help="Сколько игроков (по умолчанию 300000)")
+        parser.add_argument('--queries', type=int, default=300, help="Сколько запросов каждого вида (по умолчанию 300)")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with temporary_database():
+            started = time.perf_counter()
+            names = []
+            with transaction.atomic():
+                for start in range(0, options['players'], 10_000):
+                    batch = []
+                    for n in range(start, min(start + 10_000, options['players'])):
+                        name = synthetic_name(rng)
+                        names.append(name)
+                        batch.append(Player(
+                            name=name, slug=f"{normalize(name).replace(' ', '-')}-{n}",
+                            short_name=name, api_id=n,
+                        ))
+                    Player.objects.bulk_create(batch)
+            self.stdout.write(f"created {len(names)} players in {time.perf_counter() - started:.2f}s")
+
+            started = time.perf_counter()
+            rebuild_index()
+            self.stdout.write(f"indexed in {time.perf_counter() - started:.2f}s (FTS5: {'yes' if fts_enabled() else 'no'})")
+
+            # Мусор от создания игроков не должен собираться посреди замера,
+            # а первый запрос к FTS-таблице дольше остальных
+            gc.collect()
+            search('warm up')
+            samples = [normalize(rng.choice(names)).split()[0] for _ in range(options['queries'])]
+            cases = {
+                'prefix 2': [word[:2] for word in samples],
+                'prefix 4': [word[:4] for word in samples],
+                'substring': [word[1:5] for word in samples],
+                'typo': [with_typo(rng, word) for word in samples if len(word) >= 6],
+            }
+            for label, queries in cases.items():
+                latencies = []
+                hits = 0
+                for query in queries:
+                    started = time.perf_counter()
+                    results = search(query)
+                    latencies.append(time.perf_counter() - started)
+                    hits += bool(results)
+                self.stdout.write(
+                    f"{label:>10}: p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+                    f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms, "
+                    f"{hits}/{len(queries)} with results"
+                )
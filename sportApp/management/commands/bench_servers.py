@@ -0,0 +1,242 @@
+import asyncio
+import io
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import override_settings
+
+from sportApp.benchmarks.bench_db import temporary_database
+from sportApp.import_scripts.match_import import BulkMatchWriter
+from sportApp.management.commands.bench_concurrency import format_latency, page_urls, parsed_events
+
+HOST = 'testserver'
+
+
+class LoadResult:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def add(self, latencies, errors):
+        with self.lock:
+            self.latencies.extend(latencies)
+            self.errors += errors
+
+    def format(self, name, clients, elapsed):
+        return (
+            f"{name}: {clients} clients, {len(self.latencies)} requests in {elapsed:.2f}s "
+            f"({len(self.latencies) / elapsed:.0f} req/sec), {format_latency(self.latencies)}, errors {self.errors}"
+        )
+
+
+def wsgi_environ(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+
+
+def asgi_scope(path):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [(b'host', HOST.encode())],
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def run_threads(clients, duration, request, urls):
+    """
+    clients потоков, каждый шлёт запросы подряд, пока не выйдет duration секунд.
+    request(клиент, путь) возвращает код ответа; клиент - то, что вернула request.session().
+    """
+    result = LoadResult()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(offset):
+        session = request.session()
+        latencies = []
+        errors = 0
+        n = offset
+        try:
+            while time.perf_counter() < deadline:
+                url = urls[n % len(urls)]
+                n += 1
+                started = time.perf_counter()
+                if request(session, url) != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        result.add(latencies, errors)
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return result, time.perf_counter() - started
+
+
+class WsgiRequest:
+    # Как потоковый WSGI-сервер (runserver, gunicorn --threads): один поток на клиента
+    def __init__(self):
+        self.application = get_wsgi_application()
+
+    def session(self):
+        return None
+
+    def __call__(self, session, path):
+        status = []
+        body = self.application(wsgi_environ(path), lambda line, headers: status.append(line))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return int(status[0].split()[0])
+
+
+class HttpRequest:
+    # Внешний сервер по --url: у каждого клиента своя keep-alive сессия
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def session(self):
+        return requests.Session()
+
+    def __call__(self, session, path):
+        try:
+            return session.get(self.base_url + path, timeout=30).status_code
+        except requests.RequestException:
+            return None
+
+
+async def asgi_request(application, path):
+    status = None
+    body_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(asgi_scope(path), receive, send)
+    disconnected.set()
+    return status
+
+
+def run_asgi(clients, duration, urls):
+    """
+    clients сопрограмм в одном цикле событий, как у ASGI-сервера (uvicorn):
+    синхронная часть запроса идёт в потоках asgiref, async-views ждут ORM, не занимая цикл.
+    """
+    application = get_asgi_application()
+    result = LoadResult()
+
+    async def client_loop(offset, deadline):
+        latencies = []
+        errors = 0
+        n = offset
+        while time.perf_counter() < deadline:
+            url = urls[n % len(urls)]
+            n += 1
+            started = time.perf_counter()
+            if await asgi_request(application, url) != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        result.add(latencies, errors)
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client_loop(n, deadline) for n in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return result, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест страниц матчей, команд и игроков: запросы в секунду и задержки "
+        "под WSGI и под ASGI при множестве одновременных клиентов. По умолчанию оба обработчика Django "
+        "вызываются в этом процессе на временной БД; --url нагружает уже запущенный сервер "
+        "(например, gunicorn SportPortal.wsgi или uvicorn SportPortal.asgi:application)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help="Сколько клиентов шлют запросы одновременно")
+        parser.add_argument('--duration', type=float, default=5.0, help="Сколько секунд длится каждый замер")
+        parser.add_argument('--seed-events', type=int, default=300, help="Сколько событий записать во временную БД")
+        parser.add_argument(
+            '--server', choices=['wsgi', 'asgi', 'both'], default='both',
+            help="Какой обработчик нагружать в этом процессе (по умолчанию оба по очереди)",
+        )
+        parser.add_argument(
+            '--url',
+            help="Адрес запущенного сервера, например http://127.0.0.1:8000; страницы берутся из его БД (settings)",
+        )
+
+    def handle(self, *args, **options):
+        if options['url']:
+            urls = page_urls()
+            result, elapsed = run_threads(options['clients'], options['duration'], HttpRequest(options['url']), urls)
+            self.stdout.write(result.format(urlsplit(options['url']).netloc, options['clients'], elapsed))
+            return
+
+        with tempfile.TemporaryDirectory() as directory, \
+                temporary_database(file_path=Path(directory) / 'bench.sqlite3'), \
+                override_settings(
+                    ALLOWED_HOSTS=[HOST],
+                    # Кэш страниц отключён, чтобы каждый запрос шёл в БД
+                    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                ):
+            writer = BulkMatchWriter()
+            for parsed in parsed_events(options['seed_events']):
+                writer.add(parsed)
+            writer.flush()
+            urls = page_urls()
+            # Соединение этого потока закрываем: клиенты откроют свои
+            connection.close()
+
+            if options['server'] in ('wsgi', 'both'):
+                result, elapsed = run_threads(options['clients'], options['duration'], WsgiRequest(), urls)
+                self.stdout.write(result.format('wsgi', options['clients'], elapsed))
+            if options['server'] in ('asgi', 'both'):
+                result, elapsed = run_asgi(options['clients'], options['duration'], urls)
+                self.stdout.write(result.format('asgi', options['clients'], elapsed))
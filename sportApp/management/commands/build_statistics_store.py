@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sportApp.statistics_store import StatisticsStore, build_store
+
+
+class Command(BaseCommand):
+    help = "Пересобирает колоночное хранилище статистики (STATISTICS_STORE_DIR) из MatchStatistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=None,
+            help="Каталог хранилища (по умолчанию settings.STATISTICS_STORE_DIR)",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Сколько матчей читать из БД за раз (по умолчанию 5000)",
+        )
+        parser.add_argument(
+            '--compact', action='store_true',
+            help="Не перечитывать БД, а только переписать колонки без устаревших версий матчей",
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.STATISTICS_STORE_DIR
+        if not directory:
+            raise CommandError("Не задан каталог хранилища: --directory или STATISTICS_STORE_DIR")
+        started = time.perf_counter()
+        try:
+            if options['compact']:
+                if not StatisticsStore.exists(directory):
+                    raise CommandError(f"Хранилище {directory} ещё не построено")
+                store = StatisticsStore(directory)
+                store.compact()
+                action = 'Compacted'
+            else:
+                store = build_store(directory, options['chunk_size'])
+                action = 'Built'
+        except ImportError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"{action} {directory}: {store.rows('matches')} matches, {store.rows('stats')} statistics rows, "
+            f"{len(store.meta['dictionaries']['stats'])} stat keys in {time.perf_counter() - started:.2f}s"
+        )
@@ -2,6 +2,7 @@ import requests
 from datetime import datetime, timedelta
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 
 from django.apps import apps
@@ -17,5 +18,7 @@ class Command(BaseCommand):
             if model != User:
                 # Удаляем все записи
                 model.objects.all().delete()
+        # Закэшированные страницы удалённых объектов больше не нужны
+        cache.clear()
 
 
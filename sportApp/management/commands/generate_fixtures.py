@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from sportApp.benchmarks.synthetic import SyntheticFixtures, fixture_days
+from sportApp.management.commands.import_matches import DEFAULT_START, parse_date
+
+
+def add_fixture_arguments(parser):
+    parser.add_argument('--start', type=parse_date, default=DEFAULT_START, help="Первый день, YYYY-MM-DD (по умолчанию 2023-02-02)")
+    parser.add_argument('--days', type=int, default=1, help="Сколько дней (по умолчанию 1)")
+    parser.add_argument('--events-per-day', type=int, default=200, help="Событий в дне, всех турниров (по умолчанию 200)")
+    parser.add_argument('--tracked-share', type=float, default=0.3, help="Доля событий ITF (по умолчанию 0.3)")
+    parser.add_argument('--doubles-share', type=float, default=0.2, help="Доля парных матчей (по умолчанию 0.2)")
+    parser.add_argument('--players', type=int, default=2000, help="Размер пула игроков (по умолчанию 2000)")
+    parser.add_argument('--tournaments', type=int, default=20, help="Турниров каждого вида (по умолчанию 20)")
+    parser.add_argument(
+        '--stat-items', type=int, default=None,
+        help="Показателей в каждой группе статистики (по умолчанию как в записанном ответе)",
+    )
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def fixtures_from_options(options):
+    return SyntheticFixtures(
+        events_per_day=options['events_per_day'],
+        tracked_share=options['tracked_share'],
+        doubles_share=options['doubles_share'],
+        players=options['players'],
+        tournaments=options['tournaments'],
+        stat_items=options['stat_items'],
+        seed=options['seed'],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует воспроизводимые ответы scheduled-events и /statistics (дни x события x показатели) "
+        "в каталог для bench_ingest"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Каталог, куда записать ответы")
+        add_fixture_arguments(parser)
+
+    def handle(self, *args, **options):
+        days = fixture_days(options['start'], options['days'])
+        events, statistics = fixtures_from_options(options).write(options['output'], days)
+        self.stdout.write(
+            f"Generated {len(days)} days, {events} events, {statistics} statistics responses in {options['output']}"
+        )
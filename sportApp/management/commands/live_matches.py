@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sportApp.import_scripts.identity_map import IdentityMap
+from sportApp.import_scripts.live import MAX_INTERVAL, MIN_INTERVAL, LivePoller
+from sportApp.import_scripts.match_import import BulkMatchWriter
+from sportApp.import_scripts.sofascore_client import SofascoreClient, cache_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Следит за идущими матчами: опрашивает live-ленту API, записывает изменения статуса и счёта "
+        "и публикует их для потока /live/stream/. Работает, пока не остановят (Ctrl+C)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tournament-filter', default='itf',
+            help="Подстрока в slug турнира, по которой отбираются матчи (по умолчанию itf)",
+        )
+        parser.add_argument(
+            '--min-interval', type=float, default=MIN_INTERVAL,
+            help=f"Пауза между опросами после изменений, в секундах (по умолчанию {MIN_INTERVAL:g})",
+        )
+        parser.add_argument(
+            '--max-interval', type=float, default=MAX_INTERVAL,
+            help=f"Наибольшая пауза, когда ничего не меняется или нет идущих матчей (по умолчанию {MAX_INTERVAL:g})",
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=0,
+            help="Остановиться после стольких опросов (по умолчанию 0 - без ограничения)",
+        )
+        parser.add_argument(
+            '--rate', type=float, default=10.0,
+            help="Не больше стольких запросов в секунду к API (0 - без ограничения)",
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help="Не использовать локальный кэш ответов API (SOFASCORE_CACHE_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['min_interval'] <= options['max_interval']:
+            raise CommandError("Нужно 0 < --min-interval <= --max-interval")
+        client_options = {} if options['no_cache'] else cache_options()
+        client = SofascoreClient(rate=options['rate'], **client_options)
+        # Карта справочников живёт весь запуск: игроки и турниры идущих матчей не перезаписываются
+        poller = LivePoller(
+            client, BulkMatchWriter(identity=IdentityMap()), options['tournament_filter'],
+            options['min_interval'], options['max_interval'],
+        )
+        polls = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                result = poller.poll()
+                polls += 1
+                self.stdout.write(
+                    f"Live: {result['live']} matches, {result['written']} written, "
+                    f"{result['updated']} score updates in {time.perf_counter() - started:.2f}s"
+                    f" | next poll in {poller.interval:g}s"
+                )
+                if options['iterations'] and polls >= options['iterations']:
+                    break
+                time.sleep(poller.interval)
+        except KeyboardInterrupt:
+            self.stdout.write(f"Stopped after {polls} polls")
+        finally:
+            client.close()
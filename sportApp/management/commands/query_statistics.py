@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sportApp.models import Player, Season, Tournament
+from sportApp.statistics_store import GROUP_BY, StatisticsStore
+
+# Как подписывать ключи групп в выводе
+GROUP_LABELS = {'player': Player, 'season': Season, 'tournament': Tournament}
+
+
+class Command(BaseCommand):
+    help = (
+        "Агрегаты по колоночному хранилищу статистики, например среднее число эйсов "
+        "игрока на каждом покрытии: --stat Aces --by player surface"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stat', required=True, help="Название показателя (stat_name), например Aces")
+        parser.add_argument(
+            '--by', nargs='*', default=['player'], choices=GROUP_BY,
+            help="Группировка (по умолчанию player)",
+        )
+        parser.add_argument('--period', default='ALL', help="Период: ALL, 1ST, 2ND... (по умолчанию ALL)")
+        parser.add_argument('--season', type=int, default=None, help="Только матчи сезона с этим id")
+        parser.add_argument('--surface', default=None, help="Только матчи на этом покрытии")
+        parser.add_argument(
+            '--order', default='mean', choices=['mean', 'total', 'count'],
+            help="По какому значению сортировать (по убыванию)",
+        )
+        parser.add_argument('--min-count', type=int, default=1, help="Не показывать группы с меньшим числом матчей")
+        parser.add_argument('--limit', type=int, default=20, help="Сколько строк вывести")
+
+    def handle(self, *args, **options):
+        directory = settings.STATISTICS_STORE_DIR
+        if not StatisticsStore.exists(directory):
+            raise CommandError("Хранилище не построено: запустите build_statistics_store")
+        try:
+            store = StatisticsStore(directory)
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        rows = store.aggregate(
+            options['stat'], options['by'], options['period'],
+            season_id=options['season'], surface=options['surface'],
+        )
+        elapsed = time.perf_counter() - started
+        rows = [row for row in rows if row['count'] >= options['min_count']]
+        rows.sort(key=lambda row: row[options['order']], reverse=True)
+        rows = rows[:options['limit']]
+
+        # Имена только для выводимых строк: один запрос на модель
+        names = {
+            key: model.objects.in_bulk([row[key] for row in rows])
+            for key, model in GROUP_LABELS.items() if key in options['by']
+        }
+        for row in rows:
+            labels = [
+                str(names[key].get(row[key], row[key])) if key in names else str(row[key])
+                for key in options['by']
+            ]
+            self.stdout.write(
+                f"{' | '.join(labels) or 'всего'}: mean {row['mean']:.2f}, total {row['total']:.0f}, "
+                f"matches {row['count']}"
+            )
+        self.stdout.write(f"aggregated in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,128 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Max, Min, Q
+
+from sportApp.import_scripts.rollups import (
+    CONTRIBUTION_FIELDS, LINK_ROW_FIELDS, ROLLUP_ROW_FIELDS, compute_player_chunk
+)
+from sportApp.models import Player, PlayerMatch, PlayerRollup
+from sportApp.signals import objects_imported
+
+
+def iter_chunk_results(chunks, workers):
+    """
+    Результаты compute_player_chunk по мере готовности. В пуле процессов одновременно
+    считается не больше 2 * workers диапазонов, поэтому готовые результаты не копятся в памяти,
+    пока родитель записывает предыдущие.
+    """
+    if workers <= 1 or len(chunks) <= 1:
+        for first, last in chunks:
+            yield compute_player_chunk(first, last)
+        return
+
+    remaining = iter(chunks)
+
+    def submit(pool, count):
+        futures = set()
+        for first, last in islice(remaining, count):
+            # Соединения с БД не должны переезжать в дочерние процессы,
+            # а пул может запустить новый процесс при любой отправке задачи
+            connections.close_all()
+            futures.add(pool.submit(compute_player_chunk, first, last))
+        return futures
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        running = submit(pool, 2 * workers)
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            running |= submit(pool, len(done))
+
+
+def delete_rollups(rollups):
+    """
+    Удаляет сводки и возвращает id их игроков.
+    """
+    player_ids = set(rollups.values_list('player_id', flat=True))
+    rollups.delete()
+    return player_ids
+
+
+def notify_players(player_ids):
+    """
+    После фиксации транзакции сообщает (objects_imported), у каких игроков изменились сводки:
+    они показываются на странице игрока, её кэш нужно сбросить - как в ratings.update_ratings.
+    """
+    player_ids = sorted(player_ids)
+    if player_ids:
+        transaction.on_commit(lambda: objects_imported.send(sender=Player, ids=player_ids, changed=[]))
+
+
+def write_chunk(first_id, last_id, link_rows, rollup_rows):
+    """
+    Записывает пересчитанный диапазон игроков своей транзакцией:
+    заменяет сводки только этих игроков и обновляет вклад их связей.
+    """
+    with transaction.atomic():
+        player_ids = delete_rollups(PlayerRollup.objects.filter(player_id__gte=first_id, player_id__lte=last_id))
+        notify_players(player_ids | {row[0] for row in rollup_rows})
+        PlayerRollup.objects.bulk_create(
+            [PlayerRollup(**dict(zip(ROLLUP_ROW_FIELDS, row))) for row in rollup_rows],
+            batch_size=1000,
+        )
+        # Новые объекты без pk: upsert идёт по (player, match)
+        PlayerMatch.objects.bulk_create(
+            [PlayerMatch(**dict(zip(LINK_ROW_FIELDS, row))) for row in link_rows],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['player', 'match'],
+            update_fields=CONTRIBUTION_FIELDS,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Полностью пересчитывает вклады PlayerMatch и сводки PlayerRollup. "
+        "Игроки делятся на диапазоны id, диапазоны считаются параллельно в процессах, "
+        "пишет только родительский процесс - каждый диапазон своей транзакцией по мере готовности"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Сколько процессов считают диапазоны (по умолчанию 1)")
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Сколько id игроков в одном диапазоне (по умолчанию 2000)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        bounds = PlayerMatch.objects.aggregate(first=Min('player_id'), last=Max('player_id'))
+        chunks = []
+        if bounds['first'] is None:
+            stale = PlayerRollup.objects.all()
+        else:
+            chunk_size = options['chunk_size']
+            chunks = [
+                (first, min(first + chunk_size - 1, bounds['last']))
+                for first in range(bounds['first'], bounds['last'] + 1, chunk_size)
+            ]
+            # Сводки игроков вне диапазонов остались от удалённых связей
+            stale = PlayerRollup.objects.filter(Q(player_id__lt=bounds['first']) | Q(player_id__gt=bounds['last']))
+        with transaction.atomic():
+            notify_players(delete_rollups(stale))
+
+        links = rollups = 0
+        for first, last, link_rows, rollup_rows in iter_chunk_results(chunks, options['workers']):
+            write_chunk(first, last, link_rows, rollup_rows)
+            links += len(link_rows)
+            rollups += len(rollup_rows)
+        self.stdout.write(
+            f"Rebuilt {rollups} rollups from {links} player matches "
+            f"in {len(chunks)} chunks, {time.perf_counter() - started:.2f}s"
+        )
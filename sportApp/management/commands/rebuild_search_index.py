@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sportApp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет поисковый индекс с игроками, командами и турнирами: дописывает недостающее "
+        "и изменившееся, удаляет строки удалённых объектов. Импорт поддерживает индекс сам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Сколько объектов за один проход (по умолчанию 5000)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_index(options['chunk_size'])
+        self.stdout.write(
+            f"Search index: {', '.join(f'{kind} {count}' for kind, count in written.items())} rows written "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sportApp.import_scripts.identity_map import IdentityMap
+from sportApp.import_scripts.match_import import (
+    BulkMatchWriter, attach_statistics, is_tracked_event, parse_event, save_event_rows
+)
+from sportApp.import_scripts.recording import DumpError, iter_dump
+from sportApp.statistics_store import batched_appends
+
+class Command(BaseCommand):
+    help = "Загружает матчи из записанных дампов (JSONL, .gz, .zst) без обращения к API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Файлы дампов, записанные print_matches")
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help="Сколько событий копить перед одной пакетной записью в БД (по умолчанию 200)",
+        )
+        parser.add_argument(
+            '--per-row', action='store_true',
+            help="Старый режим: get_or_create на каждую строку вместо пакетной записи",
+        )
+        parser.add_argument(
+            '--identity-map-size', type=int, default=None,
+            help="Сколько справочных сущностей каждой модели держать в памяти (по умолчанию без ограничения)",
+        )
+        parser.add_argument(
+            '--tournament-filter', default='itf',
+            help="Подстрока в slug турнира, по которой отбираются матчи (по умолчанию itf)",
+        )
+
+    def handle(self, *args, **options):
+        identity = IdentityMap(options['identity_map_size'])
+        writer = None if options['per_row'] else BulkMatchWriter(options['batch_size'], identity)
+
+        for path in options['paths']:
+            replayed = 0
+            # Хранилище статистики дописывается один раз на файл, а не на каждое событие
+            with batched_appends():
+                try:
+                    for event, stats_data in iter_dump(path, prefilter=options['tournament_filter']):
+                        if not is_tracked_event(event, options['tournament_filter']):
+                            continue
+                        parsed = parse_event(event)
+                        if parsed is None:
+                            continue
+                        attach_statistics(parsed, stats_data)
+                        if writer:
+                            writer.add(parsed)
+                        else:
+                            save_event_rows(parsed, identity)
+                        replayed += 1
+                except (ImportError, OSError, DumpError) as e:
+                    raise CommandError(f"{path}: {e}")
+                if writer:
+                    writer.flush()
+            print(f"Replayed {path}: {replayed} matches")
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sportApp.ratings import CHUNK_SIZE, DEFAULT_K, update_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рейтинги Эло по истории матчей в хронологическом порядке. "
+        "По умолчанию продолжает с места прошлого запуска, --full пересчитывает всё заново. "
+        "Если с прошлого запуска изменился результат более ранних матчей (догрузка, поздний или другой итог), "
+        "пересчёт тоже идёт с начала"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Удалить снимки и пересчитать всю историю")
+        parser.add_argument('--per-surface', action='store_true', help="Дополнительно вести рейтинг по покрытиям")
+        parser.add_argument('--k', type=float, default=DEFAULT_K, help=f"K-фактор (по умолчанию {DEFAULT_K:g})")
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f"Сколько матчей читать одним запросом (по умолчанию {CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            run = update_ratings(
+                full=options['full'],
+                per_surface=options['per_surface'],
+                k=options['k'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if run is None:
+            self.stdout.write("No new settled matches")
+            return
+        self.stdout.write(
+            f"Rated {run.matches} matches up to {run.last_start_timestamp} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,252 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='statistic',
+            name='match',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='away_player',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='home_player',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='slug',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='winner',
+        ),
+        migrations.RemoveField(
+            model_name='player',
+            name='country',
+        ),
+        migrations.RemoveField(
+            model_name='player',
+            name='national',
+        ),
+        migrations.RemoveField(
+            model_name='season',
+            name='tournament',
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='event_id',
+            field=models.IntegerField(default=0, unique=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='firstToServe',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='roundName',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='roundType',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='status_description',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='tournament',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='sportApp.tournament'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='winner_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='api_id',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='country_alpha2',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='country_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='season',
+            name='api_id',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='api_id',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='priority',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='season',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='sportApp.season'),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='start_timestamp',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='short_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='slug',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='season',
+            name='year',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tournament',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='tournament',
+            name='slug',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='tournament',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='sportApp.category'),
+        ),
+        migrations.CreateModel(
+            name='MatchSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('set_number', models.PositiveIntegerField()),
+                ('home_score', models.PositiveIntegerField()),
+                ('away_score', models.PositiveIntegerField()),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sets', to='sportApp.match')),
+            ],
+            options={
+                'unique_together': {('match', 'set_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=50)),
+                ('group_name', models.CharField(max_length=100)),
+                ('stat_name', models.CharField(max_length=255)),
+                ('home_value', models.FloatField(blank=True, null=True)),
+                ('away_value', models.FloatField(blank=True, null=True)),
+                ('home_Total', models.FloatField(blank=True, null=True)),
+                ('away_Total', models.FloatField(blank=True, null=True)),
+                ('api_key', models.CharField(blank=True, max_length=50, null=True)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='sportApp.match')),
+            ],
+            options={
+                'unique_together': {('match', 'period', 'group_name', 'stat_name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.CharField(max_length=255)),
+                ('api_id', models.IntegerField(unique=True)),
+                ('players', models.ManyToManyField(related_name='teams', to='sportApp.player')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='away_team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='matches_away', to='sportApp.team'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='home_team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='matches_home', to='sportApp.team'),
+        ),
+        migrations.CreateModel(
+            name='UniqueTournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.CharField(max_length=255, unique=True)),
+                ('groundType', models.CharField(max_length=255)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='sportApp.category')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='unique_tournament',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='sportApp.uniquetournament'),
+        ),
+        migrations.DeleteModel(
+            name='Score',
+        ),
+        migrations.DeleteModel(
+            name='Statistic',
+        ),
+        migrations.RemoveField(
+            model_name='tournament',
+            name='country',
+        ),
+        migrations.RemoveField(
+            model_name='tournament',
+            name='sport',
+        ),
+        migrations.AlterUniqueTogether(
+            name='tournament',
+            unique_together={('name', 'slug', 'api_id')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0002_sync_models_with_importer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['-start_timestamp', '-id'], name='match_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['tournament', '-start_timestamp', '-id'], name='match_tournament_start_idx'),
+        ),
+    ]
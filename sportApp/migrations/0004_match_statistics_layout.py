@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0003_match_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='statistics_layout',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
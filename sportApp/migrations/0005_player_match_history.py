@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_player_matches(apps, schema_editor):
+    """
+    Заполняет PlayerMatch для уже импортированных матчей.
+    """
+    Match = apps.get_model('sportApp', 'Match')
+    PlayerMatch = apps.get_model('sportApp', 'PlayerMatch')
+    TeamPlayers = apps.get_model('sportApp', 'Team').players.through
+
+    rosters = {}
+    for team_id, player_id in TeamPlayers.objects.values_list('team_id', 'player_id'):
+        rosters.setdefault(team_id, []).append(player_id)
+
+    links = []
+    matches = Match.objects.values_list('id', 'home_team_id', 'away_team_id', 'winner_code', 'start_timestamp')
+    for match_id, home_team_id, away_team_id, winner_code, start_timestamp in matches.iterator():
+        for team_id, is_home, side_code in ((home_team_id, True, 1), (away_team_id, False, 2)):
+            for player_id in rosters.get(team_id, []):
+                links.append(PlayerMatch(
+                    player_id=player_id, match_id=match_id, team_id=team_id, is_home=is_home,
+                    won=None if winner_code not in (1, 2) else winner_code == side_code,
+                    start_timestamp=start_timestamp,
+                ))
+        if len(links) >= 5000:
+            PlayerMatch.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    PlayerMatch.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0004_match_statistics_layout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_home', models.BooleanField()),
+                ('won', models.BooleanField(blank=True, null=True)),
+                ('start_timestamp', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['home_team', '-start_timestamp', '-id'], name='match_home_team_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['away_team', '-start_timestamp', '-id'], name='match_away_team_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='match',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_links', to='sportApp.match'),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_links', to='sportApp.player'),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sportApp.team'),
+        ),
+        migrations.AddIndex(
+            model_name='playermatch',
+            index=models.Index(fields=['player', '-start_timestamp', '-match'], name='playermatch_player_start_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playermatch',
+            unique_together={('player', 'match')},
+        ),
+        migrations.RunPython(backfill_player_matches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0005_player_match_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playermatch',
+            name='aces',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='break_points_converted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='break_points_faced',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='break_points_saved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='counted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='double_faults',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='season',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sportApp.season'),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='sets_lost',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='sets_won',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playermatch',
+            name='surface',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='PlayerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('surface', models.CharField(blank=True, default='', max_length=255)),
+                ('matches', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('sets_won', models.IntegerField(default=0)),
+                ('sets_lost', models.IntegerField(default=0)),
+                ('aces', models.IntegerField(default=0)),
+                ('double_faults', models.IntegerField(default=0)),
+                ('break_points_saved', models.IntegerField(default=0)),
+                ('break_points_faced', models.IntegerField(default=0)),
+                ('break_points_converted', models.IntegerField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='sportApp.player')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sportApp.season')),
+            ],
+            options={
+                'unique_together': {('player', 'season', 'surface')},
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_head_to_head(apps, schema_editor):
+    """
+    Строит индекс личных встреч по уже импортированным матчам (PlayerMatch и MatchSet).
+    """
+    PlayerMatch = apps.get_model('sportApp', 'PlayerMatch')
+    MatchSet = apps.get_model('sportApp', 'MatchSet')
+    HeadToHead = apps.get_model('sportApp', 'HeadToHead')
+
+    sides = {}
+    for match_id, player_id, is_home, won, start in PlayerMatch.objects.values_list(
+        'match_id', 'player_id', 'is_home', 'won', 'start_timestamp'
+    ).iterator():
+        match = sides.setdefault(match_id, {'home': [], 'away': [], 'home_won': None, 'start': start})
+        match['home' if is_home else 'away'].append(player_id)
+        if won is not None:
+            match['home_won'] = won if is_home else not won
+
+    sets = {}
+    for match_id, hs, as_ in MatchSet.objects.order_by('set_number').values_list(
+        'match_id', 'home_score', 'away_score'
+    ).iterator():
+        sets.setdefault(match_id, []).append((hs, as_))
+
+    pairs = {}
+    for match_id, match in sides.items():
+        doubles = len(match['home']) > 1 or len(match['away']) > 1
+        for home_id in match['home']:
+            for away_id in match['away']:
+                low_is_home = home_id < away_id
+                winner = None
+                if match['home_won'] is not None:
+                    winner = 'low' if match['home_won'] == low_is_home else 'high'
+                pairs.setdefault((min(home_id, away_id), max(home_id, away_id)), []).append({
+                    'match_id': match_id,
+                    'start_timestamp': int(match['start'].timestamp()) if match['start'] else 0,
+                    'winner': winner,
+                    'sets': [[hs, as_] if low_is_home else [as_, hs] for hs, as_ in sets.get(match_id, [])],
+                    'doubles': doubles,
+                })
+
+    rows = []
+    for (low, high), matches in pairs.items():
+        matches.sort(key=lambda e: (e['start_timestamp'], e['match_id']), reverse=True)
+        rows.append(HeadToHead(
+            player_low_id=low,
+            player_high_id=high,
+            low_wins=sum(1 for e in matches if e['winner'] == 'low'),
+            high_wins=sum(1 for e in matches if e['winner'] == 'high'),
+            matches=matches,
+        ))
+    HeadToHead.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0006_player_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('low_wins', models.IntegerField(default=0)),
+                ('high_wins', models.IntegerField(default=0)),
+                ('matches', models.JSONField(default=list)),
+                ('player_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sportApp.player')),
+                ('player_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sportApp.player')),
+            ],
+            options={
+                'unique_together': {('player_low', 'player_high')},
+            },
+        ),
+        migrations.RunPython(backfill_head_to_head, migrations.RunPython.noop),
+    ]
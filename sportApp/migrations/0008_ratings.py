@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0007_head_to_head'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_start_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('last_match_id', models.BigIntegerField(default=0)),
+                ('per_surface', models.BooleanField(default=False)),
+                ('k_factor', models.FloatField()),
+                ('matches', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RatingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('surface', models.CharField(blank=True, default='', max_length=255)),
+                ('rating', models.FloatField()),
+                ('matches', models.IntegerField(default=0)),
+                ('as_of', models.DateTimeField()),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to='sportApp.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['player', 'surface', '-as_of'], name='ratingsnapshot_latest_idx')],
+                'unique_together': {('player', 'surface', 'as_of')},
+            },
+        ),
+    ]
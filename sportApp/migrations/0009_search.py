@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+FTS_TABLE = 'sportApp_searchentry_fts'
+ENTRY_TABLE = 'sportApp_searchentry'
+
+# Внешний контент (content=) - текст хранится только в SearchEntry, FTS5 держит лишь триграммы.
+# Триггеры повторяют в FTS-таблице каждую вставку, изменение и удаление строки индекса.
+FTS_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"text, content='{ENTRY_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {ENTRY_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER {ENTRY_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER {ENTRY_TABLE}_au AFTER UPDATE OF text ON {ENTRY_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+]
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {ENTRY_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {ENTRY_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {ENTRY_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+_NOT_WORD = re.compile(r'[\W_]+')
+
+
+# Нормализация текста - копия sportApp.search на момент миграции,
+# чтобы дальнейшие правки поиска не меняли то, что делает миграция
+def normalize(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return _NOT_WORD.sub(' ', value.casefold()).strip()
+
+
+def entry_text(*parts):
+    words = {}
+    for part in parts:
+        for word in normalize(part).split():
+            words.setdefault(word, None)
+    return ' '.join(words)
+
+
+def create_fts(apps, schema_editor):
+    # Только SQLite; на других базах поиск идёт по SearchEntry без триграмм
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+def backfill_search(apps, schema_editor):
+    """
+    Заполняет индекс уже импортированными игроками, парными командами и турнирами.
+    """
+    SearchEntry = apps.get_model('sportApp', 'SearchEntry')
+    sources = (
+        ('player', apps.get_model('sportApp', 'Player'), ('name', 'short_name', 'slug')),
+        ('team', apps.get_model('sportApp', 'Team'), ('name', 'slug')),
+        ('tournament', apps.get_model('sportApp', 'Tournament'), ('name', 'slug')),
+    )
+    for kind, model, fields in sources:
+        objects = model.objects.all()
+        if kind == 'team':
+            # Одиночные команды (тот же api_id, что у игрока) не индексируются
+            objects = objects.exclude(api_id__in=sources[0][1].objects.exclude(api_id=None).values('api_id'))
+        entries = []
+        for object_id, *values in objects.values_list('id', *fields).iterator():
+            entries.append(SearchEntry(kind=kind, object_id=object_id, name=values[0], text=entry_text(*values)))
+            if len(entries) >= 5000:
+                SearchEntry.objects.bulk_create(entries)
+                entries = []
+        SearchEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0008_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('text', models.CharField(max_length=1024)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['text'], name='searchentry_text_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(backfill_search, migrations.RunPython.noop),
+    ]
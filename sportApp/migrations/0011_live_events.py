@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('data', models.JSONField()),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='live_events', to='sportApp.match')),
+            ],
+        ),
+    ]
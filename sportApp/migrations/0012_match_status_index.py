@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0011_live_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['status_code', '-start_timestamp', '-id'], name='match_status_start_idx'),
+        ),
+    ]
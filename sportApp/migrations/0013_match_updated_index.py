@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0012_match_status_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['updated_at'], name='match_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportApp', '0013_match_updated_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='match',
+            name='match_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='result_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['result_changed_at'], name='match_result_changed_idx'),
+        ),
+    ]
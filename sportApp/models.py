@@ -59,6 +59,8 @@ class Player(models.Model):
     country_name = models.CharField(max_length=255, null=True, blank=True)
     # Если из API есть некий уникальный ID для игрока:
     api_id = models.IntegerField(unique=True, null=True, blank=True)
+    # Когда импорт последний раз записал строку - из этого строится ETag в JSON API
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -71,6 +73,7 @@ class Team(models.Model):
     name = models.CharField(max_length=255)
     slug = models.CharField(max_length=255, unique=False)  # Бывает, что slug у игрока повторяется, но для команды можно хранить иначе
     api_id = models.IntegerField(unique=True)  # Например, 198223 (Fomin S.) или 63438 (McDonald M.)
+    updated_at = models.DateTimeField(auto_now=True)
 
     # Признак, что это "сборная"/"национальная команда" и т.п. – если потребуется
     # country_alpha2 = ...
@@ -95,10 +98,154 @@ class Match(models.Model):
     status_description = models.CharField(max_length=255, null=True, blank=True)
     start_timestamp = models.DateTimeField(null=True, blank=True)  # Можно преобразовать из unix timestamp
     # Доп. поля для финального счёта и т.д.
+    # Статистика, сгруппированная по периодам и группам для match_detail (см. build_statistics_layout).
+    # Пересчитывается при каждом импорте статистики матча.
+    statistics_layout = models.JSONField(null=True, blank=True)
+    # Когда импорт последний раз записал матч (вместе с его сетами и статистикой)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Когда импорт последний раз изменил результат, который берут рейтинги: победителя или время начала
+    # (см. match_import.rating_result). Пусто, если результата нет
+    result_changed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Список матчей листается по ключу (start_timestamp, id) от новых к старым
+            models.Index(fields=['-start_timestamp', '-id'], name='match_start_id_idx'),
+            models.Index(fields=['tournament', '-start_timestamp', '-id'], name='match_tournament_start_idx'),
+            # Фильтр по статусу в админке и его список вариантов (см. admin.StatusFilter)
+            models.Index(fields=['status_code', '-start_timestamp', '-id'], name='match_status_start_idx'),
+            # История матчей команды (team_detail): OR по двум индексам
+            models.Index(fields=['home_team', '-start_timestamp', '-id'], name='match_home_team_start_idx'),
+            models.Index(fields=['away_team', '-start_timestamp', '-id'], name='match_away_team_start_idx'),
+            # Матчи, результат которых изменился после прошлого пересчёта рейтингов (см. ratings.changed_before)
+            models.Index(fields=['result_changed_at'], name='match_result_changed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.home_team} vs {self.away_team} ({self.event_id})"
 
+# ---- Связь игрок → матч (денормализация для истории игрока) ----
+# Заполняется импортом, чтобы история игрока читалась одним индексным запросом
+# без OR по home_team/away_team через Team.players.
+class PlayerMatch(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='match_links')
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='player_links')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+')
+    is_home = models.BooleanField()
+    won = models.BooleanField(null=True, blank=True)  # None - победитель ещё не определён
+    start_timestamp = models.DateTimeField(null=True, blank=True)  # копия Match.start_timestamp
+    # Вклад матча в PlayerRollup (см. import_scripts/rollups.py). counted - вклад уже учтён
+    # в строке (player, season, surface): при переимпорте в сводку добавляется только разница.
+    season = models.ForeignKey(Season, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    surface = models.CharField(max_length=255, blank=True, default='')
+    counted = models.BooleanField(default=False)
+    sets_won = models.PositiveIntegerField(default=0)
+    sets_lost = models.PositiveIntegerField(default=0)
+    aces = models.PositiveIntegerField(default=0)
+    double_faults = models.PositiveIntegerField(default=0)
+    break_points_saved = models.PositiveIntegerField(default=0)
+    break_points_faced = models.PositiveIntegerField(default=0)
+    break_points_converted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("player", "match")
+        indexes = [
+            models.Index(fields=['player', '-start_timestamp', '-match'], name='playermatch_player_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.player} in {self.match}"
+
+# ---- Сводная статистика игрока за сезон на одном покрытии ----
+# Ведётся импортом по разнице вкладов PlayerMatch, полностью пересчитывается командой rebuild_rollups.
+class PlayerRollup(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='rollups')
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name='+')
+    surface = models.CharField(max_length=255, blank=True, default='')  # UniqueTournament.groundType
+    matches = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    sets_won = models.IntegerField(default=0)
+    sets_lost = models.IntegerField(default=0)
+    aces = models.IntegerField(default=0)
+    double_faults = models.IntegerField(default=0)
+    break_points_saved = models.IntegerField(default=0)
+    break_points_faced = models.IntegerField(default=0)
+    break_points_converted = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("player", "season", "surface")
+
+    def __str__(self):
+        return f"{self.player} | {self.season} | {self.surface}"
+
+# ---- Личные встречи пары игроков-соперников (и в одиночном, и в парном разряде) ----
+# Ключ - (меньший id, больший id), результаты и счёт хранятся с точки зрения player_low.
+# Ведётся импортом (import_scripts/head_to_head.py).
+class HeadToHead(models.Model):
+    player_low = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    player_high = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    low_wins = models.IntegerField(default=0)
+    high_wins = models.IntegerField(default=0)
+    # [{"match_id", "start_timestamp" (unix time), "winner": "low"/"high"/null,
+    #   "sets": [[очки low, очки high], ...], "doubles": bool}] от новых матчей к старым
+    matches = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ("player_low", "player_high")
+
+    def __str__(self):
+        return f"{self.player_low} vs {self.player_high}"
+
+# ---- Рейтинги Эло (см. sportApp/ratings.py) ----
+# Запуск пересчёта: до какого матча (start_timestamp, id) история уже учтена - с него
+# продолжает следующий инкрементальный запуск.
+class RatingRun(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_start_timestamp = models.DateTimeField(null=True, blank=True)
+    last_match_id = models.BigIntegerField(default=0)
+    per_surface = models.BooleanField(default=False)
+    k_factor = models.FloatField()
+    matches = models.IntegerField(default=0)  # сколько матчей учтено в этом запуске
+
+    def __str__(self):
+        return f"Rating run {self.created_at:%Y-%m-%d %H:%M} up to {self.last_start_timestamp}"
+
+# Рейтинг игрока после запуска, в котором он изменился. surface "" - общий рейтинг.
+class RatingSnapshot(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='ratings')
+    surface = models.CharField(max_length=255, blank=True, default='')
+    rating = models.FloatField()
+    matches = models.IntegerField(default=0)
+    as_of = models.DateTimeField()  # start_timestamp последнего учтённого матча
+
+    class Meta:
+        unique_together = ("player", "surface", "as_of")
+        indexes = [
+            models.Index(fields=['player', 'surface', '-as_of'], name='ratingsnapshot_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.player} {self.surface or 'overall'}: {self.rating:.0f}"
+
+# ---- Поисковый индекс (см. sportApp/search.py) ----
+# Строка на игрока, команду или турнир. На SQLite по колонке text построена
+# FTS5-таблица с триграммами, её синхронизируют триггеры (миграция 0009).
+class SearchEntry(models.Model):
+    kind = models.CharField(max_length=16)  # "player", "team" или "tournament"
+    object_id = models.BigIntegerField()
+    name = models.CharField(max_length=255)  # как показывать в подсказке
+    text = models.CharField(max_length=1024)  # нормализованные имя, короткое имя и slug
+
+    class Meta:
+        unique_together = ("kind", "object_id")
+        indexes = [
+            models.Index(fields=['text'], name='searchentry_text_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.name}"
+
 # ---- Сеты (чтобы хранить, например, счёт по каждому сету) ----
 class MatchSet(models.Model):
     match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='sets')
@@ -136,3 +283,15 @@ class MatchStatistics(models.Model):
 
     def __str__(self):
         return f"{self.match.event_id} | {self.period} | {self.group_name} | {self.stat_name}"
+
+# ---- Изменения счёта идущих матчей (см. import_scripts/live.py) ----
+# Команда live_matches пишет сюда каждое изменение статуса или счёта, а поток
+# /live/stream/ (Server-Sent Events) читает новые строки по возрастанию id.
+# Таблица служит очередью между процессом опроса и веб-сервером, старые строки удаляются.
+class LiveEvent(models.Model):
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='live_events')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    data = models.JSONField()  # статус, победитель и сеты матча после изменения
+
+    def __str__(self):
+        return f"{self.id}: match {self.match_id}"
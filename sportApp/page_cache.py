@@ -0,0 +1,91 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from sportApp.models import Match, Player, Team
+from sportApp.signals import objects_imported
+
+# Какие страницы зависят от какой модели
+PAGE_KINDS = {Match: 'match', Team: 'team', Player: 'player'}
+
+
+def page_cache_key(kind, object_id):
+    return f"page:{kind}:{object_id}"
+
+
+def cacheable(request):
+    return request.method == 'GET' and not request.GET
+
+
+def cached_response(cached):
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def page_to_cache(response):
+    if response.status_code == 200 and not response.streaming:
+        return response.content, response['Content-Type']
+    return None
+
+
+def page_timeout(response):
+    # view может задать срок сам (response.page_cache_timeout, None - без срока)
+    return getattr(response, 'page_cache_timeout', settings.PAGE_CACHE_TIMEOUT)
+
+
+def cache_object_page(kind, url_kwarg):
+    """
+    Кэширует готовую страницу объекта под ключом page:<kind>:<id> на PAGE_CACHE_TIMEOUT секунд
+    или на срок из response.page_cache_timeout: завершённые матчи - без срока.
+    Запись удаляется, когда импорт снова пишет этот объект (см. invalidate_pages),
+    поэтому завершённые матчи отдаются из кэша, пока их никто не переимпортирует.
+    Кэшируются только GET без параметров и только успешные ответы.
+    Работает и с синхронными, и с асинхронными view.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not cacheable(request):
+                    return await view(request, *args, **kwargs)
+
+                key = page_cache_key(kind, kwargs[url_kwarg])
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return cached_response(cached)
+
+                response = await view(request, *args, **kwargs)
+                page = page_to_cache(response)
+                if page is not None:
+                    await cache.aset(key, page, timeout=page_timeout(response))
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(kind, kwargs[url_kwarg])
+            cached = cache.get(key)
+            if cached is not None:
+                return cached_response(cached)
+
+            response = view(request, *args, **kwargs)
+            page = page_to_cache(response)
+            if page is not None:
+                cache.set(key, page, timeout=page_timeout(response))
+            return response
+        return wrapper
+    return decorator
+
+
+@receiver(objects_imported)
+def invalidate_pages(sender, ids, **kwargs):
+    kind = PAGE_KINDS.get(sender)
+    if kind:
+        cache.delete_many([page_cache_key(kind, object_id) for object_id in ids])
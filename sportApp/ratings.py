@@ -0,0 +1,222 @@
+import logging
+from array import array
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+
+from sportApp.models import Match, Player, PlayerMatch, RatingRun, RatingSnapshot
+from sportApp.signals import objects_imported
+
+INITIAL_RATING = 1500.0
+DEFAULT_K = 32.0
+CHUNK_SIZE = 5000
+
+# Матч без победителя моложе этого окна (от самого нового матча) может ещё закончиться:
+# пересчёт на нём останавливается и продолжит с него в следующий раз.
+# Более старые матчи без победителя (отмены, переносы) просто пропускаются.
+SETTLE_WINDOW = timedelta(days=2)
+
+logger = logging.getLogger(__name__)
+
+
+class RatingEngine:
+    """
+    Рейтинги Эло в плотных массивах array('d'), индекс - id игрока.
+    Общий рейтинг хранится под surface "", при per_surface - ещё и отдельно для каждого покрытия.
+    В парах сравнивается средний рейтинг сторон, изменение получает каждый игрок стороны.
+    """
+
+    def __init__(self, k=DEFAULT_K, initial=INITIAL_RATING, per_surface=False):
+        self.k = k
+        self.initial = initial
+        self.per_surface = per_surface
+        self.ratings = {}  # surface -> array('d')
+        self.counts = {}   # surface -> array('l'), сколько матчей учтено
+        self.marked = {}   # surface -> копия counts на момент mark()
+
+    def table(self, surface, size):
+        ratings = self.ratings.get(surface)
+        if ratings is None:
+            ratings = self.ratings[surface] = array('d')
+            self.counts[surface] = array('l')
+        if len(ratings) < size:
+            grow = max(size, 2 * len(ratings)) - len(ratings)
+            ratings.extend(array('d', [self.initial]) * grow)
+            self.counts[surface].extend(array('l', [0]) * grow)
+        return ratings, self.counts[surface]
+
+    def set(self, player_id, surface, rating, matches):
+        ratings, counts = self.table(surface, player_id + 1)
+        ratings[player_id] = rating
+        counts[player_id] = matches
+
+    def rate(self, home_ids, away_ids, home_won, surface=''):
+        size = max(max(home_ids), max(away_ids)) + 1
+        self.rate_table(self.table('', size), home_ids, away_ids, home_won)
+        if self.per_surface and surface:
+            self.rate_table(self.table(surface, size), home_ids, away_ids, home_won)
+
+    def rate_table(self, table, home_ids, away_ids, home_won):
+        ratings, counts = table
+        home = sum(ratings[p] for p in home_ids) / len(home_ids)
+        away = sum(ratings[p] for p in away_ids) / len(away_ids)
+        expected = 1.0 / (1.0 + 10.0 ** ((away - home) / 400.0))
+        delta = self.k * ((1.0 if home_won else 0.0) - expected)
+        for p in home_ids:
+            ratings[p] += delta
+            counts[p] += 1
+        for p in away_ids:
+            ratings[p] -= delta
+            counts[p] += 1
+
+    def mark(self):
+        # Запоминаем число матчей, чтобы потом отдать только изменившихся игроков
+        self.marked = {surface: array('l', counts) for surface, counts in self.counts.items()}
+
+    def changed(self):
+        """
+        (player_id, surface, рейтинг, матчей) для игроков, сыгравших после mark().
+        """
+        for surface, counts in self.counts.items():
+            marked = self.marked.get(surface, array('l'))
+            ratings = self.ratings[surface]
+            for player_id, count in enumerate(counts):
+                if count and (player_id >= len(marked) or marked[player_id] != count):
+                    yield player_id, surface, ratings[player_id], count
+
+
+def latest_snapshots():
+    """
+    Последний снимок каждой пары (игрок, покрытие): нет более нового as_of.
+    """
+    newer = RatingSnapshot.objects.filter(
+        player=OuterRef('player'), surface=OuterRef('surface'), as_of__gt=OuterRef('as_of')
+    )
+    return RatingSnapshot.objects.filter(~Exists(newer))
+
+
+def iter_settled_matches(after=None, chunk_size=CHUNK_SIZE):
+    """
+    Матчи с результатом в хронологическом порядке (start_timestamp, id) после позиции after,
+    пачками по chunk_size: (start_timestamp, id, игроки хозяев, игроки гостей, победили хозяева, покрытие).
+    Останавливается на первом матче без победителя в пределах SETTLE_WINDOW.
+    """
+    newest = Match.objects.aggregate(newest=Max('start_timestamp'))['newest']
+    if newest is None:
+        return
+    settle_from = newest - SETTLE_WINDOW
+    queryset = Match.objects.exclude(start_timestamp=None).order_by('start_timestamp', 'id')
+    while True:
+        chunk = queryset
+        if after:
+            start_timestamp, match_id = after
+            chunk = chunk.filter(
+                Q(start_timestamp__gt=start_timestamp) | Q(start_timestamp=start_timestamp, id__gt=match_id)
+            )
+        rows = list(chunk.values_list(
+            'id', 'start_timestamp', 'winner_code', 'tournament__unique_tournament__groundType'
+        )[:chunk_size])
+        if not rows:
+            return
+        sides = {}
+        for match_id, player_id, is_home in PlayerMatch.objects.filter(
+            match_id__in=[row[0] for row in rows]
+        ).values_list('match_id', 'player_id', 'is_home'):
+            sides.setdefault(match_id, ([], []))[0 if is_home else 1].append(player_id)
+
+        for match_id, start_timestamp, winner_code, surface in rows:
+            if winner_code not in (1, 2):
+                if start_timestamp >= settle_from:
+                    return
+                continue
+            home_ids, away_ids = sides.get(match_id, ([], []))
+            if home_ids and away_ids:
+                yield start_timestamp, match_id, home_ids, away_ids, winner_code == 1, surface or ''
+        after = rows[-1][1], rows[-1][0]
+
+
+def changed_before(last_run):
+    """
+    Матчи не позже отметки last_run, результат которых изменился после него (result_changed_at):
+    догруженные задним числом, получившие победителя за пределами SETTLE_WINDOW или другого победителя.
+    Дописыванием их не учесть. Повторный импорт с тем же результатом сюда не попадает.
+    """
+    if last_run.last_start_timestamp is None:
+        return Match.objects.none()
+    return Match.objects.filter(
+        Q(start_timestamp__lt=last_run.last_start_timestamp)
+        | Q(start_timestamp=last_run.last_start_timestamp, id__lte=last_run.last_match_id),
+        result_changed_at__gt=last_run.created_at,
+    )
+
+
+def update_ratings(full=False, per_surface=False, k=DEFAULT_K, chunk_size=CHUNK_SIZE):
+    """
+    Дописывает в рейтинги матчи после последнего запуска (или всю историю при full).
+    Если с прошлого запуска изменились матчи до его отметки (changed_before), сам переходит к полному пересчёту.
+    Считает вне транзакции, записывает снимки изменившихся игроков и RatingRun одной транзакцией.
+    Возвращает RatingRun или None, если новых матчей нет.
+    """
+    last_run = None if full else RatingRun.objects.order_by('-id').first()
+    if last_run and (last_run.per_surface != per_surface or last_run.k_factor != k):
+        raise ValueError(
+            "Параметры рейтинга отличаются от прошлого запуска - нужен полный пересчёт (full)"
+        )
+    if last_run:
+        changed = changed_before(last_run).count()
+        if changed:
+            logger.warning(
+                "%d matches before %s changed since the last rating run, replaying full history",
+                changed, last_run.last_start_timestamp,
+            )
+            full = True
+            last_run = None
+
+    engine = RatingEngine(k, per_surface=per_surface)
+    after = None
+    if last_run:
+        for player_id, surface, rating, matches in latest_snapshots().values_list(
+            'player_id', 'surface', 'rating', 'matches'
+        ):
+            engine.set(player_id, surface, rating, matches)
+        if last_run.last_start_timestamp is not None:
+            after = last_run.last_start_timestamp, last_run.last_match_id
+    engine.mark()
+
+    processed = 0
+    last = after
+    for start_timestamp, match_id, home_ids, away_ids, home_won, surface in iter_settled_matches(after, chunk_size):
+        engine.rate(home_ids, away_ids, home_won, surface)
+        processed += 1
+        last = start_timestamp, match_id
+    if not processed and not full:
+        return None
+
+    snapshots = [
+        RatingSnapshot(player_id=player_id, surface=surface, rating=rating, matches=matches, as_of=last[0])
+        for player_id, surface, rating, matches in engine.changed()
+    ]
+    with transaction.atomic():
+        if full:
+            RatingSnapshot.objects.all().delete()
+            RatingRun.objects.all().delete()
+        RatingSnapshot.objects.bulk_create(
+            snapshots,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['player', 'surface', 'as_of'],
+            update_fields=['rating', 'matches'],
+        )
+        run = RatingRun.objects.create(
+            last_start_timestamp=last[0] if last else None,
+            last_match_id=last[1] if last else 0,
+            per_surface=per_surface,
+            k_factor=k,
+            matches=processed,
+        )
+    # Рейтинг показывается на странице игрока - сбрасываем её кэш
+    player_ids = sorted({snapshot.player_id for snapshot in snapshots})
+    if player_ids:
+        objects_imported.send(sender=Player, ids=player_ids, changed=[])
+    return run
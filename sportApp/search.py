@@ -0,0 +1,299 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.dispatch import receiver
+from django.urls import reverse
+
+from sportApp.import_scripts.match_import import IN_QUERY_CHUNK
+from sportApp.models import Player, SearchEntry, Team, Tournament
+from sportApp.signals import objects_imported
+
+# FTS5-таблица с триграммами по SearchEntry.text (создаётся миграцией 0009 только на SQLite)
+FTS_TABLE = 'sportApp_searchentry_fts'
+
+# Что индексируется: вид -> (модель, поля для текста; первое - показываемое имя)
+SOURCES = {
+    'player': (Player, ('name', 'short_name', 'slug')),
+    'team': (Team, ('name', 'slug')),
+    'tournament': (Tournament, ('name', 'slug')),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+KIND_ORDER = {kind: n for n, kind in enumerate(SOURCES)}
+
+# Сколько строк-кандидатов берётся из каждого запроса к индексу перед ранжированием
+# (кандидатов с опечатками меньше: каждого приходится сверять посимвольно)
+CANDIDATES = 200
+FUZZY_CANDIDATES = 100
+# Меньше трёх символов триграммный индекс не ищет - только префикс всего текста
+MIN_SUBSTRING = 3
+
+_NOT_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(value):
+    """
+    Текст для поиска: без диакритики, в нижнем регистре, слова через один пробел.
+    """
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return _NOT_WORD.sub(' ', value.casefold()).strip()
+
+
+def entry_text(*parts):
+    # Слова всех полей без повторов (slug обычно повторяет имя), порядок как в полях
+    words = {}
+    for part in parts:
+        for word in normalize(part).split():
+            words.setdefault(word, None)
+    return ' '.join(words)
+
+
+# Есть ли FTS-таблица: {(alias соединения, имя БД): bool}, проверяется один раз на базу
+_fts_tables = {}
+
+
+def fts_enabled():
+    if connection.vendor != 'sqlite':
+        return False
+    # Имя БД в ключе: тесты и бенчмарки подменяют базу под тем же alias
+    key = connection.alias, connection.settings_dict['NAME']
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def sync_entries(kind, rows):
+    """
+    Записывает в индекс строки (object_id, имя, текст), которых там нет или которые изменились.
+    Неизменившиеся не перезаписываются, чтобы триггеры не трогали FTS-таблицу зря.
+    Возвращает число записанных строк.
+    """
+    rows = {object_id: (name, text) for object_id, name, text in rows}
+    existing = {}
+    ids = list(rows)
+    for start in range(0, len(ids), IN_QUERY_CHUNK):
+        for object_id, name, text in SearchEntry.objects.filter(
+            kind=kind, object_id__in=ids[start:start + IN_QUERY_CHUNK]
+        ).values_list('object_id', 'name', 'text'):
+            existing[object_id] = (name, text)
+    changed = [
+        SearchEntry(kind=kind, object_id=object_id, name=name, text=text)
+        for object_id, (name, text) in rows.items()
+        if existing.get(object_id) != (name, text)
+    ]
+    SearchEntry.objects.bulk_create(
+        changed,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['name', 'text'],
+    )
+    return len(changed)
+
+
+def source_objects(kind):
+    model, _ = SOURCES[kind]
+    if model is Team:
+        # Одиночная команда - это сам игрок (тот же api_id), в подсказках она его бы повторяла
+        return Team.objects.exclude(api_id__in=Player.objects.exclude(api_id=None).values('api_id'))
+    return model.objects.all()
+
+
+def source_rows(kind, queryset):
+    _, fields = SOURCES[kind]
+    for object_id, *values in queryset.values_list('id', *fields):
+        yield object_id, values[0], entry_text(*values)
+
+
+def index_objects(model, ids):
+    """
+    Обновляет индекс для объектов модели с этими id. Возвращает число записанных строк.
+    """
+    kind = KINDS[model]
+    ids = list(ids)
+    written = 0
+    for start in range(0, len(ids), IN_QUERY_CHUNK):
+        chunk = source_objects(kind).filter(id__in=ids[start:start + IN_QUERY_CHUNK])
+        written += sync_entries(kind, source_rows(kind, chunk))
+    return written
+
+
+def rebuild_index(chunk_size=5000):
+    """
+    Сверяет индекс со всеми игроками, парными командами и турнирами: дописывает недостающее
+    и изменившееся, удаляет строки удалённых объектов. Возвращает {вид: записано строк}.
+    """
+    written = {}
+    for kind in SOURCES:
+        objects = source_objects(kind)
+        written[kind] = 0
+        last_id = 0
+        while True:
+            rows = list(source_rows(kind, objects.filter(id__gt=last_id).order_by('id')[:chunk_size]))
+            if not rows:
+                break
+            written[kind] += sync_entries(kind, rows)
+            last_id = rows[-1][0]
+        SearchEntry.objects.filter(kind=kind).exclude(object_id__in=objects.values('id')).delete()
+    return written
+
+
+@receiver(objects_imported)
+def index_imported(sender, ids, changed=None, **kwargs):
+    # Индекс зависит только от имён: объекты, у которых записаны лишь матчи, не перечитываем
+    if sender in KINDS:
+        index_objects(sender, ids if changed is None else changed)
+
+
+# ---- Поиск ----
+
+def pieces(query, count):
+    # query, разрезанный на count подряд идущих кусков почти равной длины
+    size, extra = divmod(len(query), count)
+    bounds = [n * size + min(n, extra) for n in range(count + 1)]
+    return [query[bounds[n]:bounds[n + 1]] for n in range(count) if bounds[n] < bounds[n + 1]]
+
+
+def allowed_typos(query):
+    # Одна опечатка на короткий запрос, две на длинный; короче трёх символов - без опечаток
+    if len(query) < MIN_SUBSTRING:
+        return 0
+    return 1 if len(query) < 6 else 2
+
+
+def prefix_distance(query, text, limit, required=None):
+    """
+    Наименьшее число правок, за которое query становится началом какого-нибудь слова text
+    (расстояние Левенштейна до лучшего префикса). Больше limit - возвращает limit + 1.
+    required - pieces(query, limit + 1), если уже посчитаны.
+    """
+    best = limit + 1
+    size = len(query)
+    # При limit правках хотя бы один из limit + 1 кусков query остаётся целым:
+    # начала слов, где нет ни одного куска, можно не считать
+    if required is None:
+        required = pieces(query, limit + 1)
+    for start in [0] + [m.end() for m in re.finditer(' ', text)]:
+        word = text[start:start + size + limit]
+        width = len(word)
+        if width < size - limit or not any(piece in word for piece in required):
+            continue
+        # Считаем только полосу |i - j| <= limit: клетки дальше заведомо больше limit
+        previous = list(range(width + 1))
+        for i, char in enumerate(query, start=1):
+            current = [min(i, best)] + [best] * width
+            for j in range(max(1, i - limit), min(width, i + limit) + 1):
+                current[j] = min(
+                    previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != word[j - 1]), best
+                )
+            if min(current) >= best:
+                break
+            previous = current
+        else:
+            best = min(previous)
+        if best == 0:
+            break
+    return best
+
+
+def match_tier(query, text, required=None):
+    """
+    Насколько хорошо text подходит под запрос (меньше - лучше) или None:
+    0 - начало текста, 1 - начало слова, 2 - подстрока, 3 и дальше - с опечатками.
+    """
+    if text.startswith(query):
+        return 0
+    if f' {query}' in text:
+        return 1
+    if query in text:
+        return 2
+    allowed = allowed_typos(query)
+    if not allowed:
+        return None
+    distance = prefix_distance(query, text, allowed, required)
+    return 2 + distance if distance <= allowed else None
+
+
+def fuzzy_terms(query):
+    """
+    Куски запроса для поиска кандидатов с опечатками: при k опечатках из k + 1 кусков
+    один остаётся подстрокой нужного имени. Триграммный индекс ищет куски от трёх символов,
+    поэтому кусков не больше len // 3; короткому запросу остаются все его триграммы.
+    """
+    if len(query) < 6:
+        return [query[n:n + 3] for n in range(len(query) - 2)]
+    return pieces(query, min(allowed_typos(query) + 1, len(query) // 3))
+
+
+def fts_query(terms):
+    return ' OR '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def fts_candidates(match, kinds, limit=CANDIDATES):
+    sql = (
+        f'SELECT e.id, e.kind, e.object_id, e.name, e.text FROM "{FTS_TABLE}" f '
+        f'JOIN "{SearchEntry._meta.db_table}" e ON e.id = f.rowid WHERE "{FTS_TABLE}" MATCH %s'
+    )
+    params = [match]
+    if kinds:
+        sql += f" AND e.kind IN ({', '.join(['%s'] * len(kinds))})"
+        params.extend(kinds)
+    sql += ' LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(query, limit=10, kinds=None):
+    """
+    Подсказки для строки query: [(вид, id объекта, имя)], лучшие первыми.
+    Сначала начало текста (B-tree индекс по text), затем начало слова и подстрока
+    (триграммы FTS5), и только если хороших совпадений мало - кандидаты с опечатками.
+    Без FTS5 (не SQLite) подстрока ищется через LIKE, опечатки не учитываются.
+    """
+    query = normalize(query)
+    if not query:
+        return []
+    entries = SearchEntry.objects.all()
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+    fields = ('id', 'kind', 'object_id', 'name', 'text')
+
+    found = {}
+
+    def take(rows):
+        for row in rows:
+            found.setdefault(row[0], row)
+
+    take(entries.filter(text__gte=query, text__lt=query + '\U0010ffff').values_list(*fields)[:limit])
+    if len(query) >= MIN_SUBSTRING and len(found) < limit:
+        fts = fts_enabled()
+        if fts:
+            take(fts_candidates(fts_query([f' {query}']), kinds))
+            if len(found) < limit:
+                take(fts_candidates(fts_query([query]), kinds))
+        else:
+            take(entries.filter(text__contains=query).values_list(*fields)[:CANDIDATES])
+        if fts and len(found) < limit:
+            take(fts_candidates(fts_query(fuzzy_terms(query)), kinds, FUZZY_CANDIDATES))
+
+    required = pieces(query, allowed_typos(query) + 1)
+    ranked = []
+    for _, kind, object_id, name, text in found.values():
+        tier = match_tier(query, text, required)
+        if tier is not None:
+            ranked.append(((tier, KIND_ORDER[kind], len(name), name), kind, object_id, name))
+    ranked.sort()
+    return [(kind, object_id, name) for _, kind, object_id, name in ranked[:limit]]
+
+
+def result_url(kind, object_id):
+    if kind == 'player':
+        return reverse('player_detail', args=[object_id])
+    if kind == 'team':
+        return reverse('team_detail', args=[object_id])
+    return f"{reverse('match_list')}?tournament={object_id}"
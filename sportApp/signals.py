@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Отправляется импортом матчей после того, как объекты записаны в БД.
+# sender - класс модели (Match, Team, Player или Tournament), ids - id записанных объектов.
+# Необязательный changed - те из ids, у которых записаны собственные поля (имя и т.п.),
+# а не только матчи с их участием; без него подписчик считает изменившимися все ids.
+# Необязательный live=True - у матчей записаны только статус и счёт идущей игры (live_matches):
+# кэш страниц их сбрасывает, а хранилище статистики, где нужны итоги, пропускает.
+objects_imported = Signal()
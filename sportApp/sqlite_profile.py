@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Выполняет PRAGMA из settings.SQLITE_PRAGMAS на каждом новом соединении с SQLite.
+    journal_mode=WAL сохраняется в файле БД, остальные действуют только на соединение.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,52 @@
+import math
+
+
+def calc_percent(value, total):
+    if value is None or total is None or total == 0:
+        return "N/A"
+    return f"{math.floor((float(value) / total) * 100)}%"
+
+
+def as_number(value):
+    # 6.0 -> 6, None остаётся None (значение может отсутствовать в API)
+    if value is None:
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 1)
+
+
+def build_statistics_layout(rows):
+    """
+    Группирует строки статистики по периоду и группе в готовую для шаблона структуру:
+    [{"period": "ALL", "groups": [{"groupName": "Service", "statisticsItems": [...]}]}].
+    rows - словари (или объекты MatchStatistics) с полями period, group_name, stat_name,
+    home_value, away_value, home_Total, away_Total. Порядок строк сохраняется.
+    Результат сохраняется в Match.statistics_layout при импорте.
+    """
+    grouped = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            row = row.__dict__
+        home_total = as_number(row['home_Total'])
+        away_total = as_number(row['away_Total'])
+        groups = grouped.setdefault(row['period'], {})
+        groups.setdefault(row['group_name'], []).append({
+            "name": row['stat_name'],
+            "home_value": as_number(row['home_value']),
+            "away_value": as_number(row['away_value']),
+            "home_total": home_total,
+            "away_total": away_total,
+            "home_percent": calc_percent(row['home_value'], home_total),
+            "away_percent": calc_percent(row['away_value'], away_total),
+        })
+
+    return [
+        {
+            "period": period,
+            "groups": [
+                {"groupName": group_name, "statisticsItems": items}
+                for group_name, items in groups.items()
+            ],
+        }
+        for period, groups in grouped.items()
+    ]
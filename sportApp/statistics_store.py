@@ -0,0 +1,416 @@
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from sportApp.import_scripts.match_import import IN_QUERY_CHUNK
+from sportApp.models import Match, MatchStatistics, PlayerMatch
+from sportApp.signals import objects_imported
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Таблицы хранилища: у каждой колонки свой файл <таблица>.<колонка>.bin
+TABLES = {
+    # Строка на каждую запись матча; при повторном импорте матч дописывается заново,
+    # актуальна последняя строка с этим match_id (см. valid_matches)
+    'matches': {
+        'match_id': 'int64',
+        'start_timestamp': 'int64',  # unix time, -1 если неизвестно
+        'season_id': 'int64',        # -1 если нет
+        'tournament_id': 'int64',
+        'surface': 'int16',          # код из словаря surfaces (groundType турнира)
+        'home_team_id': 'int64',
+        'away_team_id': 'int64',
+        'winner_code': 'int8',       # 0 если победителя нет
+    },
+    # Строка статистики: номер строки матча, коды периода и показателя, значения (NaN - нет значения)
+    'stats': {
+        'match_row': 'int64',
+        'period': 'int16',
+        'stat': 'int32',
+        'home_value': 'float32',
+        'away_value': 'float32',
+        'home_total': 'float32',
+        'away_total': 'float32',
+    },
+    # Игроки сторон матча (из PlayerMatch)
+    'sides': {
+        'match_row': 'int64',
+        'player_id': 'int64',
+        'is_home': 'bool',
+    },
+}
+
+GROUP_BY = ('player', 'surface', 'season', 'tournament')
+
+# Доля устаревших версий среди строк matches, после которой append переписывает колонки (compact)
+COMPACT_THRESHOLD = 0.5
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Для хранилища статистики установите пакет numpy: pip install numpy")
+
+
+class StatisticsStore:
+    """
+    Колоночное хранилище статистики матчей для аналитики.
+    Строки (period, group_name, stat_name) кодируются словарями в целые числа,
+    каждая колонка - отдельный файл, читается через np.memmap.
+    Запись только дописыванием: meta.json хранит число строк каждой таблицы
+    и обновляется последним, поэтому недописанный хвост после сбоя просто отбрасывается.
+    Когда устаревших версий матчей становится больше COMPACT_THRESHOLD, колонки переписываются
+    без них (compact). Писать в хранилище должен один процесс (импорт).
+    """
+
+    def __init__(self, directory):
+        require_numpy()
+        self.directory = Path(directory)
+        self.meta = self.read_meta()
+        self.codes = {
+            kind: {tuple(v) if isinstance(v, list) else v: code for code, v in enumerate(values)}
+            for kind, values in self.meta['dictionaries'].items()
+        }
+        if 'superseded' not in self.meta:
+            # Хранилище, записанное до появления счётчика
+            self.meta['superseded'] = self.rows('matches') - int(self.valid_matches().sum())
+
+    @classmethod
+    def exists(cls, directory):
+        return directory is not None and (Path(directory) / 'meta.json').exists()
+
+    def read_meta(self):
+        try:
+            with open(self.directory / 'meta.json', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {
+                'rows': {table: 0 for table in TABLES},
+                'superseded': 0,  # строк matches, у которых есть более новая версия
+                'dictionaries': {'periods': [], 'stats': [], 'surfaces': []},
+            }
+
+    def write_meta(self, directory=None):
+        directory = Path(directory or self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = directory / 'meta.json.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_path, directory / 'meta.json')
+
+    def column_path(self, table, name, directory=None):
+        return Path(directory or self.directory) / f"{table}.{name}.bin"
+
+    def rows(self, table):
+        return self.meta['rows'][table]
+
+    def column(self, table, name):
+        dtype = np.dtype(TABLES[table][name])
+        rows = self.rows(table)
+        if not rows:
+            return np.empty(0, dtype)
+        return np.memmap(self.column_path(table, name), dtype=dtype, mode='r', shape=(rows,))
+
+    def encode(self, kind, value):
+        codes = self.codes[kind]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.meta['dictionaries'][kind].append(list(value) if isinstance(value, tuple) else value)
+        return code
+
+    def append(self, matches):
+        """
+        Дописывает матчи (словари из load_matches). Уже сохранённые матчи
+        дописываются новой версией, старая перестаёт учитываться в запросах.
+        """
+        if not matches:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        columns = {table: {name: [] for name in spec} for table, spec in TABLES.items()}
+        first_row = self.rows('matches')
+        for n, match in enumerate(matches):
+            match_row = first_row + n
+            row = columns['matches']
+            row['match_id'].append(match['match_id'])
+            row['start_timestamp'].append(match['start_timestamp'])
+            row['season_id'].append(match['season_id'])
+            row['tournament_id'].append(match['tournament_id'])
+            row['surface'].append(self.encode('surfaces', match['surface']))
+            row['home_team_id'].append(match['home_team_id'])
+            row['away_team_id'].append(match['away_team_id'])
+            row['winner_code'].append(match['winner_code'])
+
+            stats = columns['stats']
+            for s in match['statistics']:
+                stats['match_row'].append(match_row)
+                stats['period'].append(self.encode('periods', s['period']))
+                stats['stat'].append(self.encode('stats', (s['group_name'], s['stat_name'])))
+                for name in ('home_value', 'away_value', 'home_total', 'away_total'):
+                    stats[name].append(np.nan if s[name] is None else s[name])
+
+            for player_id, is_home in match['sides']:
+                columns['sides']['match_row'].append(match_row)
+                columns['sides']['player_id'].append(player_id)
+                columns['sides']['is_home'].append(is_home)
+
+        # Сколько дописанных строк заменяют уже сохранённые версии (или друг друга внутри пачки)
+        match_ids = np.asarray(columns['matches']['match_id'], dtype='int64')
+        new_ids = match_ids[~np.isin(match_ids, self.column('matches', 'match_id'))]
+        self.meta['superseded'] += len(match_ids) - len(np.unique(new_ids))
+
+        for table, spec in TABLES.items():
+            rows = self.rows(table)
+            for name, dtype in spec.items():
+                path = self.column_path(table, name)
+                with open(path, 'ab') as f:
+                    # Отрезаем хвост, оставшийся от прерванной записи
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+                    f.write(np.asarray(columns[table][name], dtype=dtype).tobytes())
+            self.meta['rows'][table] = rows + len(next(iter(columns[table].values())))
+        self.write_meta()
+        if self.meta['superseded'] > COMPACT_THRESHOLD * self.rows('matches'):
+            self.compact()
+
+    def compact(self):
+        """
+        Переписывает колонки, оставляя только последние версии матчей и их строки stats и sides.
+        Новые файлы пишутся в соседний каталог, который затем подменяет старый,
+        поэтому после сбоя остаётся одна из целых версий хранилища. Словари не меняются.
+        """
+        valid = self.valid_matches()
+        # Новый номер строки матча для каждой старой строки
+        new_rows = np.cumsum(valid) - 1
+        tmp_directory = self.directory.with_name(self.directory.name + '.compacting')
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        tmp_directory.mkdir(parents=True)
+        rows = {}
+        for table, spec in TABLES.items():
+            keep = valid if table == 'matches' else valid[np.asarray(self.column(table, 'match_row'))]
+            for name, dtype in spec.items():
+                values = np.asarray(self.column(table, name))[keep]
+                if name == 'match_row':
+                    values = new_rows[values]
+                with open(self.column_path(table, name, tmp_directory), 'wb') as f:
+                    f.write(np.asarray(values, dtype=dtype).tobytes())
+            rows[table] = int(keep.sum())
+        self.meta['rows'] = rows
+        self.meta['superseded'] = 0
+        self.write_meta(tmp_directory)
+        replace_directory(tmp_directory, self.directory)
+
+    def valid_matches(self):
+        """
+        Маска строк matches: True у последней версии каждого матча.
+        """
+        match_ids = self.column('matches', 'match_id')
+        mask = np.zeros(len(match_ids), dtype=bool)
+        if len(match_ids):
+            _, last_from_end = np.unique(match_ids[::-1], return_index=True)
+            mask[len(match_ids) - 1 - last_from_end] = True
+        return mask
+
+    def aggregate(self, stat_name, by=('player',), period='ALL', season_id=None, surface=None):
+        """
+        Сумма, число наблюдений и среднее показателя stat_name по группам by
+        (подмножество GROUP_BY). Наблюдение - значение одной стороны матча;
+        с группировкой по player - значение стороны, за которую играл игрок.
+        Возвращает список словарей {<ключи группы>, 'count', 'total', 'mean'}.
+        """
+        unknown = set(by) - set(GROUP_BY)
+        if unknown:
+            raise ValueError(f"Неизвестная группировка: {', '.join(sorted(unknown))}")
+        stat_codes = [code for code, (_, name) in enumerate(self.meta['dictionaries']['stats']) if name == stat_name]
+        period_code = self.codes['periods'].get(period)
+        if not stat_codes or period_code is None:
+            return []
+
+        match_mask = self.valid_matches()
+        if season_id is not None:
+            match_mask &= self.column('matches', 'season_id') == season_id
+        if surface is not None:
+            surface_code = self.codes['surfaces'].get(surface)
+            if surface_code is None:
+                return []
+            match_mask &= self.column('matches', 'surface') == surface_code
+
+        # Значения показателя по строкам матчей (NaN - показателя нет)
+        stat_rows = self.column('stats', 'match_row')
+        selected = (
+            np.isin(self.column('stats', 'stat'), stat_codes)
+            & (self.column('stats', 'period') == period_code)
+        )
+        selected &= match_mask[stat_rows]
+        home = np.full(len(match_mask), np.nan)
+        away = np.full(len(match_mask), np.nan)
+        home[stat_rows[selected]] = self.column('stats', 'home_value')[selected]
+        away[stat_rows[selected]] = self.column('stats', 'away_value')[selected]
+
+        if 'player' in by:
+            match_rows = np.asarray(self.column('sides', 'match_row'))
+            is_home = np.asarray(self.column('sides', 'is_home'))
+            values = np.where(is_home, home[match_rows], away[match_rows])
+            player_ids = np.asarray(self.column('sides', 'player_id'))
+        else:
+            match_rows = np.concatenate([np.arange(len(match_mask))] * 2)
+            values = np.concatenate([home, away])
+            player_ids = None
+
+        keep = ~np.isnan(values)
+        match_rows = match_rows[keep]
+        values = values[keep]
+        dimensions = {
+            'player': lambda: player_ids[keep],
+            'surface': lambda: self.column('matches', 'surface')[match_rows],
+            'season': lambda: self.column('matches', 'season_id')[match_rows],
+            'tournament': lambda: self.column('matches', 'tournament_id')[match_rows],
+        }
+        if not len(values):
+            return []
+        if by:
+            keys = np.stack([np.asarray(dimensions[name](), dtype='int64') for name in by], axis=1)
+            groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            groups, inverse = np.zeros((1, 0), dtype='int64'), np.zeros(len(values), dtype='int64')
+        counts = np.bincount(inverse, minlength=len(groups))
+        totals = np.bincount(inverse, weights=values, minlength=len(groups))
+
+        surfaces = self.meta['dictionaries']['surfaces']
+        result = []
+        for group, count, total in zip(groups.tolist(), counts.tolist(), totals.tolist()):
+            row = dict(zip(by, group))
+            if 'surface' in row:
+                row['surface'] = surfaces[row['surface']]
+            row.update(count=count, total=total, mean=total / count)
+            result.append(row)
+        return result
+
+
+def load_matches(match_ids):
+    """
+    Читает матчи из БД в формате StatisticsStore.append: три запроса на пачку id.
+    """
+    match_ids = list(match_ids)
+    matches = []
+    for start in range(0, len(match_ids), IN_QUERY_CHUNK):
+        chunk = match_ids[start:start + IN_QUERY_CHUNK]
+        statistics = {}
+        for row in MatchStatistics.objects.filter(match_id__in=chunk).order_by('id').values(
+            'match_id', 'period', 'group_name', 'stat_name',
+            'home_value', 'away_value', 'home_Total', 'away_Total',
+        ):
+            row['home_total'] = row.pop('home_Total')
+            row['away_total'] = row.pop('away_Total')
+            statistics.setdefault(row.pop('match_id'), []).append(row)
+        sides = {}
+        for match_id, player_id, is_home in PlayerMatch.objects.filter(match_id__in=chunk).values_list(
+            'match_id', 'player_id', 'is_home'
+        ):
+            sides.setdefault(match_id, []).append((player_id, is_home))
+
+        for match in Match.objects.filter(id__in=chunk).order_by('id').values(
+            'id', 'start_timestamp', 'season_id', 'tournament_id', 'home_team_id', 'away_team_id',
+            'winner_code', 'tournament__unique_tournament__groundType',
+        ):
+            start_timestamp = match['start_timestamp']
+            matches.append({
+                'match_id': match['id'],
+                'start_timestamp': int(start_timestamp.timestamp()) if start_timestamp else -1,
+                'season_id': match['season_id'] or -1,
+                'tournament_id': match['tournament_id'] or -1,
+                'surface': match['tournament__unique_tournament__groundType'] or '',
+                'home_team_id': match['home_team_id'] or -1,
+                'away_team_id': match['away_team_id'] or -1,
+                'winner_code': match['winner_code'] or 0,
+                'statistics': statistics.get(match['id'], []),
+                'sides': sides.get(match['id'], []),
+            })
+    return matches
+
+
+def replace_directory(tmp_directory, directory):
+    # Подменяет каталог хранилища готовым tmp_directory
+    old_directory = directory.with_name(directory.name + '.old')
+    shutil.rmtree(old_directory, ignore_errors=True)
+    if directory.exists():
+        os.replace(directory, old_directory)
+    os.replace(tmp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+
+
+def build_store(directory, chunk_size=5000):
+    """
+    Полностью пересобирает хранилище из БД во временном каталоге и подменяет им старое.
+    """
+    directory = Path(directory)
+    tmp_directory = directory.with_name(directory.name + '.building')
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    store = StatisticsStore(tmp_directory)
+    match_ids = list(Match.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(match_ids), chunk_size):
+        store.append(load_matches(match_ids[start:start + chunk_size]))
+    store.write_meta()
+    replace_directory(tmp_directory, directory)
+    return StatisticsStore(directory)
+
+
+# id матчей, ждущих дозаписи внутри batched_appends(); None - дописывать сразу
+pending_appends = None
+
+
+def append_matches(match_ids):
+    """
+    Дописывает матчи в хранилище, если оно уже построено (build_statistics_store) и установлен numpy.
+    """
+    directory = settings.STATISTICS_STORE_DIR
+    if np is None or not StatisticsStore.exists(directory):
+        return
+    StatisticsStore(directory).append(load_matches(match_ids))
+
+
+def flush_appends():
+    # Дописывает накопленные batched_appends() матчи одним append
+    if pending_appends:
+        match_ids = sorted(pending_appends)
+        pending_appends.clear()
+        append_matches(match_ids)
+
+
+@contextmanager
+def batched_appends():
+    """
+    Внутри блока импортированные матчи не дописываются по одному сигналу, а копятся
+    и записываются одним append (одна запись meta.json) при flush_appends() и на выходе.
+    Нужен построчному импорту (save_event_rows), который отправляет objects_imported на каждое событие.
+    """
+    global pending_appends
+    if pending_appends is not None:
+        yield
+        return
+    pending_appends = set()
+    try:
+        yield
+    finally:
+        try:
+            flush_appends()
+        finally:
+            pending_appends = None
+
+
+@receiver(objects_imported, sender=Match)
+def append_imported_matches(sender, ids, live=False, **kwargs):
+    # Счёт идущих матчей (live_matches) в хранилище не нужен: матч попадёт туда, когда завершится
+    if live:
+        return
+    if pending_appends is not None:
+        pending_appends.update(ids)
+    else:
+        append_matches(ids)
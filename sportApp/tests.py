@@ -1,3 +1,1384 @@
-from django.test import TestCase
+import copy
+import hashlib
+import io
+import json
+import os
+import pstats
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import skipUnless
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, Q
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from sportApp.benchmarks.recorded import load_fixture, replicate_events
+from sportApp.benchmarks.synthetic import FixtureClient, SyntheticFixtures, fixture_days, read_manifest
+from sportApp.import_scripts.identity_map import IdentityMap, LRUCache
+from sportApp.import_scripts.json_stream import iter_array_items
+from sportApp.import_scripts.match_import import (
+    BulkMatchWriter, attach_statistics, is_tracked_event, parse_event, save_event_rows
+)
+from sportApp.import_scripts.live import LivePoller
+from sportApp.import_scripts.pipeline import ImportPipeline
+from sportApp.import_scripts.profiling import StageTimer
+from sportApp.import_scripts.recording import DumpWriter, iter_dump
+from sportApp.import_scripts.response_cache import ResponseCache
+from sportApp.import_scripts.sofascore_client import SofascoreClient
+from sportApp.import_scripts.rollups import ROLLUP_FIELDS
+from sportApp.instrumentation import RequestMetrics, registry, sql_shape
+from sportApp.models import (
+    LiveEvent, Match, MatchSet, MatchStatistics, Player, PlayerMatch, PlayerRollup, RatingRun, SearchEntry,
+    Season, Team,
+)
+from sportApp.page_cache import page_cache_key
+from sportApp.ratings import DEFAULT_K, INITIAL_RATING, latest_snapshots, update_ratings
+from sportApp.search import search
+from sportApp.sqlite_profile import apply_sqlite_pragmas
+from sportApp.statistics_store import StatisticsStore, batched_appends, build_store, np
+
+
+class StubSofascoreHandler(BaseHTTPRequestHandler):
+    """
+    Отдаёт те же JSON-структуры, что и api.sofascore.com (см. example_data.txt):
+    /api/v1/sport/tennis/scheduled-events/<день>, /api/v1/event/<id>/statistics,
+    /api/v1/sport/tennis/events/live и /api/v1/event/<id>.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            fail = server.failures_left > 0
+            if fail:
+                server.failures_left -= 1
+        try:
+            time.sleep(server.delay)
+            if fail:
+                self.send_json(429, {'error': {'code': 429}}, {'Retry-After': '0'})
+            elif re.fullmatch(r'/api/v1/sport/tennis/scheduled-events/\d{4}-\d{2}-\d{2}', self.path):
+                self.send_json(200, server.scheduled_events)
+            elif self.path == '/api/v1/sport/tennis/events/live':
+                self.send_json(200, {'events': server.live_events})
+            elif (match := re.fullmatch(r'/api/v1/event/(\d+)', self.path)) and int(match.group(1)) in server.events:
+                self.send_json(200, {'event': server.events[int(match.group(1))]})
+            elif match := re.fullmatch(r'/api/v1/event/(\d+)/statistics', self.path):
+                stats = server.statistics.get(int(match.group(1)))
+                if stats is None:
+                    self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+                else:
+                    self.send_json(200, stats)
+            else:
+                self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        with self.server.lock:
+            self.server.statuses.append(status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubSofascoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, failures=0):
+        super().__init__(('127.0.0.1', 0), StubSofascoreHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.statuses = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = delay
+        self.failures_left = failures
+        self.scheduled_events = load_fixture('scheduled_events.json')
+        statistics = load_fixture('statistics.json')
+        # У парного матча (второе событие) статистики нет - API отвечает 404
+        events = self.scheduled_events['events']
+        self.statistics = {events[0]['id']: statistics[0], events[2]['id']: statistics[1]}
+        self.live_events = []
+        self.events = {}
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server_port}/api/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class SofascoreClientTests(SimpleTestCase):
+
+    def test_retries_rate_limited_requests(self):
+        with StubSofascoreServer(failures=2) as server:
+            client = SofascoreClient(base_url=server.api_url, rate=0, backoff=0.01)
+            data = client.event_statistics(server.scheduled_events['events'][0]['id'])
+        self.assertEqual(data['statistics'][0]['period'], 'ALL')
+        self.assertEqual(len(server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        with StubSofascoreServer(failures=10) as server:
+            client = SofascoreClient(base_url=server.api_url, rate=0, backoff=0.01, max_retries=1)
+            self.assertIsNone(client.scheduled_events(datetime(2023, 2, 2)))
+        self.assertEqual(len(server.requests), 2)
+
+    def test_missing_statistics_return_none(self):
+        with StubSofascoreServer() as server:
+            client = SofascoreClient(base_url=server.api_url, rate=0)
+            self.assertIsNone(client.event_statistics(1))
+        self.assertEqual(len(server.requests), 1)
+
+
+class JsonStreamTests(SimpleTestCase):
+
+    def test_items_split_across_chunks(self):
+        events = load_fixture('scheduled_events.json')['events']
+        events[0]['homeTeam']['name'] = 'Фомин Д.'
+        body = json.dumps({'meta': {'n': [1, 2]}, 'events': events, 'total': 12345}, ensure_ascii=False).encode()
+        # Куски по 7 байт рвут и строки, и многобайтные символы, и числа
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        self.assertEqual(list(iter_array_items(chunks)), events)
+        self.assertEqual(list(iter_array_items([b'{"events": []}'])), [])
+        self.assertEqual(list(iter_array_items(['{}'])), [])
+        with self.assertRaises(ValueError):
+            list(iter_array_items([b'{"events": [{"id": 1}, {"id": ']))
+
+    def test_client_streams_scheduled_events(self):
+        with tempfile.TemporaryDirectory() as cache_dir, StubSofascoreServer() as server:
+            for options in ({}, {'cache_dir': cache_dir}):
+                client = SofascoreClient(base_url=server.api_url, rate=0, **options)
+                events = client.iter_scheduled_events(datetime(2023, 2, 2))
+                self.assertEqual(list(events), server.scheduled_events['events'])
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def test_finished_statistics_are_served_from_cache(self):
+        with StubSofascoreServer() as server:
+            event_id = server.scheduled_events['events'][0]['id']
+            for _ in range(2):
+                client = SofascoreClient(base_url=server.api_url, rate=0, cache_dir=self.cache_dir.name)
+                data = client.event_statistics(event_id, finished=True)
+        self.assertEqual(data['statistics'][0]['period'], 'ALL')
+        self.assertEqual(len(server.requests), 1)
+
+    def test_statistics_cached_live_are_refetched_when_finished(self):
+        with StubSofascoreServer() as server:
+            event_id = server.scheduled_events['events'][0]['id']
+            client = SofascoreClient(base_url=server.api_url, rate=0, cache_dir=self.cache_dir.name)
+            live = client.event_statistics(event_id)
+            # Пока запись ещё свежая, матч закончился и статистика дописалась
+            final = copy.deepcopy(server.statistics[event_id])
+            final['statistics'][0]['groups'] = final['statistics'][0]['groups'][:1]
+            server.statistics[event_id] = final
+            self.assertEqual(client.event_statistics(event_id), live)
+            self.assertEqual(client.event_statistics(event_id, finished=True), final)
+            # Теперь запись хранится навсегда
+            self.assertEqual(client.event_statistics(event_id, finished=True), final)
+        self.assertEqual(server.statuses, [200, 200])
+        self.assertTrue(ResponseCache(self.cache_dir.name).get(client.statistics_url(event_id)).permanent)
+
+    def test_stale_entries_are_revalidated_with_etag(self):
+        with StubSofascoreServer() as server:
+            client = SofascoreClient(base_url=server.api_url, rate=0, cache_dir=self.cache_dir.name)
+            url = client.scheduled_events_url(datetime(2023, 2, 2))
+            first = client.get_json(url, ttl=0)
+            second = client.get_json(url, ttl=0)
+        self.assertEqual(first, second)
+        self.assertEqual(server.statuses, [200, 304])
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = ResponseCache(self.cache_dir.name, max_bytes=25)
+        for n in range(3):
+            cache.store(f'http://example/{n}', str(n).encode() * 10, ttl=60)
+        # Сейчас хранится 20 байт из 25: запись 0 уже вытеснена третьей
+        self.assertIsNone(cache.get('http://example/0'))
+        cache.get('http://example/1')
+        cache.store('http://example/3', b'3' * 10, ttl=60)
+        self.assertIsNotNone(cache.get('http://example/1'))
+        self.assertIsNone(cache.get('http://example/2'))
+        self.assertLessEqual(cache.total_size(), 25)
+
+    def test_shared_body_is_freed_with_last_reference(self):
+        cache = ResponseCache(self.cache_dir.name, max_bytes=25)
+        cache.store('http://example/a', b'x' * 10, ttl=60)
+        cache.store('http://example/b', b'x' * 10, ttl=60)
+        cache.store('http://example/c', b'c' * 10, ttl=60)
+        # 20 байт из 25: a и b делят одно тело
+        cache.get('http://example/a')
+        cache.get('http://example/b')
+        cache.store('http://example/d', b'd' * 10, ttl=60)
+        # Вытеснена давно не читавшаяся c
+        self.assertIsNone(cache.get('http://example/c'))
+        self.assertEqual(cache.get('http://example/a').body, b'x' * 10)
+        self.assertEqual(cache.get('http://example/b').body, b'x' * 10)
+        self.assertEqual(cache.total_size(), 20)
+
+        cache.get('http://example/d')
+        cache.store('http://example/e', b'e' * 10, ttl=60)
+        # Удаление a не освобождает места: общее тело занято b, вытесняется и она
+        self.assertIsNone(cache.get('http://example/a'))
+        self.assertIsNone(cache.get('http://example/b'))
+        self.assertIsNotNone(cache.get('http://example/d'))
+        self.assertLessEqual(cache.total_size(), 25)
+
+
+@override_settings(SOFASCORE_CACHE_DIR=None)
+class ImportPipelineTests(TestCase):
+
+    def run_pipeline(self, server, days, **client_options):
+        client = SofascoreClient(base_url=server.api_url, rate=0, **client_options)
+        ImportPipeline(client, BulkMatchWriter(batch_size=1)).run(days)
+        client.close()
+
+    def test_imports_itf_events_from_stub_server(self):
+        with StubSofascoreServer() as server:
+            self.run_pipeline(server, [datetime(2023, 2, 2)])
+
+        # ATP-матч отфильтрован, остались одиночный и парный ITF
+        self.assertEqual(Match.objects.count(), 2)
+        singles = Match.objects.get(event_id=11034695)
+        self.assertEqual(singles.home_team.players.get().api_id, 198223)
+        self.assertEqual(list(singles.sets.values_list('home_score', flat=True)), [6, 3, 7])
+        self.assertTrue(MatchStatistics.objects.filter(match=singles, period='ALL', stat_name='Aces').exists())
+
+        doubles = Match.objects.get(event_id=11034702)
+        self.assertEqual(doubles.home_team.players.count(), 2)
+        self.assertFalse(doubles.statistics.exists())
+        self.assertEqual(Team.objects.count(), 4)
+        # Fomin S. играет и одиночный, и парный матч
+        self.assertEqual(Player.objects.count(), 5)
+
+    def test_fetches_concurrently_within_limit(self):
+        days = [datetime(2023, 2, day) for day in range(1, 7)]
+        with StubSofascoreServer(delay=0.05) as server:
+            self.run_pipeline(server, days, max_workers=3)
+
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 3)
+        # 6 дней + по 2 запроса статистики на каждый день
+        self.assertEqual(len(server.requests), 18)
+        self.assertEqual(MatchSet.objects.count(), 5)
+
+    def test_import_matches_command_uses_configured_api(self):
+        with StubSofascoreServer() as server:
+            with override_settings(SOFASCORE_API_URL=server.api_url):
+                call_command('import_matches', rate=0)
+        self.assertEqual(Match.objects.count(), 2)
+
+    def test_stage_timer_and_day_summary(self):
+        timer = StageTimer()
+        output = io.StringIO()
+        with StubSofascoreServer() as server, redirect_stdout(output):
+            client = SofascoreClient(base_url=server.api_url, rate=0)
+            ImportPipeline(client, BulkMatchWriter(batch_size=1, timer=timer)).run([datetime(2023, 2, 2)])
+            client.close()
+
+        totals = timer.snapshot()
+        for stage in ('day_fetch', 'day_parse', 'stats_fetch', 'resolve', 'match_upsert', 'sets_stats', 'commit'):
+            self.assertIn(stage, totals)
+        # Разобрано два события ITF (ATP отсечён фильтром), оба записаны
+        self.assertEqual(totals['day_parse'][1], 2)
+        self.assertEqual(totals['match_upsert'][1], 2)
+        self.assertRegex(output.getvalue(), r"Imported 2023-02-02: 2 matches \(1 with statistics\) in [\d.]+s \| day_fetch")
+
+    def test_import_matches_profile_writes_pstats(self):
+        with tempfile.TemporaryDirectory() as directory, StubSofascoreServer() as server:
+            path = f"{directory}/import.pstats"
+            output = io.StringIO()
+            with override_settings(SOFASCORE_API_URL=server.api_url), redirect_stdout(output):
+                call_command('import_matches', rate=0, profile=True, profile_output=path)
+            stats = pstats.Stats(path)
+        self.assertTrue(any(name == 'flush' for _, _, name in stats.stats))
+        self.assertTrue(any(name == 'parse_statistics' for _, _, name in stats.stats))
+        self.assertIn(f"Profile saved to {path}", output.getvalue())
+        self.assertEqual(Match.objects.count(), 2)
+
+    def test_import_matches_shards_days_across_processes(self):
+        with StubSofascoreServer() as server:
+            with override_settings(SOFASCORE_API_URL=server.api_url):
+                call_command(
+                    'import_matches', '--start', '2023-02-01', '--end', '2023-02-06',
+                    '--workers', '2', '--rate', '0', '--tournament-filter', 'doubles',
+                )
+        # 6 дней - больше, чем одновременно отдаётся в пул (2 * workers), дни досылаются по мере записи.
+        # По одному парному матчу в день, но event_id у них одинаковый
+        self.assertEqual(list(Match.objects.values_list('event_id', flat=True)), [11034702])
+        self.assertEqual(
+            sum(path.startswith('/api/v1/sport/tennis/scheduled-events/') for path in server.requests), 6
+        )
+
+    def test_incremental_import_skips_unchanged_matches(self):
+        day = datetime(2023, 2, 2)
+        with StubSofascoreServer() as server:
+            self.run_pipeline(server, [day])
+            server.requests.clear()
+
+            client = SofascoreClient(base_url=server.api_url, rate=0)
+            with self.assertNumQueries(2):
+                ImportPipeline(client, BulkMatchWriter(), incremental=True).run([day])
+            self.assertEqual(len(server.requests), 1)
+
+            # Во втором сете парного матча сыгран ещё один гейм
+            server.scheduled_events['events'][1]['awayScore']['period2'] = 8
+            ImportPipeline(client, BulkMatchWriter(), incremental=True).run([day])
+            self.assertEqual(server.requests[-1], '/api/v1/event/11034702/statistics')
+        self.assertEqual(MatchSet.objects.get(match__event_id=11034702, set_number=2).away_score, 8)
+
+
+class SyntheticFixturesTests(TestCase):
+
+    def test_generated_days_import_through_pipeline(self):
+        fixtures = SyntheticFixtures(events_per_day=40, stat_items=12, seed=7)
+        days = fixture_days(datetime(2023, 2, 2), 2)
+        self.assertEqual(fixtures.day(days[0]), SyntheticFixtures(events_per_day=40, stat_items=12, seed=7).day(days[0]))
+
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(io.StringIO()):
+            fixtures.write(directory, days)
+            self.assertEqual(read_manifest(directory)['stat_items'], 12)
+            ImportPipeline(FixtureClient(directory), BulkMatchWriter()).run(days)
+
+        tracked = [
+            event for day in days for event in fixtures.day(day)[0]['events'] if is_tracked_event(event)
+        ]
+        self.assertEqual(Match.objects.count(), len(tracked))
+        singles = next(event for event in tracked if event['homeTeam']['type'] == 1)
+        match = Match.objects.get(event_id=singles['id'])
+        self.assertEqual(match.statistics.filter(period='ALL', group_name='Service').count(), 12)
+        self.assertEqual(match.winner_code, singles['winnerCode'])
+
+
+class SqliteProfileTests(TestCase):
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000, 'busy_timeout': 1234})
+    def test_pragmas_are_applied_to_new_connections(self):
+        apply_sqlite_pragmas(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -2000)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+
+
+class ReplayMatchesTests(TestCase):
+
+    def test_replays_compressed_dump(self):
+        events = load_fixture('scheduled_events.json')['events']
+        statistics = load_fixture('statistics.json')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/matches.jsonl.gz"
+            with DumpWriter(path) as recorder:
+                for event in events:
+                    recorder.write(event, statistics[0] if event['id'] == 11034695 else None)
+            self.assertEqual(len(list(iter_dump(path))), 3)
+            self.assertEqual(len(list(iter_dump(path, prefilter='DALLAS'))), 1)
+            call_command('replay_matches', path, batch_size=1)
+
+        self.assertEqual(Match.objects.count(), 2)
+        self.assertTrue(MatchStatistics.objects.filter(match__event_id=11034695).exists())
+
+    def test_replays_legacy_print_matches_dump(self):
+        # Так писал старый print_matches: json.dumps(indent=4) подряд в одном файле
+        events = load_fixture('scheduled_events.json')['events']
+        statistics = load_fixture('statistics.json')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/matches.txt"
+            with open(path, 'w', encoding='utf-8') as f:
+                for event in events:
+                    record = {
+                        'MATCH DATA': event,
+                        'MATCH STATISTICS': statistics[0] if event['id'] == 11034695 else "No statistics available",
+                    }
+                    f.write(json.dumps(record, indent=4, ensure_ascii=False) + "\n")
+            dumped = list(iter_dump(path))
+            call_command('replay_matches', path)
+
+        self.assertEqual([event['id'] for event, _ in dumped], [event['id'] for event in events])
+        self.assertEqual([stats is not None for _, stats in dumped], [True, False, False])
+        self.assertEqual(Match.objects.count(), 2)
+        self.assertTrue(MatchStatistics.objects.filter(match__event_id=11034695).exists())
+
+    def test_malformed_dump_reports_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            broken = f"{tmp}/broken.jsonl"
+            with open(broken, 'w', encoding='utf-8') as f:
+                f.write('{"event": {"id": 1}, "statistics": null}\n\n{"event": {"id": 2},}\n')
+            with self.assertRaisesMessage(CommandError, f"{broken}: строка 3:"):
+                call_command('replay_matches', broken, tournament_filter='')
+
+            missing = f"{tmp}/missing.jsonl"
+            with open(missing, 'w', encoding='utf-8') as f:
+                f.write('{"statistics": null}\n')
+            with self.assertRaisesMessage(CommandError, f"{missing}: строка 1: нет ключа"):
+                call_command('replay_matches', missing, tournament_filter='')
+
+
+def import_recorded_events(count, players_pool=500):
+    writer = BulkMatchWriter()
+    for event, stats_data in replicate_events(count, players_pool):
+        parsed = parse_event(event)
+        if is_tracked_event(event) and parsed is not None:
+            writer.add(attach_statistics(parsed, stats_data))
+    writer.flush()
+
+
+REFERENCE_TABLES = re.compile(r'sportApp_(category|uniquetournament|tournament|season|player|team|team_players)\b', re.I)
+
+
+class IdentityMapTests(TestCase):
+
+    def parsed_events(self):
+        return [
+            attach_statistics(parse_event(event), stats_data)
+            for event, stats_data in replicate_events(6, players_pool=2)
+            if is_tracked_event(event)
+        ]
+
+    def reference_queries(self, queries):
+        return [q['sql'] for q in queries if REFERENCE_TABLES.search(q['sql'])]
+
+    def test_bulk_reimport_skips_known_entities(self):
+        writer = BulkMatchWriter()
+        for parsed in self.parsed_events():
+            writer.add(parsed)
+        writer.flush()
+
+        for parsed in self.parsed_events():
+            writer.add(parsed)
+        with CaptureQueriesContext(connection) as queries:
+            writer.flush()
+        self.assertEqual(self.reference_queries(queries), [])
+
+        # Изменившееся имя игрока всё же записывается
+        parsed = self.parsed_events()[0]
+        parsed['home_team']['players'][0]['name'] = 'Renamed'
+        writer.add(parsed)
+        writer.flush()
+        self.assertTrue(Player.objects.filter(name='Renamed').exists())
+
+    def test_per_row_lookups_come_from_warmed_map(self):
+        for parsed in self.parsed_events():
+            save_event_rows(parsed)
+
+        identity = IdentityMap()
+        with CaptureQueriesContext(connection) as queries:
+            for parsed in self.parsed_events():
+                save_event_rows(parsed, identity)
+        # Один прогревающий запрос на модель, дальше справочники из памяти
+        self.assertEqual(len(self.reference_queries(queries)), 7)
+        self.assertEqual(identity.misses, 0)
+
+    def test_complete_map_creates_new_entities_without_lookup(self):
+        identity = IdentityMap()
+        with CaptureQueriesContext(connection) as queries:
+            for parsed in self.parsed_events():
+                save_event_rows(parsed, identity)
+        # В пустой БД прогретая карта полна: новые справочники создаются без поиска по ключу
+        lookups = [
+            sql for sql in self.reference_queries(queries)
+            if re.search(r'WHERE "sportApp_\w+"\."(api_id|slug)"', sql)
+        ]
+        self.assertEqual(lookups, [])
+        api_ids = {
+            player['api_id'] for parsed in self.parsed_events()
+            for side in ('home_team', 'away_team') for player in parsed[side]['players']
+        }
+        self.assertEqual(set(Player.objects.values_list('api_id', flat=True)), api_ids)
+
+    def test_lru_bound_evicts_oldest_entries(self):
+        lru = LRUCache(max_size=2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+
+@skipUnless(np is not None, "numpy не установлен")
+class StatisticsStoreTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = f"{directory.name}/store"
+        import_recorded_events(30)
+
+    def expected_aces(self):
+        expected = {}
+        for link in PlayerMatch.objects.all():
+            row = MatchStatistics.objects.filter(match_id=link.match_id, period='ALL', stat_name='Aces').first()
+            if row is None:
+                continue
+            value = row.home_value if link.is_home else row.away_value
+            count, total = expected.get(link.player_id, (0, 0.0))
+            expected[link.player_id] = (count + 1, total + value)
+        return expected
+
+    def aces_by_player(self):
+        rows = StatisticsStore(self.directory).aggregate('Aces', by=('player',))
+        return {row['player']: (row['count'], row['total']) for row in rows}
+
+    def test_aggregates_match_orm(self):
+        build_store(self.directory)
+        self.assertEqual(self.aces_by_player(), self.expected_aces())
+
+        rows = StatisticsStore(self.directory).aggregate('Aces', by=('surface',))
+        self.assertEqual([row['surface'] for row in rows], ['Hardcourt outdoor'])
+
+    def test_importer_appends_new_versions(self):
+        build_store(self.directory)
+        with override_settings(STATISTICS_STORE_DIR=self.directory):
+            import_recorded_events(30)
+            store = StatisticsStore(self.directory)
+            # Повторный импорт дописывает матчи заново; половина устаревших строк - ещё не повод сжимать
+            self.assertEqual(store.rows('matches'), Match.objects.count() * 2)
+            self.assertEqual(store.meta['superseded'], Match.objects.count())
+            self.assertEqual(self.aces_by_player(), self.expected_aces())
+
+            event, statistics = next(replicate_events(1))
+            statistics['statistics'][0]['groups'][0]['statisticsItems'][0]['homeValue'] = 40
+            writer = BulkMatchWriter()
+            writer.add(attach_statistics(parse_event(event), statistics))
+            writer.flush()
+
+        store = StatisticsStore(self.directory)
+        # Устаревших версий стало больше половины - колонки переписаны без них
+        self.assertEqual(store.rows('matches'), Match.objects.count())
+        self.assertEqual(store.meta['superseded'], 0)
+        self.assertEqual(self.aces_by_player(), self.expected_aces())
+
+    def test_per_row_import_appends_once_per_batch(self):
+        build_store(self.directory)
+        parsed_events = [
+            attach_statistics(parse_event(event), stats_data)
+            for event, stats_data in replicate_events(3)
+            if is_tracked_event(event)
+        ]
+        with override_settings(STATISTICS_STORE_DIR=self.directory):
+            with batched_appends():
+                for parsed in parsed_events * 2:
+                    save_event_rows(parsed)
+                # До выхода из блока хранилище не трогается
+                self.assertEqual(StatisticsStore(self.directory).rows('matches'), Match.objects.count())
+
+        # Шесть сигналов по одному матчу - одна дозапись трёх матчей
+        store = StatisticsStore(self.directory)
+        self.assertEqual(store.rows('matches'), Match.objects.count() + len(parsed_events))
+        self.assertEqual(self.aces_by_player(), self.expected_aces())
+
+
+class PlayerRollupTests(TestCase):
+
+    def rollups(self):
+        return {
+            (r.player_id, r.season_id, r.surface): tuple(getattr(r, f) for f in ROLLUP_FIELDS)
+            for r in PlayerRollup.objects.exclude(matches=0)
+        }
+
+    def test_incremental_rollups_match_full_rebuild(self):
+        import_recorded_events(60, players_pool=3)
+        # Переимпорт с другим исходом и без статистики: вклад пересчитывается, а не задваивается
+        event, _ = next(replicate_events(1))
+        event['winnerCode'] = 2
+        writer = BulkMatchWriter()
+        writer.add(parse_event(event))
+        writer.flush()
+        save_event_rows(parse_event(event))
+        incremental = self.rollups()
+
+        for rollup in PlayerRollup.objects.all():
+            finished = PlayerMatch.objects.filter(
+                player_id=rollup.player_id, season_id=rollup.season_id, surface=rollup.surface, won__isnull=False,
+            )
+            self.assertEqual(rollup.matches, finished.count())
+            self.assertEqual(rollup.wins, finished.filter(won=True).count())
+
+        PlayerRollup.objects.all().delete()
+        PlayerMatch.objects.update(counted=False, aces=0, sets_won=0)
+        # Сводка игрока без матчей - остаток удалённых связей, пересчёт её убирает
+        stale = Player.objects.create(name='Stale', slug='stale')
+        PlayerRollup.objects.create(player=stale, season=Season.objects.first(), matches=5)
+        call_command('rebuild_rollups', chunk_size=3, stdout=io.StringIO())
+        self.assertEqual(self.rollups(), incremental)
+        self.assertFalse(PlayerRollup.objects.filter(player=stale).exists())
+
+    def test_rebuild_drops_cached_player_pages(self):
+        cache.clear()
+        import_recorded_events(10, players_pool=3)
+        player = PlayerRollup.objects.first().player
+        self.client.get(reverse('player_detail', args=[player.id]))
+        self.assertIsNotNone(cache.get(page_cache_key('player', player.id)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_rollups', chunk_size=3, stdout=io.StringIO())
+        self.assertIsNone(cache.get(page_cache_key('player', player.id)))
+
+
+class HeadToHeadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Пул из одной пары: одиночные матчи всегда между одними и теми же соперниками
+        import_recorded_events(30, players_pool=1)
+        cls.fomin = Player.objects.get(api_id=198223)
+        cls.opponent = Player.objects.get(api_id=63438 + 5)
+        cls.doubles_opponent = Player.objects.get(api_id=203341 + 5)
+
+    def get_json(self, a, b):
+        return self.client.get(reverse('head_to_head', args=[a.id, b.id]), {'format': 'json'}).json()
+
+    def test_singles_record_matches_join(self):
+        expected = Match.objects.filter(
+            Q(home_team__players=self.fomin, away_team__players=self.opponent)
+            | Q(home_team__players=self.opponent, away_team__players=self.fomin)
+        ).count()
+        with self.assertNumQueries(2):
+            data = self.get_json(self.fomin, self.opponent)
+        self.assertEqual((data['wins_a'], data['wins_b'], len(data['matches'])), (expected, 0, expected))
+        self.assertEqual(data['matches'][0]['sets'], [[6, 4], [3, 6], [7, 5]])
+
+        # С другой стороны счёт и победы развёрнуты
+        data = self.get_json(self.opponent, self.fomin)
+        self.assertEqual((data['wins_a'], data['wins_b']), (0, expected))
+        self.assertEqual(data['matches'][0]['sets'], [[4, 6], [6, 3], [5, 7]])
+
+    def test_doubles_and_reimport(self):
+        import_recorded_events(30, players_pool=1)
+        data = self.get_json(self.fomin, self.doubles_opponent)
+        self.assertEqual(len(data['matches']), 10)
+        self.assertTrue(all(match['doubles'] and match['winner_id'] is None for match in data['matches']))
+
+        response = self.client.get(reverse('head_to_head', args=[self.fomin.id, self.opponent.id]))
+        self.assertContains(response, self.opponent.name)
+        self.assertEqual(
+            self.client.get(reverse('head_to_head', args=[self.fomin.id, self.fomin.id])).status_code, 404
+        )
+
+
+class RatingTests(TestCase):
+
+    def import_events(self, first, count, finish_doubles=True):
+        # Матчи по часу друг от друга; парный матч из записи идёт - по желанию завершаем его
+        writer = BulkMatchWriter()
+        for n, (event, stats_data) in enumerate(replicate_events(first + count, players_pool=5)):
+            if n < first or not is_tracked_event(event):
+                continue
+            event['startTimestamp'] += n * 3600
+            if finish_doubles and event['status']['type'] == 'inprogress':
+                event['status'] = {'code': 100, 'description': 'Ended', 'type': 'finished'}
+                event['winnerCode'] = 2
+            writer.add(attach_statistics(parse_event(event), stats_data))
+        writer.flush()
+
+    def current_ratings(self):
+        return {
+            (s.player_id, s.surface): (s.rating, s.matches)
+            for s in latest_snapshots()
+        }
+
+    def test_incremental_equals_full_replay(self):
+        self.import_events(0, 30)
+        first = update_ratings(per_surface=True)
+        self.assertEqual(first.matches, 20)
+        self.import_events(30, 30)
+        second = update_ratings(per_surface=True)
+        self.assertEqual(second.matches, 20)
+        self.assertIsNone(update_ratings(per_surface=True))
+        incremental = self.current_ratings()
+
+        update_ratings(full=True, per_surface=True)
+        self.assertEqual(RatingRun.objects.count(), 1)
+        full = self.current_ratings()
+        self.assertEqual(incremental.keys(), full.keys())
+        for key, (rating, matches) in full.items():
+            self.assertAlmostEqual(incremental[key][0], rating, places=9)
+            self.assertEqual(incremental[key][1], matches)
+        self.assertIn('', {surface for _, surface in full})
+        self.assertGreater(len({surface for _, surface in full}), 1)
+
+        with self.assertRaises(ValueError):
+            update_ratings(per_surface=False)
+
+    def test_winner_gains_and_unsettled_match_waits(self):
+        # Второй матч (парный) ещё идёт: пересчёт останавливается перед ним
+        self.import_events(0, 6, finish_doubles=False)
+        run = update_ratings()
+        self.assertEqual(run.matches, 1)
+        match = Match.objects.order_by('start_timestamp').first()
+        winner = PlayerMatch.objects.get(match=match, won=True).player
+        loser = PlayerMatch.objects.get(match=match, won=False).player
+        ratings = self.current_ratings()
+        self.assertAlmostEqual(ratings[(winner.id, '')][0], INITIAL_RATING + DEFAULT_K / 2)
+        self.assertAlmostEqual(ratings[(loser.id, '')][0], INITIAL_RATING - DEFAULT_K / 2)
+
+        # Парный матч завершился; повторно записанный первый матч с тем же результатом
+        # пересчёт с начала не вызывает
+        self.import_events(0, 6)
+        with self.assertNoLogs('sportApp.ratings', 'WARNING'):
+            self.assertEqual(update_ratings().matches, 3)
+
+        response = self.client.get(reverse('player_detail', args=[winner.id]))
+        self.assertContains(response, 'Рейтинг Эло')
+
+    def test_backfilled_matches_trigger_full_replay(self):
+        # Сначала поздние матчи, затем догружаются более ранние - ниже отметки прошлого запуска
+        self.import_events(10, 20)
+        update_ratings()
+        self.import_events(0, 10)
+        with self.assertLogs('sportApp.ratings', 'WARNING'):
+            run = update_ratings()
+        self.assertEqual(run.matches, 20)
+        self.assertEqual(RatingRun.objects.count(), 1)
+        incremental = self.current_ratings()
+
+        update_ratings(full=True)
+        self.assertEqual(self.current_ratings(), incremental)
+
+    def test_reimported_past_days_stay_incremental(self):
+        self.import_events(0, 10)
+        update_ratings()
+        # Те же дни импортируются заново без изменений результата - новых матчей нет
+        self.import_events(0, 10)
+        with self.assertNoLogs('sportApp.ratings', 'WARNING'):
+            self.assertIsNone(update_ratings())
+        self.import_events(0, 15)
+        with self.assertNoLogs('sportApp.ratings', 'WARNING'):
+            run = update_ratings()
+        self.assertTrue(run.matches)
+        self.assertEqual(RatingRun.objects.count(), 2)
+        incremental = self.current_ratings()
+
+        update_ratings(full=True)
+        self.assertEqual(self.current_ratings(), incremental)
+
+    def test_changed_winner_triggers_full_replay(self):
+        self.import_events(0, 10)
+        update_ratings()
+        match = Match.objects.filter(winner_code__in=(1, 2)).order_by('start_timestamp').first()
+        event = next(event for event, _ in replicate_events(10, players_pool=5) if event['id'] == match.event_id)
+        event['startTimestamp'] = int(match.start_timestamp.timestamp())
+        event['winnerCode'] = 3 - match.winner_code
+        writer = BulkMatchWriter()
+        writer.add(parse_event(event))
+        writer.flush()
+        with self.assertLogs('sportApp.ratings', 'WARNING'):
+            run = update_ratings()
+        self.assertEqual(RatingRun.objects.count(), 1)
+        self.assertEqual(run.matches, Match.objects.filter(winner_code__in=(1, 2)).count())
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.events = [event for event in load_fixture('scheduled_events.json')['events'] if is_tracked_event(event)]
+        writer = BulkMatchWriter()
+        for event in cls.events:
+            writer.add(parse_event(event))
+        writer.flush()
+
+    def test_import_maintains_index(self):
+        self.assertEqual(
+            dict(SearchEntry.objects.values_list('kind').annotate(n=Count('id')).order_by('kind')),
+            {'player': 5, 'team': 2, 'tournament': 2},
+        )
+        fomin = SearchEntry.objects.get(kind='player', object_id=Player.objects.get(api_id=198223).id)
+        self.assertEqual(fomin.name, 'Fomin S.')
+        self.assertTrue(fomin.text.startswith('fomin s'))
+
+        # Переимпорт без изменений индекс не трогает, новое имя - переписывает
+        writer = BulkMatchWriter()
+        for event in self.events:
+            writer.add(parse_event(event))
+        with CaptureQueriesContext(connection) as queries:
+            writer.flush()
+        self.assertFalse(any('searchentry' in q['sql'] for q in queries))
+
+        parsed = parse_event(self.events[0])
+        parsed['home_team']['players'][0]['name'] = 'Fomine Sergey'
+        writer.add(parsed)
+        writer.flush()
+        self.assertEqual(search('fomine')[0][2], 'Fomine Sergey')
+
+    def test_prefix_substring_and_typos(self):
+        fomin_id = Player.objects.get(api_id=198223).id
+        self.assertEqual(search('Fo')[0], ('player', fomin_id, 'Fomin S.'))
+        # Игрок раньше его парной команды, одиночная команда не дублирует игрока;
+        # диакритика и регистр не важны
+        self.assertEqual([kind for kind, _, _ in search('FÓMIN')], ['player', 'team'])
+        self.assertEqual(search('donald'), [('player', Player.objects.get(name='McDonald M.').id, 'McDonald M.')])
+        self.assertEqual({kind for kind, _, _ in search('sheikh')}, {'tournament'})
+        # Опечатки: пропущенная буква и замена
+        self.assertIn('Kuznetsov A.', [name for _, _, name in search('kuznetsv')])
+        self.assertEqual(search('fpmin', kinds=['player'])[0][2], 'Fomin S.')
+        self.assertEqual(search('zzzzzz'), [])
+
+    def test_autocomplete_endpoint(self):
+        data = self.client.get(reverse('search'), {'q': 'kuzn', 'kind': 'team'}).json()
+        [team] = data['results']
+        self.assertEqual(team['name'], 'Fomin S. / Kuznetsov A.')
+        self.assertEqual(team['url'], reverse('team_detail', args=[team['id']]))
+
+        data = self.client.get(reverse('search'), {'q': 'itf', 'limit': 1}).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertTrue(data['results'][0]['url'].startswith(reverse('match_list') + '?tournament='))
+        self.assertEqual(self.client.get(reverse('search')).json()['results'], [])
+
+    def test_rebuild_index_command(self):
+        SearchEntry.objects.filter(kind='player').delete()
+        SearchEntry.objects.create(kind='team', object_id=10 ** 9, name='Gone', text='gone')
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(SearchEntry.objects.filter(kind='player').count(), 5)
+        self.assertFalse(SearchEntry.objects.filter(name='Gone').exists())
+        self.assertEqual(search('gone'), [])
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        import_recorded_events(30)
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+
+    def test_records_views_and_serves_percentiles(self):
+        response = self.client.get(reverse('match_list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        team = Team.objects.first()
+        for _ in range(3):
+            self.client.get(reverse('team_detail', args=[team.id]))
+
+        data = self.client.get(reverse('metrics')).json()
+        self.assertEqual(set(data['views']), {'match_list', 'team_detail'})
+        stats = data['views']['match_list']
+        self.assertEqual((stats['requests'], stats['queries']['max']), (1, 1))
+        self.assertGreater(stats['template_ms']['max'], 0)
+        self.assertEqual(stats['response_bytes']['max'], len(response.content))
+        self.assertEqual(data['views']['team_detail']['requests'], 3)
+        self.assertEqual(data['views']['team_detail']['n_plus_one_requests'], 0)
+
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+        with override_settings(INSTRUMENTATION_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_flags_repeated_query_shapes(self):
+        self.assertEqual(
+            sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            sql_shape("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 5"),
+        )
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            for match in Match.objects.all()[:6]:
+                match.home_team.name
+        self.assertEqual(metrics.queries, 7)
+        [(shape, count)] = metrics.repeated_shapes(5).items()
+        self.assertEqual(count, 6)
+        self.assertIn('"sportApp_team"', shape)
+
+
+class MatchListViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        import_recorded_events(180)
+
+    def test_walks_all_matches_with_constant_queries(self):
+        seen = []
+        url = reverse('match_list')
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            seen.extend(match.id for match in response.context['matches'])
+            next_query = response.context['next_query']
+            url = f"{reverse('match_list')}?{next_query}" if next_query else None
+
+        expected = list(Match.objects.order_by('-start_timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters_by_player_and_tournament(self):
+        player = Player.objects.get(api_id=198223)
+        response = self.client.get(reverse('match_list'), {'player': player.id})
+        for match in response.context['matches']:
+            self.assertIn(player, list(match.home_team.players.all()) + list(match.away_team.players.all()))
+        self.assertTrue(response.context['matches'])
+
+        tournament = Match.objects.first().tournament
+        response = self.client.get(reverse('match_list'), {'tournament': tournament.id, 'cursor': 'bad'})
+        self.assertEqual(
+            {match.tournament_id for match in response.context['matches']}, {tournament.id}
+        )
+
+
+class JsonApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        import_recorded_events(60)
+
+    def get_json(self, url, params=None, **headers):
+        response = self.client.get(url, params or {}, **headers)
+        if response.streaming:
+            return response, json.loads(b''.join(response.streaming_content))
+        return response, (response.json() if response.status_code == 200 else None)
+
+    def test_match_list_pages_and_projects_fields(self):
+        seen = []
+        url = reverse('api_match_list')
+        params = {'fields': 'id,home_team_name,start_timestamp', 'limit': 7}
+        while url:
+            with self.assertNumQueries(2):
+                response, data = self.get_json(url, params)
+            self.assertTrue(response.streaming)
+            self.assertEqual({tuple(row) for row in data['results']}, {('id', 'home_team_name', 'start_timestamp')})
+            seen.extend(row['id'] for row in data['results'])
+            url, params = (f"{reverse('api_match_list')}?{data['next']}", None) if data['next'] else (None, None)
+
+        expected = list(Match.objects.order_by('-start_timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+        response, _ = self.get_json(reverse('api_match_list'), {'fields': 'id,statistics_layout'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_returns_304_until_rows_change(self):
+        url = reverse('api_match_list')
+        response, data = self.get_json(url, {'fields': 'id,home_team_name'})
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,home_team_name'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        # Другие поля - другой ответ
+        self.assertNotEqual(self.client.get(url, {'fields': 'id'})['ETag'], etag)
+
+        # Переименованная команда меняет ETag страницы, где есть её имя
+        team = Match.objects.get(id=data['results'][0]['id']).home_team
+        team.name = 'Renamed'
+        team.save()
+        response = self.client.get(url, {'fields': 'id,home_team_name'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_match_detail_with_sets_and_statistics(self):
+        match = Match.objects.filter(statistics__isnull=False).first()
+        url = reverse('api_match_detail', args=[match.id])
+        response, data = self.get_json(url)
+        self.assertEqual(data['event_id'], match.event_id)
+        self.assertEqual(data['sets'], [[6, 4], [3, 6], [7, 5]])
+        self.assertTrue(data['statistics'])
+
+        response, data = self.get_json(url, {'fields': 'sets'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(data, {'sets': [[6, 4], [3, 6], [7, 5]]})
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, {'fields': 'sets'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Переимпорт матча обновляет метку строки, и старый ETag больше не подходит
+        import_recorded_events(60)
+        self.assertEqual(self.client.get(url, {'fields': 'sets'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(reverse('api_match_detail', args=[10 ** 9])).status_code, 404)
+
+    def test_teams_and_players(self):
+        team = Team.objects.annotate(n=Count('players')).filter(n=2).first()
+        _, data = self.get_json(reverse('api_team_detail', args=[team.id]), {'fields': 'name,player_ids'})
+        self.assertEqual(data, {'name': team.name, 'player_ids': sorted(team.players.values_list('id', flat=True))})
+
+        _, data = self.get_json(reverse('api_player_list'), {'fields': 'id,name', 'limit': 3})
+        self.assertEqual([row['id'] for row in data['results']], list(Player.objects.order_by('id').values_list('id', flat=True)[:3]))
+        _, data = self.get_json(f"{reverse('api_player_list')}?{data['next']}")
+        self.assertEqual(data['results'][0]['id'], Player.objects.order_by('id').values_list('id', flat=True)[3])
+        # Ссылка на следующую страницу сохраняет выбранные поля
+        self.assertEqual(set(data['results'][0]), {'id', 'name'})
+
+
+class MatchHistoryViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Пул из одной пары: одни и те же команды играют много матчей
+        import_recorded_events(90, players_pool=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk_history(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen.extend(response.context['history'])
+            next_query = response.context['next_query']
+            url = f"{url.split('?')[0]}?{next_query}" if next_query else None
+        return seen
+
+    def test_player_history_matches_team_rosters(self):
+        player = Player.objects.get(api_id=198223)
+        team_ids = Team.players.through.objects.filter(player=player).values('team_id')
+        matches = Match.objects.filter(Q(home_team__in=team_ids) | Q(away_team__in=team_ids))
+
+        summary = self.client.get(reverse('player_detail', args=[player.id])).context['summary']
+        cache.clear()
+        history = self.walk_history(reverse('player_detail', args=[player.id]))
+        self.assertEqual(
+            [match.id for match in history],
+            list(matches.order_by('-start_timestamp', '-id').values_list('id', flat=True)),
+        )
+        for match in history:
+            expected = None
+            if match.winner_code in (1, 2):
+                home = player in match.home_team.players.all()
+                expected = match.winner_code == (1 if home else 2)
+            self.assertEqual(match.won, expected)
+
+        self.assertEqual(summary['wins'], sum(1 for match in history if match.won is True))
+        self.assertEqual(summary['losses'], sum(1 for match in history if match.won is False))
+
+    def test_team_history_is_paginated_with_constant_queries(self):
+        team = Match.objects.get(event_id=11034695).home_team
+        url = reverse('team_detail', args=[team.id])
+        first = self.client.get(url)
+        self.assertIsNotNone(first.context['next_query'])
+
+        # Команда, состав, сводка и страница истории
+        with self.assertNumQueries(4):
+            response = self.client.get(f"{url}?{first.context['next_query']}")
+        self.assertTrue(response.context['history'])
+
+        cache.clear()
+        history = self.walk_history(url)
+        self.assertEqual(
+            {match.id for match in history},
+            set(Match.objects.filter(Q(home_team=team) | Q(away_team=team)).values_list('id', flat=True)),
+        )
+        self.assertEqual(first.context['summary']['wins'], sum(1 for match in history if match.won))
+
+
+class MatchDetailViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        import_recorded_events(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_serves_layout_built_at_import(self):
+        match = Match.objects.get(event_id=11034695)
+        self.assertEqual(match.statistics_layout[0]['period'], 'ALL')
+        # Матч и сеты; строки статистики не читаются
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('match_detail', args=[match.id]))
+        self.assertContains(response, 'Aces')
+
+    def test_builds_missing_layout_and_tolerates_empty_values(self):
+        match = Match.objects.get(event_id=11034695)
+        MatchStatistics.objects.filter(match=match, stat_name='Aces').update(home_value=None)
+        Match.objects.filter(id=match.id).update(statistics_layout=None)
+
+        response = self.client.get(reverse('match_detail', args=[match.id]))
+        self.assertEqual(response.status_code, 200)
+        match.refresh_from_db()
+        aces = match.statistics_layout[0]['groups'][0]['statisticsItems'][0]
+        self.assertEqual((aces['name'], aces['home_value'], aces['away_value']), ('Aces', None, 4))
+
+    async def test_pages_under_async_client(self):
+        match = await Match.objects.select_related('home_team').aget(event_id=11034695)
+        player = await match.home_team.players.afirst()
+        for url in (
+            reverse('match_list'),
+            reverse('match_detail', args=[match.id]),
+            reverse('team_detail', args=[match.home_team_id]),
+            reverse('player_detail', args=[player.id]),
+        ):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        response = await self.async_client.get(reverse('match_detail', args=[match.id]))
+        self.assertContains(response, '<td>6</td>')
+        response = await self.async_client.get(reverse('team_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        import_recorded_events(3)
+        self.match = Match.objects.get(event_id=11034695)
+        self.player = Player.objects.get(api_id=198223)
+
+    def test_detail_pages_are_served_from_cache(self):
+        urls = [
+            reverse('match_detail', args=[self.match.id]),
+            reverse('team_detail', args=[self.match.home_team_id]),
+            reverse('player_detail', args=[self.player.id]),
+        ]
+        for url in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.content, second.content)
+
+    def test_reimport_invalidates_written_objects(self):
+        url = reverse('match_detail', args=[self.match.id])
+        player_url = reverse('player_detail', args=[self.player.id])
+        self.client.get(url)
+        self.client.get(player_url)
+
+        # Изменения в обход импорта не видны - страницы отдаются из кэша
+        Match.objects.filter(id=self.match.id).update(status_description='Changed')
+        self.assertNotContains(self.client.get(url), 'Changed')
+
+        event = load_fixture('scheduled_events.json')['events'][0]
+        event['status']['description'] = 'Retired'
+        event['homeTeam']['name'] = 'Fomin Sergey'
+        writer = BulkMatchWriter()
+        writer.add(parse_event(event))
+        writer.flush()
+
+        self.assertContains(self.client.get(url), 'Retired')
+        self.assertContains(self.client.get(player_url), 'Fomin Sergey')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_only_finished_matches_are_cached_without_expiry(self):
+        live = Match.objects.exclude(status_code=100).first()
+        for match, cached in ((self.match, True), (live, False)):
+            url = reverse('match_detail', args=[match.id])
+            self.client.get(url)
+            Match.objects.filter(id=match.id).update(status_description='Changed')
+            # Срок PAGE_CACHE_TIMEOUT (здесь 0) касается всех страниц, кроме завершённых матчей
+            self.assertEqual('Changed' in self.client.get(url).content.decode(), not cached)
+
+    def test_import_process_invalidates_server_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches_setting = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name,
+        }}
+        url = reverse('match_detail', args=[self.match.id])
+        with override_settings(CACHES=caches_setting):
+            self.client.get(url)
+            Match.objects.filter(id=self.match.id).update(status_description='Changed')
+            self.assertNotContains(self.client.get(url), 'Changed')
+
+            # Импорт - отдельный процесс со своим клиентом кэша: сброс доходит до страниц сайта
+            subprocess.run(
+                [sys.executable, 'manage.py', 'shell', '-c',
+                 f"from sportApp.models import Match; from sportApp.page_cache import invalidate_pages; "
+                 f"invalidate_pages(Match, [{self.match.id}])"],
+                cwd=settings.BASE_DIR, check=True, capture_output=True,
+                env={**os.environ, 'SPORTPORTAL_CACHE': 'file', 'SPORTPORTAL_CACHE_DIR': directory.name},
+            )
+            self.assertContains(self.client.get(url), 'Changed')
+
+
+class LiveMatchesTests(TestCase):
+
+    def live_event(self, status_code, description, home, away, winner=None):
+        event = load_fixture('scheduled_events.json')['events'][0]
+        event['status'] = {'code': status_code, 'description': description}
+        event['winnerCode'] = winner
+        event['homeScore'] = {f'period{n}': score for n, score in enumerate(home, start=1)}
+        event['awayScore'] = {f'period{n}': score for n, score in enumerate(away, start=1)}
+        return event
+
+    def test_poll_writes_only_changes(self):
+        with StubSofascoreServer() as server:
+            client = SofascoreClient(base_url=server.api_url, rate=0)
+            poller = LivePoller(client, BulkMatchWriter(), min_interval=1, max_interval=8)
+            server.live_events = [self.live_event(6, '1st set', [3], [2])]
+            self.assertEqual(poller.poll(), {'live': 1, 'written': 1, 'updated': 0})
+            match = Match.objects.get(event_id=11034695)
+            self.assertEqual(match.status_description, '1st set')
+            self.assertEqual(poller.interval, 1)
+
+            # Ничего не изменилось - ничего не пишется, интервал растёт
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(poller.poll()['updated'], 0)
+            self.assertFalse([q for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))])
+            self.assertEqual(poller.interval, 2)
+
+            # Новый счёт - только статус матча и сеты, без справочников и связей игроков
+            server.live_events = [self.live_event(7, '2nd set', [6, 1], [4, 0])]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(poller.poll(), {'live': 1, 'written': 0, 'updated': 1})
+            written = {q['sql'].split('"')[1] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))}
+            self.assertEqual(written, {'sportApp_match', 'sportApp_matchset', 'sportApp_liveevent'})
+            self.assertEqual(list(match.sets.values_list('home_score', 'away_score')), [(6, 4), (1, 0)])
+            self.assertEqual(poller.interval, 1)
+
+            # Матч пропал из ленты - его итог запрашивается отдельно и пишется целиком со статистикой
+            server.live_events = []
+            server.events[11034695] = self.live_event(100, 'Ended', [6, 6], [4, 3], winner=1)
+            self.assertEqual(poller.poll(), {'live': 0, 'written': 1, 'updated': 0})
+            client.close()
+
+        match.refresh_from_db()
+        self.assertEqual((match.status_code, match.winner_code), (100, 1))
+        self.assertTrue(match.statistics.exists())
+        self.assertEqual(poller.interval, 8)
+        self.assertEqual(
+            [event.data['status_description'] for event in LiveEvent.objects.filter(match=match).order_by('id')],
+            ['1st set', '2nd set', 'Ended'],
+        )
+
+    @skipUnless(np is not None, "numpy не установлен")
+    def test_only_finished_matches_reach_statistics_store(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store_directory = f"{directory.name}/store"
+        build_store(store_directory)
+        with StubSofascoreServer() as server, override_settings(STATISTICS_STORE_DIR=store_directory):
+            client = SofascoreClient(base_url=server.api_url, rate=0)
+            poller = LivePoller(client, BulkMatchWriter())
+            server.live_events = [self.live_event(6, '1st set', [3], [2])]
+            poller.poll()
+            server.live_events = [self.live_event(7, '2nd set', [6, 1], [4, 0])]
+            poller.poll()
+            self.assertEqual(StatisticsStore(store_directory).rows('matches'), 0)
+
+            server.live_events = []
+            server.events[11034695] = self.live_event(100, 'Ended', [6, 6], [4, 3], winner=1)
+            poller.poll()
+            client.close()
+        self.assertEqual(StatisticsStore(store_directory).rows('matches'), 1)
+
+    def test_live_matches_command(self):
+        output = io.StringIO()
+        with StubSofascoreServer() as server, override_settings(SOFASCORE_API_URL=server.api_url):
+            server.live_events = [self.live_event(6, '1st set', [3], [2])]
+            call_command('live_matches', iterations=1, rate=0, no_cache=True, stdout=output)
+        self.assertIn('Live: 1 matches, 1 written', output.getvalue())
+        self.assertEqual(LiveEvent.objects.count(), 1)
+
+
+class LiveStreamTests(TestCase):
+
+    def setUp(self):
+        self.match = Match.objects.create(event_id=1)
+        self.other = Match.objects.create(event_id=2)
+        self.events = [
+            LiveEvent.objects.create(match=match, data={'match_id': match.id, 'sets': [[1, 3, 2]]})
+            for match in (self.match, self.other, self.match)
+        ]
+
+    async def read_stream(self, response):
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    @override_settings(LIVE_STREAM_SECONDS=0)
+    async def test_stream_from_last_event_id(self):
+        response = await AsyncClient().get(
+            reverse('live_stream'), {'match': self.match.id}, headers={'Last-Event-ID': str(self.events[0].id)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        body = await self.read_stream(response)
+        self.assertIn(f'id: {self.events[2].id}\nevent: match\ndata: ', body)
+        self.assertNotIn(f'id: {self.events[1].id}\n', body)
+
+    @override_settings(LIVE_STREAM_SECONDS=0.3, LIVE_STREAM_POLL=0.05)
+    async def test_stream_stays_open_for_new_events(self):
+        response = await AsyncClient().get(reverse('live_stream'))
+        chunks = response.streaming_content
+        # Новый клиент начинает с последнего события и получает только следующие
+        self.assertEqual((await anext(chunks)).decode(), f'retry: 3000\nid: {self.events[2].id}\n\n')
+        event = await LiveEvent.objects.acreate(match=self.other, data={'match_id': self.other.id})
+        self.assertTrue((await anext(chunks)).decode().startswith(f'id: {event.id}\n'))
+        self.assertEqual([chunk async for chunk in chunks], [])
+
+    def test_wsgi_returns_pending_events_and_closes(self):
+        response = self.client.get(reverse('live_stream'), {'last_id': 0})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('event: match'), 3)
+
+
+class AdminTests(TestCase):
+
+    def setUp(self):
+        import_recorded_events(6)
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+
+    def changelist_queries(self, model, query=''):
+        url = reverse(f'admin:sportApp_{model}_changelist') + query
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries]
+
+    def test_changelists_do_not_query_per_row(self):
+        models = ('match', 'matchset', 'matchstatistics', 'tournament', 'team', 'player')
+        before = {model: len(self.changelist_queries(model)[1]) for model in models}
+        import_recorded_events(60)
+        after = {model: len(self.changelist_queries(model)[1]) for model in models}
+        self.assertEqual(before, after)
+
+    def test_large_tables_skip_full_count(self):
+        total = MatchStatistics.objects.count()
+        response, queries = self.changelist_queries('matchstatistics')
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql.upper()])
+        self.assertEqual(response.context['cl'].result_count, MatchStatistics.objects.order_by('-id')[0].id)
+        self.assertGreaterEqual(response.context['cl'].result_count, total)
+
+        # С фильтром считается точно
+        match = Match.objects.filter(statistics__isnull=False).first()
+        response, _ = self.changelist_queries('matchstatistics', f'?q={match.event_id}')
+        self.assertEqual(response.context['cl'].result_count, match.statistics.count())
+
+    def test_match_filters(self):
+        response, queries = self.changelist_queries('match')
+        self.assertFalse([sql for sql in queries if 'DISTINCT' in sql.upper()])
+        changelist = response.context['cl']
+        status_choices = [choice['display'] for choice in changelist.filter_specs[1].choices(changelist)]
+        self.assertIn('Ended (100)', status_choices)
+
+        response, _ = self.changelist_queries('match', '?status=100')
+        self.assertEqual(response.context['cl'].result_count, Match.objects.filter(status_code=100).count())
+        response, _ = self.changelist_queries('match', '?q=not-a-number')
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_start_date_filter_excludes_future_matches(self):
+        recent, future = Match.objects.order_by('id')[:2]
+        now = timezone.now()
+        Match.objects.filter(id=recent.id).update(start_timestamp=now - timedelta(days=3))
+        Match.objects.filter(id=future.id).update(start_timestamp=now + timedelta(days=3))
+        response, _ = self.changelist_queries('match', '?started=week')
+        self.assertEqual([match.id for match in response.context['cl'].result_list], [recent.id])
@@ -1,6 +1,11 @@
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
 from datetime import datetime, timedelta
 
+from sportApp.instrumentation import registry
 from sportApp.models import Team
 
 
@@ -23,3 +28,16 @@ def home_page(request):
     #     print(f"{team.name}: {[player.name for player in team.players.all()]}")
 
     return render(request, 'home.html', )
+
+
+def metrics(request):
+    """
+    Сводка InstrumentationMiddleware по view: перцентили времени, числа и времени запросов,
+    рендера шаблонов и размера ответа за последние запросы этого процесса, формы N+1.
+    Только с INTERNAL_IPS или для staff.
+    """
+    if not settings.INSTRUMENTATION_ENABLED:
+        raise Http404("Инструментирование выключено (SPORTPORTAL_METRICS=1)")
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse({'pid': os.getpid(), 'views': registry.snapshot()}, json_dumps_params={'indent': 2})
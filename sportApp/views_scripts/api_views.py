@@ -0,0 +1,266 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+
+from sportApp.models import Match, MatchSet, Player, Team
+from sportApp.statistics_layout import build_statistics_layout
+from sportApp.views_scripts.models_views import decode_cursor, encode_cursor, filter_matches, parse_int
+
+DEFAULT_LIMIT = 100
+# Больше не берём: id страницы уходят в IN (...), а у SQLite есть предел числа параметров
+MAX_LIMIT = 500
+# Сколько строк сериализуется в один кусок потокового ответа
+STREAM_CHUNK = 100
+
+
+class Resource:
+    """
+    Описание ресурса API: поля ответа (имя -> путь для values_list) и метки обновления строк,
+    из которых строится ETag. Метка связанной строки нужна, только если запрошено её поле
+    (например, home_team__updated_at для home_team_name).
+    """
+
+    def __init__(self, model, fields, related_stamps=()):
+        self.model = model
+        self.fields = fields
+        self.related_stamps = related_stamps
+
+    def parse_fields(self, request, extra=()):
+        """
+        Поля из ?fields=a,b (по умолчанию все). Неизвестное поле - ValueError.
+        """
+        value = request.GET.get('fields')
+        if not value:
+            return list(self.fields) + list(extra)
+        names = [name for name in value.split(',') if name]
+        unknown = [name for name in names if name not in self.fields and name not in extra]
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+        return names
+
+    def stamps(self, names):
+        paths = ['updated_at']
+        for prefix in self.related_stamps:
+            if any(self.fields.get(name, '').startswith(f'{prefix}__') for name in names):
+                paths.append(f'{prefix}__updated_at')
+        return paths
+
+    def paths(self, names):
+        return [self.fields[name] for name in names if name in self.fields]
+
+
+MATCH = Resource(Match, {
+    'id': 'id',
+    'event_id': 'event_id',
+    'start_timestamp': 'start_timestamp',
+    'status_code': 'status_code',
+    'status_description': 'status_description',
+    'winner_code': 'winner_code',
+    'round_name': 'roundName',
+    'round_type': 'roundType',
+    'first_to_serve': 'firstToServe',
+    'tournament_id': 'tournament_id',
+    'season_id': 'season_id',
+    'home_team_id': 'home_team_id',
+    'home_team_name': 'home_team__name',
+    'away_team_id': 'away_team_id',
+    'away_team_name': 'away_team__name',
+    'updated_at': 'updated_at',
+}, related_stamps=('home_team', 'away_team'))
+
+TEAM = Resource(Team, {
+    'id': 'id',
+    'api_id': 'api_id',
+    'name': 'name',
+    'slug': 'slug',
+    'updated_at': 'updated_at',
+})
+
+PLAYER = Resource(Player, {
+    'id': 'id',
+    'api_id': 'api_id',
+    'name': 'name',
+    'slug': 'slug',
+    'short_name': 'short_name',
+    'country_name': 'country_name',
+    'country_alpha2': 'country_alpha2',
+    'updated_at': 'updated_at',
+})
+
+
+def make_etag(*parts):
+    # Сильный ETag: одинаковые метки строк и параметры дают один и тот же ответ байт в байт
+    digest = hashlib.sha1(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def parse_limit(request):
+    limit = parse_int(request.GET.get('limit'))
+    return min(max(limit or DEFAULT_LIMIT, 1), MAX_LIMIT)
+
+
+def conditional(request, etag, make_response):
+    """
+    304 без тела, если у клиента уже есть этот ETag, иначе ответ make_response() с ETag.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = make_response()
+    response['ETag'] = etag
+    return response
+
+
+def stream_page(names, rows, next_query):
+    """
+    Тело страницы {"results": [...], "next": ...} по кускам: строки сериализуются по мере чтения.
+    """
+    yield '{"results": ['
+    chunk = []
+    first = True
+    for row in rows:
+        chunk.append(dumps(dict(zip(names, row))))
+        if len(chunk) >= STREAM_CHUNK:
+            yield ('' if first else ',') + ','.join(chunk)
+            chunk = []
+            first = False
+    if chunk:
+        yield ('' if first else ',') + ','.join(chunk)
+    yield f'], "next": {dumps(next_query)}}}'
+
+
+def list_response(request, resource, queryset, order, page_stamps, cursor_of):
+    """
+    Страница списка: сначала лёгкий запрос id и меток строк страницы (из них ETag),
+    и только если клиенту нужен ответ - запрос выбранных полей этих строк, отдаваемый потоком.
+    page_stamps - поля первого запроса, первым идёт id; cursor_of(строка) - курсор после неё.
+    """
+    try:
+        names = resource.parse_fields(request)
+    except ValueError as e:
+        return error(str(e))
+    limit = parse_limit(request)
+    stamps = resource.stamps(names)
+    page = list(queryset.order_by(*order).values_list(*page_stamps, *stamps)[:limit + 1])
+    next_query = None
+    if len(page) > limit:
+        page = page[:limit]
+        query = request.GET.copy()
+        query['cursor'] = cursor_of(page[-1])
+        next_query = query.urlencode()
+    ids = [row[0] for row in page]
+    etag = make_etag(names, page, next_query)
+
+    def make_response():
+        paths = resource.paths(names)
+        rows = resource.model.objects.filter(id__in=ids).order_by(*order).values_list(*paths).iterator()
+        return StreamingHttpResponse(stream_page(names, rows, next_query), content_type='application/json')
+
+    return conditional(request, etag, make_response)
+
+
+def detail_response(request, resource, object_id, extra=None):
+    """
+    Один объект: ETag по меткам его строки (один запрос), затем выбранные поля.
+    extra - {имя: функция(id) -> значение} для вложенных данных, их тоже можно выбрать в fields.
+    """
+    extra = extra or {}
+    try:
+        names = resource.parse_fields(request, extra)
+    except ValueError as e:
+        return error(str(e))
+    stamps = resource.model.objects.filter(id=object_id).values_list(*resource.stamps(names)).first()
+    if stamps is None:
+        raise Http404
+    etag = make_etag(names, object_id, stamps)
+
+    def make_response():
+        data = {}
+        paths = resource.paths(names)
+        if paths:
+            values = resource.model.objects.filter(id=object_id).values_list(*paths).get()
+            data = dict(zip([name for name in names if name in resource.fields], values))
+        for name in names:
+            if name in extra:
+                data[name] = extra[name](object_id)
+        return JsonResponse(data, encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False})
+
+    return conditional(request, etag, make_response)
+
+
+def api_match_list(request):
+    """
+    Матчи от новых к старым: ?fields=&limit=&cursor= и фильтры списка матчей (date, tournament, player).
+    """
+    queryset, _ = filter_matches(Match.objects.exclude(start_timestamp=None), request.GET)
+    position = decode_cursor(request.GET.get('cursor', ''))
+    if position:
+        start_timestamp, last_id = position
+        queryset = queryset.filter(
+            Q(start_timestamp__lt=start_timestamp) | Q(start_timestamp=start_timestamp, id__lt=last_id)
+        )
+    return list_response(
+        request, MATCH, queryset, ('-start_timestamp', '-id'), ('id', 'start_timestamp'),
+        lambda row: encode_cursor(Match(id=row[0], start_timestamp=row[1])),
+    )
+
+
+def match_sets(match_id):
+    return [list(row) for row in MatchSet.objects.filter(match_id=match_id).order_by('set_number').values_list(
+        'home_score', 'away_score'
+    )]
+
+
+def match_statistics(match_id):
+    # Как на странице матча: готовая раскладка, а для старых матчей - из строк статистики
+    layout = Match.objects.filter(id=match_id).values_list('statistics_layout', flat=True).get()
+    if layout is None:
+        layout = build_statistics_layout(Match(id=match_id).statistics.order_by('id').values(
+            'period', 'group_name', 'stat_name', 'home_value', 'away_value', 'home_Total', 'away_Total'
+        ))
+    return layout
+
+
+def api_match_detail(request, match_id):
+    return detail_response(request, MATCH, match_id, {'sets': match_sets, 'statistics': match_statistics})
+
+
+def id_list_response(request, resource):
+    # Справочники листаются по возрастанию id, курсор - последний показанный id
+    queryset = resource.model.objects.all()
+    last_id = parse_int(request.GET.get('cursor'))
+    if last_id is not None:
+        queryset = queryset.filter(id__gt=last_id)
+    return list_response(request, resource, queryset, ('id',), ('id',), lambda row: str(row[0]))
+
+
+def api_team_list(request):
+    return id_list_response(request, TEAM)
+
+
+def team_player_ids(team_id):
+    return sorted(Team.players.through.objects.filter(team_id=team_id).values_list('player_id', flat=True))
+
+
+def api_team_detail(request, team_id):
+    # Состав команды из API не меняется, поэтому в ETag его метки не входят
+    return detail_response(request, TEAM, team_id, {'player_ids': team_player_ids})
+
+
+def api_player_list(request):
+    return id_list_response(request, PLAYER)
+
+
+def api_player_detail(request, player_id):
+    return detail_response(request, PLAYER, player_id)
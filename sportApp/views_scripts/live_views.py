@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from sportApp.models import LiveEvent
+from sportApp.views_scripts.models_views import parse_int
+
+# Сколько строк LiveEvent читать одним запросом
+STREAM_BATCH = 100
+# Через сколько миллисекунд браузер переподключается после закрытия потока
+RETRY_MS = 3000
+# Комментарий раз в столько секунд тишины, чтобы прокси не закрыли соединение
+PING_SECONDS = 15
+
+
+def format_event(event_id, data):
+    return f"id: {event_id}\nevent: match\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_header(last_id):
+    # id без data не создаёт события, но запоминается браузером как Last-Event-ID
+    return f"retry: {RETRY_MS}\nid: {last_id}\n\n"
+
+
+def pending(events, last_id):
+    return events.filter(id__gt=last_id).values_list('id', 'data')[:STREAM_BATCH]
+
+
+async def stream_events(events, last_id):
+    """
+    Тело text/event-stream под ASGI: события LiveEvent после last_id, новые строки
+    дочитываются раз в LIVE_STREAM_POLL секунд, пока не истечёт LIVE_STREAM_SECONDS.
+    """
+    yield stream_header(last_id)
+    deadline = time.monotonic() + settings.LIVE_STREAM_SECONDS
+    last_sent = time.monotonic()
+    while True:
+        batch = [row async for row in pending(events, last_id)]
+        for event_id, data in batch:
+            yield format_event(event_id, data)
+            last_id = event_id
+        now = time.monotonic()
+        if batch:
+            last_sent = now
+        if now >= deadline:
+            return
+        if len(batch) == STREAM_BATCH:
+            continue
+        if now - last_sent >= PING_SECONDS:
+            yield ": ping\n\n"
+            last_sent = now
+        await asyncio.sleep(settings.LIVE_STREAM_POLL)
+
+
+async def live_stream(request):
+    """
+    Изменения идущих матчей (Server-Sent Events), которые пишет команда live_matches:
+    ?match=<id> - только один матч. Продолжает с Last-Event-ID (или ?last_id=),
+    новый клиент получает только изменения после подключения.
+    Держать поток открытым можно только под ASGI (SportPortal/asgi.py): под WSGI он занимал бы
+    рабочий поток целиком, поэтому там отдаётся накопившееся и браузер переподключается через RETRY_MS.
+    """
+    events = LiveEvent.objects.order_by('id')
+    match_id = parse_int(request.GET.get('match'))
+    if match_id is not None:
+        events = events.filter(match_id=match_id)
+    last_id = parse_int(request.headers.get('Last-Event-ID') or request.GET.get('last_id'))
+    if last_id is None:
+        last_id = await LiveEvent.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+    if isinstance(request, ASGIRequest):
+        content = stream_events(events, last_id)
+    else:
+        content = [stream_header(last_id)] + [format_event(*row) async for row in pending(events, last_id)]
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx иначе буферизует ответ и события приходят пачками
+    response['X-Accel-Buffering'] = 'no'
+    return response
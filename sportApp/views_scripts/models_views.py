@@ -1,74 +1,285 @@
-import math
+import asyncio
 
+from django.db.models import Count, Q
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
-from datetime import datetime, timedelta
-from django.shortcuts import get_object_or_404
+from datetime import datetime, timedelta, timezone
+from django.shortcuts import aget_object_or_404
+from django.urls import reverse
+from sportApp.import_scripts.sofascore_client import FINISHED_STATUS_CODE
 from sportApp.models import (
     Category, UniqueTournament, Tournament, Season,
-    Player, Team, Match, MatchSet, MatchStatistics
+    Player, Team, Match, MatchSet, MatchStatistics, PlayerMatch, HeadToHead
 )
+from sportApp.page_cache import cache_object_page
+from sportApp.ratings import latest_snapshots
+from sportApp.search import SOURCES, result_url, search
+from sportApp.statistics_layout import build_statistics_layout
 
-def match_list(request):
-    matches = Match.objects.all().order_by('-start_timestamp')
-    return render(request, 'pages/match_list.html', {'matches': matches})
-
-
-def match_detail(request, match_id):
-    match = get_object_or_404(Match, id=match_id)
-
-    # Получаем все статистические записи для матча
-    stats_qs = match.statistics.all()
-
-    # Группируем статистику по периоду и затем по группе
-    grouped = {}
-    for stat in stats_qs:
-        period = stat.period
-        group = stat.group_name
-        if period not in grouped:
-            grouped[period] = {}
-        if group not in grouped[period]:
-            grouped[period][group] = []
-        grouped[period][group].append({
-            "name": stat.stat_name,
-            "home_value": int(stat.home_value),
-            "away_value": int(stat.away_value),
-            "home_total": int(stat.home_Total) if stat.home_Total is not None else None,
-            "away_total": int(stat.away_Total) if stat.away_Total is not None else None,
-            "home_percent": calc_percent(stat.home_value,
-                                         int(stat.home_Total)) if stat.home_Total is not None else "N/A",
-            "away_percent": calc_percent(stat.away_value,
-                                         int(stat.away_Total)) if stat.away_Total is not None else "N/A",
-        })
+MATCHES_PER_PAGE = 50
+HISTORY_PER_PAGE = 20
+SEARCH_LIMIT = 10
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(obj, id_field='id'):
+    # Курсор - позиция последней показанной строки: (start_timestamp в микросекундах, id)
+    micros = (obj.start_timestamp - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{getattr(obj, id_field)}"
+
+
+def decode_cursor(cursor):
+    try:
+        micros, match_id = (int(part) for part in cursor.split('_'))
+    except (AttributeError, ValueError):
+        return None
+    return EPOCH + timedelta(microseconds=micros), match_id
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def keyset_page(queryset, cursor, per_page, id_field='id'):
+    """
+    Страница по ключу (start_timestamp, id_field) в порядке убывания: вместо OFFSET
+    продолжаем сразу после курсора, поэтому любая страница стоит одинаково.
+    Возвращает (объекты страницы, курсор следующей страницы или None).
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        start_timestamp, last_id = position
+        queryset = queryset.filter(
+            Q(start_timestamp__lt=start_timestamp)
+            | Q(start_timestamp=start_timestamp, **{f'{id_field}__lt': last_id})
+        )
+    items = await alist(queryset.order_by('-start_timestamp', f'-{id_field}')[:per_page + 1])
+    next_cursor = encode_cursor(items[per_page - 1], id_field) if len(items) > per_page else None
+    return items[:per_page], next_cursor
+
+
+def next_page_query(request, next_cursor):
+    # Строка запроса следующей страницы: текущие параметры с новым курсором
+    if not next_cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = next_cursor
+    return query.urlencode()
+
+
+def filter_matches(queryset, params):
+    """
+    Фильтры списка матчей: date=YYYY-MM-DD, tournament=<id>, player=<id>.
+    Некорректные значения игнорируются.
+    """
+    filters = {}
+    try:
+        day = datetime.strptime(params.get('date', ''), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except ValueError:
+        day = None
+    if day:
+        queryset = queryset.filter(start_timestamp__gte=day, start_timestamp__lt=day + timedelta(days=1))
+        filters['date'] = day.strftime('%Y-%m-%d')
+
+    tournament_id = parse_int(params.get('tournament'))
+    if tournament_id is not None:
+        queryset = queryset.filter(tournament_id=tournament_id)
+        filters['tournament'] = tournament_id
+
+    player_id = parse_int(params.get('player'))
+    if player_id is not None:
+        # Команды игрока берём из таблицы связей Team.players, дальше работают индексы по home_team/away_team
+        team_ids = Team.players.through.objects.filter(player_id=player_id).values('team_id')
+        queryset = queryset.filter(Q(home_team__in=team_ids) | Q(away_team__in=team_ids))
+        filters['player'] = player_id
+
+    return queryset, filters
+
+
+async def match_list(request):
+    matches = (
+        Match.objects
+        .select_related('home_team', 'away_team', 'tournament', 'season')
+        .defer('statistics_layout')
+        .exclude(start_timestamp=None)
+    )
+    matches, filters = filter_matches(matches, request.GET)
+    page, next_cursor = await keyset_page(matches, request.GET.get('cursor'), MATCHES_PER_PAGE)
 
-    # Преобразуем сгруппированные данные в список для удобства обработки в шаблоне
-    statistics_data = []
-    for period, groups in grouped.items():
-        period_obj = {
-            "period": period,
-            "groups": [],
-        }
-        for group_name, statistics_items in groups.items():
-            period_obj["groups"].append({
-                "groupName": group_name,
-                "statisticsItems": statistics_items,
-            })
-        statistics_data.append(period_obj)
-
-    return render(request, 'pages/match_detail.html', {
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    first_query = query.urlencode() if 'cursor' in request.GET else None
+    next_query = None
+    if next_cursor:
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
+
+    return render(request, 'pages/match_list.html', {
+        'matches': page,
+        'filters': filters,
+        'first_query': first_query,
+        'next_query': next_query,
+    })
+
+
+@cache_object_page('match', 'match_id')
+async def match_detail(request, match_id):
+    # Матч и его сеты не зависят друг от друга - запрашиваем одновременно
+    match, sets = await asyncio.gather(
+        aget_object_or_404(Match.objects.select_related('home_team', 'away_team', 'tournament', 'season'), id=match_id),
+        alist(MatchSet.objects.filter(match_id=match_id).order_by('set_number')),
+    )
+
+    # Сгруппированная статистика строится при импорте (Match.statistics_layout).
+    # Для матчей, загруженных раньше, строим её один раз из строк и сохраняем.
+    statistics_data = match.statistics_layout
+    if statistics_data is None:
+        statistics_data = build_statistics_layout(await alist(match.statistics.order_by('id').values(
+            'period', 'group_name', 'stat_name', 'home_value', 'away_value', 'home_Total', 'away_Total'
+        )))
+        if statistics_data:
+            await Match.objects.filter(id=match.id).aupdate(statistics_layout=statistics_data)
+
+    response = render(request, 'pages/match_detail.html', {
         'match': match,
+        'sets': sets,
         'statistics_data': statistics_data
     })
+    if match.status_code == FINISHED_STATUS_CODE:
+        # Итог завершённого матча не меняется: страница хранится, пока её не сбросит импорт
+        response.page_cache_timeout = None
+    return response
+
+@cache_object_page('team', 'team_id')
+async def team_detail(request, team_id):
+    team = await aget_object_or_404(Team, id=team_id)
+
+    # История по индексам (home_team|away_team, -start_timestamp, -id)
+    matches = (
+        Match.objects
+        .filter(Q(home_team=team) | Q(away_team=team))
+        .exclude(start_timestamp=None)
+        .select_related('home_team', 'away_team', 'tournament')
+        .defer('statistics_layout')
+    )
+    summary, (history, next_cursor), players = await asyncio.gather(
+        matches.aaggregate(
+            wins=Count('id', filter=Q(home_team=team, winner_code=1) | Q(away_team=team, winner_code=2)),
+            losses=Count('id', filter=Q(home_team=team, winner_code=2) | Q(away_team=team, winner_code=1)),
+        ),
+        keyset_page(matches, request.GET.get('cursor'), HISTORY_PER_PAGE),
+        alist(team.players.all()),
+    )
+    for match in history:
+        side = 1 if match.home_team_id == team.id else 2
+        match.won = match.winner_code == side if match.winner_code in (1, 2) else None
+
+    return render(request, 'pages/team_detail.html', {
+        'team': team,
+        'players': players,
+        'history': history,
+        'summary': summary,
+        'next_query': next_page_query(request, next_cursor),
+    })
 
-def calc_percent(value, total):
-    if total is None or total == 0:
-        return "N/A"
-    return f"{math.floor((float(value) / total) * 100)}%"
+@cache_object_page('player', 'player_id')
+async def player_detail(request, player_id):
+    player = await aget_object_or_404(Player, id=player_id)
+
+    # История из денормализованной таблицы PlayerMatch (индекс player, -start_timestamp, -match),
+    # сводка по сезонам и покрытиям (PlayerRollup ведётся импортом) и текущий рейтинг Эло
+    # (последний снимок по каждому покрытию, "" - общий) читаются одновременно
+    links = PlayerMatch.objects.filter(player=player).exclude(start_timestamp=None)
+    summary, (page, next_cursor), rollups, ratings = await asyncio.gather(
+        links.aaggregate(
+            wins=Count('id', filter=Q(won=True)),
+            losses=Count('id', filter=Q(won=False)),
+        ),
+        keyset_page(
+            links.select_related('match__home_team', 'match__away_team', 'match__tournament')
+            .defer('match__statistics_layout'),
+            request.GET.get('cursor'), HISTORY_PER_PAGE, id_field='match_id',
+        ),
+        alist(player.rollups.select_related('season').exclude(matches=0).order_by('-season__year', 'surface')),
+        alist(latest_snapshots().filter(player=player).order_by('surface')),
+    )
+    history = []
+    for link in page:
+        link.match.won = link.won
+        history.append(link.match)
+
+    return render(request, 'pages/player_detail.html', {
+        'player': player,
+        'ratings': ratings,
+        'rollups': rollups,
+        'history': history,
+        'summary': summary,
+        'next_query': next_page_query(request, next_cursor),
+    })
+
+
+def wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+def head_to_head(request, player_a, player_b):
+    """
+    Личные встречи двух игроков: одна строка HeadToHead по ключу (меньший id, больший id).
+    Отдаёт JSON (?format=json или Accept: application/json) или HTML.
+    """
+    players = Player.objects.in_bulk([player_a, player_b])
+    if player_a == player_b or len(players) != 2:
+        raise Http404("Нужны два разных игрока")
+    low, high = sorted((player_a, player_b))
+    record = HeadToHead.objects.filter(player_low_id=low, player_high_id=high).first()
+    a_is_low = player_a == low
+
+    matches = []
+    for entry in record.matches if record else []:
+        winner = entry['winner']
+        matches.append({
+            'match_id': entry['match_id'],
+            'url': reverse('match_detail', args=[entry['match_id']]),
+            'start_timestamp': datetime.fromtimestamp(entry['start_timestamp'], tz=timezone.utc),
+            'winner_id': None if winner is None else (low if winner == 'low' else high),
+            # Счёт с точки зрения player_a
+            'sets': [score if a_is_low else score[::-1] for score in entry['sets']],
+            'doubles': entry['doubles'],
+        })
+    low_wins, high_wins = (record.low_wins, record.high_wins) if record else (0, 0)
+    data = {
+        'player_a': players[player_a],
+        'player_b': players[player_b],
+        'wins_a': low_wins if a_is_low else high_wins,
+        'wins_b': high_wins if a_is_low else low_wins,
+        'matches': matches,
+    }
 
-def team_detail(request, team_id):
-    team = get_object_or_404(Team, id=team_id)
-    return render(request, 'pages/team_detail.html', {'team': team})
+    if wants_json(request):
+        for key in ('player_a', 'player_b'):
+            data[key] = {'id': data[key].id, 'name': data[key].name, 'url': reverse('player_detail', args=[data[key].id])}
+        for match in matches:
+            match['start_timestamp'] = match['start_timestamp'].isoformat()
+        return JsonResponse(data)
+    return render(request, 'pages/head_to_head.html', data)
 
-def player_detail(request, player_id):
-    player = get_object_or_404(Player, id=player_id)
-    return render(request, 'pages/player_detail.html', {'player': player})
 
+def search_autocomplete(request):
+    """
+    Подсказки поиска по игрокам, командам и турнирам в JSON: ?q=<текст>&limit=<до 20>&kind=player,team.
+    """
+    query = request.GET.get('q', '')[:100]
+    limit = min(max(parse_int(request.GET.get('limit')) or SEARCH_LIMIT, 1), 20)
+    kinds = [kind for kind in request.GET.get('kind', '').split(',') if kind in SOURCES] or None
+    results = [
+        {'kind': kind, 'id': object_id, 'name': name, 'url': result_url(kind, object_id)}
+        for kind, object_id, name in search(query, limit, kinds)
+    ]
+    return JsonResponse({'query': query, 'results': results})